@@ -3,8 +3,11 @@ from datetime import datetime
 from typing import List
 from bson import ObjectId
 
-from app.core.database import get_database
-from app.core.database import get_database
+from app.core.cache import bump_write_version
+from app.core.catalog import catalog
+from app.core.search import search_document_fields, suggest_cache
+from app.core.database import get_database, db as database_state, ensure_indexes, get_index_stats
+from app.crud.pagination import count_cache
 from app.models.common import UserRole
 from app.schemas.auth_schemas import AuthUserResponse
 from app.schemas.admin_schemas import (
@@ -12,8 +15,8 @@ from app.schemas.admin_schemas import (
     ChangePasswordRequest, 
     UpdateProfileRequest
 )
-from app.api.auth_router import get_current_admin
-from app.core.security import get_password_hash, verify_password
+from app.api.auth_router import get_current_admin, get_user_document, principal_cache, token_version_cache
+from app.core.security import check_password, hash_password
 
 router = APIRouter()
 
@@ -43,14 +46,16 @@ async def create_admin(
     user_dict["nombre"] = "Admin"
     user_dict["apellido"] = admin_data.username
     
-    user_dict["hashed_password"] = get_password_hash(admin_data.password)
+    user_dict["hashed_password"] = await hash_password(admin_data.password)
     user_dict["role"] = UserRole.ADMIN
     user_dict["created_at"] = datetime.utcnow()
     user_dict["updated_at"] = datetime.utcnow()
     user_dict["is_active"] = True
     user_dict["is_superuser"] = False
+    user_dict.update(search_document_fields("users", user_dict))
     
     result = await collection.insert_one(user_dict)
+    bump_write_version("users")
     
     # Return created user
     user_dict["_id"] = str(result.inserted_id)
@@ -65,23 +70,30 @@ async def change_password(
     db = get_database()
     collection = db["users"]
     
+    current_user = await get_user_document(current_user)
+    
     # Verificar contraseña actual
-    if not verify_password(password_data.old_password, current_user["hashed_password"]):
+    if not await check_password(password_data.old_password, current_user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Contraseña actual incorrecta"
         )
     
     # Actualizar contraseña
-    new_hashed_password = get_password_hash(password_data.new_password)
+    new_hashed_password = await hash_password(password_data.new_password)
     
     await collection.update_one(
         {"_id": ObjectId(current_user["_id"])},
-        {"$set": {
-            "hashed_password": new_hashed_password,
-            "updated_at": datetime.utcnow()
-        }}
+        {
+            "$set": {
+                "hashed_password": new_hashed_password,
+                "updated_at": datetime.utcnow()
+            },
+            # Revoca los tokens emitidos con la contraseña anterior
+            "$inc": {"token_version": 1}
+        }
     )
+    bump_write_version("users")
     
     return {"message": "Contraseña actualizada correctamente"}
 
@@ -94,6 +106,8 @@ async def update_profile(
     db = get_database()
     collection = db["users"]
     
+    current_user = await get_user_document(current_user)
+    
     # Verificar si el nuevo username ya existe (y no es el mismo usuario)
     if profile_data.username != current_user["username"]:
         existing_user = await collection.find_one({"username": profile_data.username})
@@ -106,10 +120,16 @@ async def update_profile(
     update_data = {"username": profile_data.username}
     update_data["updated_at"] = datetime.utcnow()
     
+    update = {"$set": update_data}
+    if profile_data.username != current_user["username"]:
+        # El username es el `sub` de los tokens: los anteriores dejan de valer
+        update["$inc"] = {"token_version": 1}
+    
     await collection.update_one(
         {"_id": ObjectId(current_user["_id"])},
-        {"$set": update_data}
+        update
     )
+    bump_write_version("users")
     
     # Obtener usuario actualizado
     updated_user = await collection.find_one({"_id": ObjectId(current_user["_id"])})
@@ -177,5 +197,39 @@ async def delete_user(
     
     # Eliminar el usuario
     await collection.delete_one({"_id": ObjectId(user_id)})
+    bump_write_version("users")
     
     return None
+
+@router.get("/indexes")
+async def get_indexes(
+    refresh: bool = False,
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Uso de los índices ($indexStats) y drift respecto al registro declarativo (Solo administradores).
+    - `refresh=true` vuelve a sincronizar los índices antes de reportar.
+    Los índices con `unused: true` no han sido usados desde `since`.
+    """
+    report = database_state.index_report
+    if refresh or report is None:
+        report = await ensure_indexes()
+
+    return {
+        "drift": report,
+        "stats": await get_index_stats()
+    }
+
+@router.get("/caches")
+async def get_caches(current_user: dict = Depends(get_current_admin)):
+    """
+    Estado de las cachés en memoria de este proceso (Solo administradores).
+    Cada worker tiene las suyas; los contadores se reinician al reiniciar el proceso.
+    """
+    return {
+        "catalog": catalog.stats(),
+        "count_totals": count_cache.stats(),
+        "suggest": suggest_cache.stats(),
+        "principals": principal_cache.stats(),
+        "token_versions": token_version_cache.stats()
+    }
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from bson import ObjectId
 from datetime import datetime, timedelta
 from typing import Annotated
 
@@ -12,9 +13,9 @@ from app.schemas.auth_schemas import (
     PapaLoginRequest
 )
 from app.core.config import settings
+from app.core.cache import TTLCache, bump_write_version, get_write_version
 from app.core.security import (
-    get_password_hash, 
-    verify_password, 
+    verify_and_update, 
     create_access_token,
     oauth2_scheme
 )
@@ -24,8 +25,50 @@ router = APIRouter()
 
 from fastapi.security import HTTPAuthorizationCredentials
 
+# Usuarios ya resueltos por get_current_user, por `sub` del token. La clave lleva
+# la versión de escritura de "users": cualquier alta, edición o baja, cambio de
+# contraseña o de hijos_ids hecho por este proceso los invalida. El TTL acota
+# cuánto puede ver otro worker un usuario desactualizado.
+principal_cache = TTLCache(maxsize=4096, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+# token_version actual de cada usuario (por _id), para validar los tokens
+# autocontenidos. Mismo esquema de invalidación que principal_cache.
+token_version_cache = TTLCache(maxsize=4096, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+_DELETED = -1  # token_version de un usuario que ya no existe: ningún token coincide
+
+def token_claims(user: dict, sub: str) -> dict:
+    """
+    Datos del token de `user`. Con SELF_CONTAINED_TOKENS lleva además _id,
+    hijos_ids y token_version, así get_current_user no necesita buscarlo.
+    Cambiar la contraseña, desactivar al usuario o sus hijos incrementa
+    token_version y revoca los tokens emitidos antes.
+    """
+    claims = {"sub": sub, "role": user["role"]}
+    if settings.SELF_CONTAINED_TOKENS:
+        claims.update({
+            "uid": str(user["_id"]),
+            "hijos": [str(hijo_id) for hijo_id in user.get("hijos_ids", [])],
+            "ver": user.get("token_version", 0),
+        })
+    return claims
+
+async def _token_version(uid: str) -> int:
+    cache_key = (uid, get_write_version("users"))
+    version = token_version_cache.get(cache_key)
+    if version is None:
+        doc = None
+        if ObjectId.is_valid(uid):
+            doc = await get_database()["users"].find_one({"_id": ObjectId(uid)}, {"token_version": 1})
+        version = doc.get("token_version", 0) if doc else _DELETED
+        token_version_cache.set(cache_key, version)
+    return version
+
 async def get_current_user(token_auth: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    """Obtener el usuario actual desde el token"""
+    """
+    Obtener el usuario actual desde el token.
+    Con un token autocontenido devuelve sólo _id, role, hijos_ids y el sub
+    (email o username); get_user_document trae el documento completo.
+    """
     token = token_auth.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,20 +82,49 @@ async def get_current_user(token_auth: HTTPAuthorizationCredentials = Depends(oa
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    if "uid" in payload:
+        if await _token_version(payload["uid"]) != payload.get("ver"):
+            raise credentials_exception
+        return {
+            "_id": payload["uid"],
+            "role": payload["role"],
+            "hijos_ids": [ObjectId(hijo_id) for hijo_id in payload.get("hijos", [])],
+            "username" if payload["role"] == UserRole.ADMIN else "email": username,
+        }
     
-    db = get_database()
-    collection = db["users"]
-    # Buscar por email o username (ya que 'sub' puede ser cualquiera de los dos)
-    user = await collection.find_one({
-        "$or": [
-            {"email": username},
-            {"username": username}
-        ]
-    })
-    
+    cache_key = (username, get_write_version("users"))
+    user = principal_cache.get(cache_key)
     if user is None:
-        raise credentials_exception
-    
+        db = get_database()
+        collection = db["users"]
+        # Buscar por email o username (ya que 'sub' puede ser cualquiera de los dos)
+        user = await collection.find_one({
+            "$or": [
+                {"email": username},
+                {"username": username}
+            ]
+        })
+        
+        if user is None:
+            raise credentials_exception
+        
+        user["_id"] = str(user["_id"])
+        principal_cache.set(cache_key, user)
+    # Copia: las rutas no deben modificar la entrada cacheada
+    return dict(user)
+
+async def get_user_document(current_user: dict) -> dict:
+    """Documento completo del usuario actual (los tokens autocontenidos no lo traen)"""
+    if "hashed_password" in current_user:
+        return current_user
+    user = await get_database()["users"].find_one({"_id": ObjectId(current_user["_id"])})
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudo validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     user["_id"] = str(user["_id"])
     return user
 
@@ -66,6 +138,21 @@ async def get_current_admin(current_user: dict = Depends(get_current_user)):
     return current_user
 
 
+async def _authenticate(collection, user: dict, password: str) -> bool:
+    """
+    Verificar la contraseña de `user` (bcrypt fuera del event loop). Si el hash
+    tiene otro costo que BCRYPT_ROUNDS se reemplaza por uno nuevo.
+    """
+    valid, new_hash = await verify_and_update(password, user["hashed_password"])
+    if new_hash:
+        # Sólo si nadie cambió la contraseña mientras tanto
+        result = await collection.update_one(
+            {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+        if result.modified_count:
+            bump_write_version("users")
+    return valid
 
 @router.post("/login/admin", response_model=Token)
 async def login_admin(credentials: AdminLoginRequest):
@@ -75,7 +162,7 @@ async def login_admin(credentials: AdminLoginRequest):
     
     user = await collection.find_one({"username": credentials.username})
     
-    if not user or not verify_password(credentials.password, user["hashed_password"]):
+    if not user or not await _authenticate(collection, user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario o contraseña incorrectos",
@@ -97,7 +184,7 @@ async def login_admin(credentials: AdminLoginRequest):
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     # Para admin usamos username como sub
     access_token = create_access_token(
-        data={"sub": user["username"], "role": user["role"]}, 
+        data=token_claims(user, user["username"]), 
         expires_delta=access_token_expires
     )
     
@@ -117,7 +204,7 @@ async def login_padre(credentials: PapaLoginRequest):
     
     user = await collection.find_one({"email": credentials.email})
     
-    if not user or not verify_password(credentials.password, user["hashed_password"]):
+    if not user or not await _authenticate(collection, user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
@@ -139,7 +226,7 @@ async def login_padre(credentials: PapaLoginRequest):
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     # Para padres usamos email como sub
     access_token = create_access_token(
-        data={"sub": user["email"], "role": user["role"]}, 
+        data=token_claims(user, user["email"]), 
         expires_delta=access_token_expires
     )
     
@@ -155,4 +242,4 @@ async def login_padre(credentials: PapaLoginRequest):
 @router.get("/me", response_model=AuthUserResponse)
 async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """Obtener información del usuario actual"""
-    return current_user
+    return await get_user_document(current_user)
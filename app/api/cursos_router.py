@@ -1,48 +1,37 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, status
-from typing import List
-from app.crud.crud_curso import curso as crud_curso
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, status
+from functools import partial
+from typing import Any, AsyncIterator, List, Tuple
+from fastapi.responses import StreamingResponse
+from app.crud.crud_curso import NATURAL_KEY, curso as crud_curso
 from app.schemas.curso_schema import CursoCreate, CursoUpdate, CursoResponse
 from app.core.database import get_database
-import openpyxl
-from io import BytesIO
+from app.core.responses import json_response
+from app.core.config import settings
+from app.core.catalog import catalog
+from app.core.excel import build_xlsx, xlsx_response
+from app.core.ingestion import check_upload, read_rows
+from app.core.jobs import ChunkResult, Row, RowTask, register_task, run_task, submit
+from app.crud.loader import find_by_ids
+from app.crud.pagination import ListQuery
 from bson import ObjectId
 
 router = APIRouter()
 
-@router.post("/import", status_code=status.HTTP_201_CREATED)
-async def import_cursos(file: UploadFile = File(...)):
-    """
-    Importar cursos masivamente desde un archivo Excel (.xlsx).
-    Columnas requeridas: nombre, paralelo, nivel, turno, malla_id
-    """
-    if not file.filename.endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
-
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(BytesIO(contents))
-    sheet = workbook.active
+# --- Importación y eliminación masiva (en el request o como trabajo: app.core.jobs) ---
 
-    db = get_database()
-    cursos_creados = []
-    errores = []
+async def _import_chunk(db: Any, filas: List[Row], params: dict) -> ChunkResult:
+    """Validar un lote y sus mallas/tutores (una consulta cada uno) y hacer upsert de los cursos"""
+    validas = []  # (número de fila, CursoCreate)
+    errores = []  # (número de fila, mensaje)
 
-    # Iterar filas (saltando cabecera)
-    for index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+    for index, row in filas:
         try:
             # Asumiendo orden: nombre, paralelo, nivel, turno, malla_id, tutor_id(opcional)
-            if not row[0]: # Si no hay nombre, saltar
-                continue
-            
-            nombre = row[0]
-            paralelo = row[1]
-            nivel = row[2]
-            turno = row[3]
-            malla_id = row[4]
-            tutor_id = row[5] if len(row) > 5 else None
+            nombre, paralelo, nivel, turno, malla_id, tutor_id = row
 
             # Validaciones básicas
             if not ObjectId.is_valid(str(malla_id)):
-                errores.append(f"Fila {index}: malla_id inválido")
+                errores.append((index, "malla_id inválido"))
                 continue
 
             curso_in = CursoCreate(
@@ -53,84 +42,144 @@ async def import_cursos(file: UploadFile = File(...)):
                 malla_id=str(malla_id),
                 tutor_id=str(tutor_id) if tutor_id and ObjectId.is_valid(str(tutor_id)) else None
             )
-            
-            nuevo_curso = await crud_curso.create(db, obj_in=curso_in)
-            cursos_creados.append(nuevo_curso)
+            validas.append((index, curso_in))
             
         except Exception as e:
-            errores.append(f"Fila {index}: Error procesando - {str(e)}")
-
+            errores.append((index, f"Error procesando - {str(e)}"))
+
+    # Mallas referenciadas: del catálogo en memoria; las que no están (p. ej.
+    # creadas en otro worker hace poco) se confirman con una sola consulta
+    mallas = set((await catalog.load(db)).mallas)
+    faltantes = {curso_in.malla_id for _, curso_in in validas} - mallas
+    if faltantes:
+        mallas.update(await find_by_ids(db["mallas_curriculares"], faltantes, {"_id": 1}))
+    # Tutores referenciados: una consulta
+    tutores = await find_by_ids(
+        db["users"], (curso_in.tutor_id for _, curso_in in validas if curso_in.tutor_id), {"_id": 1}
+    )
+    cursos_in = []
+    for index, curso_in in validas:
+        if curso_in.malla_id not in mallas:
+            errores.append((index, f"malla_id {curso_in.malla_id} no existe"))
+        elif curso_in.tutor_id and curso_in.tutor_id not in tutores:
+            errores.append((index, f"tutor_id {curso_in.tutor_id} no existe"))
+        else:
+            cursos_in.append(curso_in)
+
+    result = await crud_curso.upsert_many(db, objs_in=cursos_in)
+    return ChunkResult({"creados": result.created_count, "actualizados": result.updated_count}, errores)
+
+def _import_summary(counts: dict, errores: List[str], params: dict) -> dict:
     return {
         "message": "Proceso de importación finalizado",
-        "creados_count": len(cursos_creados),
+        "creados_count": counts.get("creados", 0),
+        "actualizados_count": counts.get("actualizados", 0),
         "errores": errores
     }
 
-@router.post("/bulk-delete", status_code=status.HTTP_200_OK)
-async def bulk_delete_cursos(file: UploadFile = File(...)):
-    """
-    Eliminar cursos masivamente usando el mismo archivo Excel de importación.
-    Busca coincidencias exactas por: nombre, paralelo, nivel, turno, malla_id.
-    """
-    if not file.filename.endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
-
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(BytesIO(contents))
-    sheet = workbook.active
+IMPORT_TASK = register_task(RowTask("cursos.import", partial(read_rows, width=6), _import_chunk, _import_summary))
 
-    db = get_database()
-    collection = db["cursos"]
-    eliminados_count = 0
+async def _bulk_delete_chunk(db: Any, filas: List[Row], params: dict) -> ChunkResult:
+    """Buscar los cursos de un lote por campos clave y borrarlos con delete_many"""
+    indices = []  # número de fila de cada clave
+    claves = []
     errores = []
 
-    # Iterar filas (saltando cabecera)
-    for index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        try:
-            if not row[0]: # Si no hay nombre, saltar
-                continue
-            
-            nombre = row[0]
-            paralelo = row[1]
-            nivel = row[2]
-            turno = row[3]
-            malla_id = row[4]
-            # tutor_id no es crítico para identificar el curso a borrar, lo ignoramos
-
-            # Validaciones básicas de ID
-            if not ObjectId.is_valid(str(malla_id)):
-                errores.append(f"Fila {index}: malla_id inválido")
-                continue
+    for index, row in filas:
+        nombre, paralelo, nivel, turno, malla_id = row
+        # tutor_id no es crítico para identificar el curso a borrar, lo ignoramos
 
-            # Buscar el curso por campos clave
-            filter_query = {
-                "nombre": str(nombre),
-                "paralelo": str(paralelo),
-                "nivel": str(nivel),
-                "turno": str(turno),
-                "malla_id": ObjectId(str(malla_id))
-            }
-            
-            result = await collection.delete_one(filter_query)
-            if result.deleted_count > 0:
-                eliminados_count += 1
-            else:
-                errores.append(f"Fila {index}: No se encontró el curso para eliminar")
-            
-        except Exception as e:
-            errores.append(f"Fila {index}: Error procesando - {str(e)}")
+        # Validaciones básicas de ID
+        if not ObjectId.is_valid(str(malla_id)):
+            errores.append((index, "malla_id inválido"))
+            continue
 
+        indices.append(index)
+        # malla_id como ObjectId: delete_by_keys lo busca guardado como ObjectId o como string
+        claves.append((str(nombre), str(paralelo), str(nivel), str(turno), ObjectId(str(malla_id))))
+
+    result = await crud_curso.delete_by_keys(
+        db, fields=NATURAL_KEY, keys=claves, dry_run=params["dry_run"], chunk_size=settings.IMPORT_BATCH_SIZE
+    )
+    errores.extend((indices[i], "No se encontró el curso para eliminar") for i in result.not_found)
+    return ChunkResult({"eliminados": result.deleted_count, "coincidencias": result.matched_count}, errores)
+
+def _bulk_delete_summary(counts: dict, errores: List[str], params: dict) -> dict:
     return {
-        "message": "Proceso de eliminación masiva finalizado",
-        "eliminados_count": eliminados_count,
+        "message": "Proceso de eliminación masiva finalizado" if not params["dry_run"] else "Simulación de eliminación masiva",
+        "eliminados_count": counts.get("eliminados", 0),
+        "coincidencias_count": counts.get("coincidencias", 0),
+        "dry_run": params["dry_run"],
         "errores": errores
     }
 
+BULK_DELETE_TASK = register_task(RowTask(
+    "cursos.bulk_delete", partial(read_rows, width=5), _bulk_delete_chunk, _bulk_delete_summary
+))
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+async def import_cursos(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Procesar en segundo plano (avance en GET /api/jobs/{id})")
+):
+    """
+    Importar cursos masivamente desde un archivo Excel (.xlsx) o CSV.
+    Columnas requeridas: nombre, paralelo, nivel, turno, malla_id
+    Los cursos que ya existen (mismos nombre, paralelo, nivel, turno y malla_id)
+    no se duplican: sólo se actualiza su tutor.
+    """
+    check_upload(file.filename)
+
+    if background:
+        return await submit(IMPORT_TASK, await file.read(), {}, filename=file.filename)
+    return await run_task(IMPORT_TASK, get_database(), file.file, {})
+
+@router.post("/bulk-delete", status_code=status.HTTP_200_OK)
+async def bulk_delete_cursos(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False, description="Sólo contar cuántos se eliminarían"),
+    background: bool = Query(False, description="Procesar en segundo plano (avance en GET /api/jobs/{id})")
+):
+    """
+    Eliminar cursos masivamente usando el mismo archivo Excel de importación.
+    Busca coincidencias exactas por: nombre, paralelo, nivel, turno, malla_id.
+    """
+    check_upload(file.filename)
+
+    params = {"dry_run": dry_run}
+    if background:
+        return await submit(BULK_DELETE_TASK, await file.read(), params, filename=file.filename)
+    return await run_task(BULK_DELETE_TASK, get_database(), file.file, params)
+
 @router.get("/", response_model=List[CursoResponse])
 async def read_cursos(skip: int = 0, limit: int = 100):
     db = get_database()
-    cursos = await crud_curso.get_multi(db, skip=skip, limit=limit)
-    return cursos
+    cursos = await crud_curso.get_multi(db, skip=skip, limit=limit, schema=CursoResponse)
+    return json_response(List[CursoResponse], cursos)
+
+# Mismas columnas y orden que /import (y /bulk-delete)
+XLSX_HEADERS = ("nombre", "paralelo", "nivel", "turno", "malla_id", "tutor_id")
+
+async def _xlsx_rows(docs: AsyncIterator[dict]) -> AsyncIterator[Tuple]:
+    async for curso in docs:
+        yield (
+            curso.get("nombre"),
+            curso.get("paralelo"),
+            curso.get("nivel"),
+            curso.get("turno"),
+            str(curso["malla_id"]) if curso.get("malla_id") else None,
+            str(curso["tutor_id"]) if curso.get("tutor_id") else None,
+        )
+
+@router.get("/export/xlsx", response_class=StreamingResponse)
+async def export_cursos_xlsx():
+    """Exportar cursos a Excel con las columnas de /import: se puede editar y volver a importar"""
+    db = get_database()
+    docs = crud_curso.stream(
+        db, ListQuery({}), projection=dict.fromkeys(XLSX_HEADERS, 1), batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    output = await build_xlsx("Cursos", XLSX_HEADERS, _xlsx_rows(docs))
+    return xlsx_response(output, "cursos.xlsx")
 
 @router.post("/", response_model=CursoResponse)
 async def create_curso(curso_in: CursoCreate):
@@ -140,7 +189,7 @@ async def create_curso(curso_in: CursoCreate):
 @router.get("/{id}", response_model=CursoResponse)
 async def read_curso(id: str):
     db = get_database()
-    curso = await crud_curso.get(db, id=id)
+    curso = await crud_curso.get(db, id=id, schema=CursoResponse)
     if not curso:
         raise HTTPException(status_code=404, detail="Curso not found")
     return curso
@@ -148,15 +197,15 @@ async def read_curso(id: str):
 @router.put("/{id}", response_model=CursoResponse)
 async def update_curso(id: str, curso_in: CursoUpdate):
     db = get_database()
-    curso = await crud_curso.get(db, id=id)
+    curso = await crud_curso.update(db, id=id, obj_in=curso_in)
     if not curso:
         raise HTTPException(status_code=404, detail="Curso not found")
-    return await crud_curso.update(db, db_obj=curso, obj_in=curso_in)
+    return curso
 
 @router.delete("/{id}", response_model=CursoResponse)
 async def delete_curso(id: str):
     db = get_database()
-    curso = await crud_curso.get(db, id=id)
+    curso = await crud_curso.remove(db, id=id)
     if not curso:
         raise HTTPException(status_code=404, detail="Curso not found")
-    return await crud_curso.remove(db, id=id)
+    return curso
@@ -1,62 +1,45 @@
-from typing import List, Optional
+from collections import defaultdict
+from functools import partial
+from typing import Any, AsyncIterator, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException, UploadFile, File, status, Query, Depends
-import math
-from app.schemas.common import PaginatedResponse
+from app.schemas.common import PaginatedResponse, PaginationParams
 from app.crud.crud_estudiante import estudiante as crud_estudiante
-from app.schemas.estudiante_schema import EstudianteCreate, EstudianteUpdate, EstudianteResponse, GradoFilter, HijoSimpleResponse
+from app.schemas.estudiante_schema import EstudianteCreate, EstudianteUpdate, EstudianteResponse, GradoFilter, HijoSimpleResponse, EstudianteSuggestion
 from app.models.malla_curricular_model import NivelEducativo
 from app.models.curso_model import TurnoCurso
 from app.core.database import get_database
-import openpyxl
-from io import BytesIO
+from app.core.responses import json_response, ndjson_response
+from app.core.config import settings
+from fastapi.responses import StreamingResponse
+from app.core.catalog import catalog
+from app.crud.loader import Loader, as_object_id, get_loader
+from app.crud.base import DUPLICATE_KEY
+from app.core.excel import build_xlsx, in_batches, xlsx_response
+from app.core.ingestion import check_upload, read_rows
+from app.core.jobs import ChunkResult, Row, RowTask, register_task, run_task, submit
 from bson import ObjectId
+from pydantic import ValidationError
 from app.models.common import UserRole
 from app.api.auth_router import get_current_user
 
 router = APIRouter()
 
-@router.post("/import", status_code=status.HTTP_201_CREATED)
-async def import_estudiantes(file: UploadFile = File(...)):
-    """
-    Importar estudiantes masivamente desde Excel.
-    Columnas: RUDE, Nombres, Apellidos, Curso ID (Opcional), Estado (Opcional)
-    """
-    if not file.filename.endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
-
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(BytesIO(contents))
-    sheet = workbook.active
+# --- Importación y eliminación masiva (en el request o como trabajo: app.core.jobs) ---
 
-    db = get_database()
-    creados = []
-    errores = []
+async def _import_chunk(db: Any, filas: List[Row], params: dict) -> ChunkResult:
+    """Validar un lote, descartar los RUDE existentes (una consulta) e insertar el resto"""
+    validas = []  # (número de fila, EstudianteCreate)
+    errores = []  # (número de fila, mensaje)
 
-    for index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+    # 1. Validar las filas
+    for index, row in filas:
         try:
             # Asumimos orden: RUDE, Nombres, Apellidos, CursoID, Estado
-            if not row[0]: 
-                continue
-
-            rude = row[0]
-            nombres = row[1]
-            apellidos = row[2]
-            curso_id = row[3] if len(row) > 3 else None
-            estado = row[4] if len(row) > 4 else "ACTIVO"
-
-            # Validar RUDE
-            # Intentar encontrar si ya existe
-            existing = await crud_estudiante.get_multi(db, limit=1) 
-            # El CRUD genérico no tiene filtro por campo, deberíamos verificar manualmente en la colección o mejorar el CRUD.
-            # Accederemos directo a la colección para chequear duplicidad de RUDE rapidámente.
-            collection = db["estudiantes"]
-            if await collection.find_one({"rude": rude}):
-                errores.append(f"Fila {index}: RUDE {rude} ya existe")
-                continue
+            rude, nombres, apellidos, curso_id, estado = row
 
             # Validar Curso ID
             if curso_id and not ObjectId.is_valid(str(curso_id)):
-                errores.append(f"Fila {index}: Curso ID inválido")
+                errores.append((index, "Curso ID inválido"))
                 continue
 
             estudiante_in = EstudianteCreate(
@@ -66,63 +49,120 @@ async def import_estudiantes(file: UploadFile = File(...)):
                 curso_id=str(curso_id) if curso_id else None,
                 estado=str(estado) if estado else "ACTIVO"
             )
-
-            nuevo_est = await crud_estudiante.create(db, obj_in=estudiante_in)
-            creados.append(nuevo_est)
+            validas.append((index, estudiante_in))
 
         except Exception as e:
-            errores.append(f"Fila {index}: Error - {str(e)}")
+            errores.append((index, f"Error - {str(e)}"))
+
+    # 2. RUDE ya registrados (una consulta) o repetidos dentro del archivo
+    existentes = set()
+    if validas:
+        cursor = db["estudiantes"].find({"rude": {"$in": list({est.rude for _, est in validas})}}, {"rude": 1})
+        existentes = {doc["rude"] async for doc in cursor}
+
+    nuevos = []
+    for index, estudiante_in in validas:
+        if estudiante_in.rude in existentes:
+            errores.append((index, f"RUDE {estudiante_in.rude} ya existe"))
+            continue
+        existentes.add(estudiante_in.rude)
+        nuevos.append((index, estudiante_in))
+
+    # 3. Insertar (insert_many no ordenado); un duplicado concurrente sólo rechaza su fila
+    result = await crud_estudiante.create_many(
+        db, objs_in=[est for _, est in nuevos], chunk_size=settings.IMPORT_BATCH_SIZE
+    )
+    for position, error in result.errors.items():
+        index, estudiante_in = nuevos[position]
+        if error.get("code") == DUPLICATE_KEY:
+            errores.append((index, f"RUDE {estudiante_in.rude} ya existe"))
+        else:
+            errores.append((index, f"Error - {error.get('errmsg')}"))
+
+    return ChunkResult({"creados": result.inserted_count}, errores)
 
+def _import_summary(counts: dict, errores: List[str], params: dict) -> dict:
     return {
         "message": "Importación finalizada",
-        "creados_count": len(creados),
+        "creados_count": counts.get("creados", 0),
         "errores": errores
     }
 
-@router.post("/bulk-delete", status_code=status.HTTP_200_OK)
-async def bulk_delete_estudiantes(file: UploadFile = File(...)):
-    """
-    Eliminar estudiantes masivamente basado en el RUDE del Excel.
-    """
-    if not file.filename.endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
-
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(BytesIO(contents))
-    sheet = workbook.active
+IMPORT_TASK = register_task(RowTask("estudiantes.import", partial(read_rows, width=5), _import_chunk, _import_summary))
 
-    db = get_database()
-    collection = db["estudiantes"]
-    eliminados = 0
+async def _bulk_delete_chunk(db: Any, filas: List[Row], params: dict) -> ChunkResult:
+    """Borrar los estudiantes de un lote de RUDE; los que no existen salen por diferencia"""
+    indices = []  # número de fila de cada clave
+    claves = []
     errores = []
 
-    for index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+    for index, (rude,) in filas:
+        # Igual que en la importación: el RUDE se guarda como entero y en un
+        # CSV llega como texto ("8078012345678")
         try:
-            if not row[0]: 
-                continue
-            
-            rude = row[0]
-            
-            # Borrar por RUDE
-            result = await collection.delete_one({"rude": rude})
-            if result.deleted_count > 0:
-                eliminados += 1
-            else:
-                errores.append(f"Fila {index}: RUDE {rude} no encontrado")
+            claves.append((EstudianteUpdate(rude=rude).rude,))
+        except ValidationError:
+            errores.append((index, f"RUDE {rude} inválido"))
+            continue
+        indices.append(index)
 
-        except Exception as e:
-            errores.append(f"Fila {index}: Error - {str(e)}")
+    result = await crud_estudiante.delete_by_keys(
+        db, fields=("rude",), keys=claves, dry_run=params["dry_run"], chunk_size=settings.IMPORT_BATCH_SIZE
+    )
+    errores.extend((indices[i], f"RUDE {claves[i][0]} no encontrado") for i in result.not_found)
+    return ChunkResult({"eliminados": result.deleted_count, "coincidencias": result.matched_count}, errores)
 
+def _bulk_delete_summary(counts: dict, errores: List[str], params: dict) -> dict:
     return {
-        "message": "Eliminación masiva finalizada",
-        "eliminados_count": eliminados,
+        "message": "Eliminación masiva finalizada" if not params["dry_run"] else "Simulación de eliminación masiva",
+        "eliminados_count": counts.get("eliminados", 0),
+        "coincidencias_count": counts.get("coincidencias", 0),
+        "dry_run": params["dry_run"],
         "errores": errores
     }
 
+BULK_DELETE_TASK = register_task(RowTask(
+    "estudiantes.bulk_delete", partial(read_rows, width=1), _bulk_delete_chunk, _bulk_delete_summary
+))
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+async def import_estudiantes(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Procesar en segundo plano (avance en GET /api/jobs/{id})")
+):
+    """
+    Importar estudiantes masivamente desde Excel (.xlsx) o CSV.
+    Columnas: RUDE, Nombres, Apellidos, Curso ID (Opcional), Estado (Opcional)
+
+    Por lotes de IMPORT_BATCH_SIZE filas: se validan, los RUDE existentes se
+    buscan con una sola consulta y los nuevos se insertan con insert_many
+    no ordenado (el índice único de `rude` rechaza duplicados).
+    """
+    check_upload(file.filename)
+
+    if background:
+        return await submit(IMPORT_TASK, await file.read(), {}, filename=file.filename)
+    return await run_task(IMPORT_TASK, get_database(), file.file, {})
+
+@router.post("/bulk-delete", status_code=status.HTTP_200_OK)
+async def bulk_delete_estudiantes(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False, description="Sólo contar cuántos se eliminarían"),
+    background: bool = Query(False, description="Procesar en segundo plano (avance en GET /api/jobs/{id})")
+):
+    """
+    Eliminar estudiantes masivamente basado en el RUDE del Excel.
+    """
+    check_upload(file.filename)
+
+    params = {"dry_run": dry_run}
+    if background:
+        return await submit(BULK_DELETE_TASK, await file.read(), params, filename=file.filename)
+    return await run_task(BULK_DELETE_TASK, get_database(), file.file, params)
+
 @router.get("/", response_model=PaginatedResponse[EstudianteResponse])
 async def read_estudiantes(
-    page: int = Query(1, ge=1, description="Número de página"),
-    per_page: int = Query(10, ge=1, le=100, description="Registros por página"),
+    pagination: PaginationParams = Depends(),
     q: Optional[str] = Query(None, description="Filtro de búsqueda"),
     nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
     grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
@@ -130,10 +170,14 @@ async def read_estudiantes(
     paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B, etc)")
 ):
     db = get_database()
-    items, total = await crud_estudiante.get_multi_paginated(
+    result = await crud_estudiante.get_multi_paginated(
         db, 
-        page=page, 
-        per_page=per_page, 
+        page=pagination.page, 
+        per_page=pagination.per_page, 
+        after=pagination.after,
+        include_total=pagination.include_total,
+        approx_total=pagination.approx_total,
+        schema=EstudianteResponse,
         q=q,
         nivel=nivel,
         grado=grado,
@@ -141,15 +185,85 @@ async def read_estudiantes(
         paralelo=paralelo
     )
     
-    total_pages = math.ceil(total / per_page) if per_page > 0 else 0
-    
-    return {
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "data": items
-    }
+    return json_response(
+        PaginatedResponse[EstudianteResponse], result.to_response(page=pagination.page, per_page=pagination.per_page)
+    )
+
+@router.get("/suggest", response_model=List[EstudianteSuggestion])
+async def suggest_estudiantes(
+    q: str = Query(..., min_length=1, description="Texto a autocompletar"),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Autocompletar estudiantes por nombre, apellido o RUDE"""
+    db = get_database()
+    return await crud_estudiante.suggest(db, q=q, limit=limit)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_estudiantes(
+    q: Optional[str] = Query(None, description="Filtro de búsqueda"),
+    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
+    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
+    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
+    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B, etc)")
+):
+    """
+    Exportar estudiantes como NDJSON (un EstudianteResponse por línea).
+    Mismos filtros y orden que el listado, sin paginar: se transmite desde el cursor.
+    """
+    db = get_database()
+    query = crud_estudiante.list_query(q=q, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo)
+    docs = crud_estudiante.stream(db, query, schema=EstudianteResponse, batch_size=settings.EXPORT_BATCH_SIZE)
+    return ndjson_response(EstudianteResponse, docs, filename="estudiantes.ndjson")
+
+# Columnas del importador (RUDE..Estado) + curso y padres, que el importador ignora
+XLSX_HEADERS = ("RUDE", "Nombres", "Apellidos", "Curso ID", "Estado", "Curso", "Padres")
+
+async def _xlsx_rows(db: Any, docs: AsyncIterator[dict]) -> AsyncIterator[Tuple]:
+    """Filas de la planilla; los padres de cada lote salen de una sola consulta"""
+    async for batch in in_batches(docs, settings.EXPORT_BATCH_SIZE):
+        ids = [est["_id"] for est in batch]
+        padres = defaultdict(dict)
+        cursor = db["users"].find(
+            {"role": UserRole.PADRE.value, "hijos_ids": {"$in": ids + [str(oid) for oid in ids]}},
+            {"email": 1, "hijos_ids": 1}
+        )
+        async for padre in cursor:
+            for hijo_id in padre.get("hijos_ids", []):
+                padres[as_object_id(hijo_id)][padre["email"]] = None
+
+        for est in batch:
+            curso = await catalog.get_curso(db, est.get("curso_id"))
+            yield (
+                est.get("rude"),
+                est.get("nombres"),
+                est.get("apellidos"),
+                str(est["curso_id"]) if est.get("curso_id") else None,
+                est.get("estado"),
+                curso.nombre if curso else None,
+                "; ".join(padres.get(est["_id"], {})) or None,
+            )
+
+@router.get("/export/xlsx", response_class=StreamingResponse)
+async def export_estudiantes_xlsx(
+    q: Optional[str] = Query(None, description="Filtro de búsqueda"),
+    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
+    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
+    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
+    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B, etc)")
+):
+    """
+    Exportar estudiantes a Excel con las columnas de /import
+    (RUDE, Nombres, Apellidos, Curso ID, Estado) más Curso y Padres (emails).
+    Mismos filtros que el listado.
+    """
+    db = get_database()
+    query = crud_estudiante.list_query(q=q, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo)
+    docs = crud_estudiante.stream(
+        db, query, projection={"rude": 1, "nombres": 1, "apellidos": 1, "curso_id": 1, "estado": 1},
+        batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    output = await build_xlsx("Estudiantes", XLSX_HEADERS, _xlsx_rows(db, docs))
+    return xlsx_response(output, "estudiantes.xlsx")
 
 @router.post("/", response_model=EstudianteResponse)
 async def create_estudiante(estudiante_in: EstudianteCreate):
@@ -159,7 +273,8 @@ async def create_estudiante(estudiante_in: EstudianteCreate):
 @router.get("/mis-hijos", response_model=List[HijoSimpleResponse])
 async def get_mis_hijos(
     padre_id: Optional[str] = Query(None, description="ID del padre (solo para admins)"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loader: Loader = Depends(get_loader)
 ):
     """
     Obtener lista de hijos de un padre.
@@ -181,7 +296,7 @@ async def get_mis_hijos(
                 )
             
             # Buscar el padre
-            padre = await db["users"].find_one({"_id": ObjectId(padre_id)})
+            padre = await loader.load("users", padre_id)
             
             if not padre:
                 # Intentar buscar sin importar el tipo de ID
@@ -204,25 +319,26 @@ async def get_mis_hijos(
             if not hijos_ids:
                 return []
             
-            # Convertir IDs a ObjectId si son strings
-            object_ids = [ObjectId(hid) if isinstance(hid, str) else hid for hid in hijos_ids]
-            estudiantes = await db["estudiantes"].find({"_id": {"$in": object_ids}}).to_list(100)
+            # Una sola consulta $in (acepta ids string u ObjectId, sin repetidos)
+            hijos = await loader.load_many("estudiantes", hijos_ids)
+            estudiantes = list({est["_id"]: est for est in hijos if est}.values())
         else:
-            # Admin sin padre_id: ver todos los estudiantes
-            estudiantes = await db["estudiantes"].find({}).to_list(1000)
+            # Admin sin padre_id: ver todos los estudiantes (sólo los campos de la respuesta)
+            estudiantes = await db["estudiantes"].find(
+                {}, {"nombres": 1, "apellidos": 1, "curso_id": 1}
+            ).to_list(None)
     else:
         # Padres solo ven sus propios hijos (ignorar padre_id)
         hijos_ids = current_user.get("hijos_ids", [])
         if not hijos_ids:
             return []
             
-        # Convertir IDs a ObjectId si son strings
-        object_ids = [ObjectId(hid) if isinstance(hid, str) else hid for hid in hijos_ids]
-        
-        # Buscar estudiantes
-        estudiantes = await db["estudiantes"].find({"_id": {"$in": object_ids}}).to_list(100)
+        # Buscar estudiantes (una sola consulta $in, sin repetidos)
+        hijos = await loader.load_many("estudiantes", hijos_ids)
+        estudiantes = list({est["_id"]: est for est in hijos if est}.values())
     
-    # Simplificar respuesta
+    # Simplificar respuesta (los cursos salen del catálogo en memoria)
+    await catalog.load(db)
     results = []
     for est in estudiantes:
         hijo_data = {
@@ -231,15 +347,15 @@ async def get_mis_hijos(
             "apellidos": est.get("apellidos", "")
         }
         
-        # Si el estudiante tiene curso_id, buscar la información del curso
+        # Si el estudiante tiene curso_id, agregar la información del curso
         if est.get("curso_id"):
-            curso = await db["cursos"].find_one({"_id": ObjectId(est["curso_id"]) if isinstance(est["curso_id"], str) else est["curso_id"]})
+            curso = await catalog.get_curso(db, est["curso_id"])
             if curso:
                 hijo_data["curso"] = {
-                    "nombre": curso.get("nombre", ""),
-                    "nivel": curso.get("nivel", ""),
-                    "turno": curso.get("turno", ""),
-                    "paralelo": curso.get("paralelo", "")
+                    "nombre": curso.nombre,
+                    "nivel": curso.nivel,
+                    "turno": curso.turno,
+                    "paralelo": curso.paralelo
                 }
         
         results.append(hijo_data)
@@ -249,7 +365,7 @@ async def get_mis_hijos(
 @router.get("/{id}", response_model=EstudianteResponse)
 async def read_estudiante(id: str):
     db = get_database()
-    estudiante = await crud_estudiante.get(db, id=id)
+    estudiante = await crud_estudiante.get(db, id=id, schema=EstudianteResponse)
     if not estudiante:
         raise HTTPException(status_code=404, detail="Estudiante not found")
     return estudiante
@@ -257,17 +373,17 @@ async def read_estudiante(id: str):
 @router.put("/{id}", response_model=EstudianteResponse)
 async def update_estudiante(id: str, estudiante_in: EstudianteUpdate):
     db = get_database()
-    estudiante = await crud_estudiante.get(db, id=id)
+    estudiante = await crud_estudiante.update(db, id=id, obj_in=estudiante_in)
     if not estudiante:
         raise HTTPException(status_code=404, detail="Estudiante not found")
-    return await crud_estudiante.update(db, db_obj=estudiante, obj_in=estudiante_in)
+    return estudiante
 
 @router.delete("/{id}", response_model=EstudianteResponse)
 async def delete_estudiante(id: str):
     db = get_database()
-    estudiante = await crud_estudiante.get(db, id=id)
+    estudiante = await crud_estudiante.remove(db, id=id)
     if not estudiante:
         raise HTTPException(status_code=404, detail="Estudiante not found")
-    return await crud_estudiante.remove(db, id=id)
+    return estudiante
 
 
@@ -4,13 +4,15 @@ from app.crud.crud_evento import evento as crud_evento
 from app.schemas.evento_schema import EventoCreate, EventoUpdate, EventoResponse
 
 from app.core.database import get_database
+from app.core.responses import json_response
 
 router = APIRouter()
 
 @router.get("/", response_model=List[EventoResponse])
 async def read_eventos(skip: int = 0, limit: int = 100):
     db = get_database()
-    return await crud_evento.get_multi(db, skip=skip, limit=limit)
+    eventos = await crud_evento.get_multi(db, skip=skip, limit=limit, schema=EventoResponse)
+    return json_response(List[EventoResponse], eventos)
 
 @router.post("/", response_model=EventoResponse)
 async def create_evento(evento_in: EventoCreate):
@@ -55,7 +57,7 @@ async def create_evento(evento_in: EventoCreate):
 @router.get("/{id}", response_model=EventoResponse)
 async def read_evento(id: str):
     db = get_database()
-    evento = await crud_evento.get(db, id=id)
+    evento = await crud_evento.get(db, id=id, schema=EventoResponse)
     if not evento:
         raise HTTPException(status_code=404, detail="Evento not found")
     return evento
@@ -63,15 +65,15 @@ async def read_evento(id: str):
 @router.put("/{id}", response_model=EventoResponse)
 async def update_evento(id: str, evento_in: EventoUpdate):
     db = get_database()
-    evento = await crud_evento.get(db, id=id)
+    evento = await crud_evento.update(db, id=id, obj_in=evento_in)
     if not evento:
         raise HTTPException(status_code=404, detail="Evento not found")
-    return await crud_evento.update(db, db_obj=evento, obj_in=evento_in)
+    return evento
 
 @router.delete("/{id}", response_model=EventoResponse)
 async def delete_evento(id: str):
     db = get_database()
-    evento = await crud_evento.get(db, id=id)
+    evento = await crud_evento.remove(db, id=id)
     if not evento:
         raise HTTPException(status_code=404, detail="Evento not found")
-    return await crud_evento.remove(db, id=id)
+    return evento
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.auth_router import get_current_admin
+from app.core.database import get_database
+from app.core.jobs import get_job
+from app.schemas.job_schema import JobResponse
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def read_job(job_id: str, current_user: dict = Depends(get_current_admin)):
+    """
+    Avance de una importación o eliminación masiva enviada con `background=true`.
+    Consultar hasta que `status` sea done (la respuesta de la operación está en
+    `result`) o failed (motivo en `error`). Sólo administradores.
+    """
+    db = get_database()
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
@@ -2,14 +2,17 @@ import os
 import shutil
 import uuid
 from typing import List, Optional
-import math
 from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form, status, Depends
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 
 from app.crud.crud_libreta import libreta as crud_libreta
 from app.schemas.libreta_schema import LibretaCreate, LibretaUpdate, LibretaResponse
-from app.schemas.common import PaginatedResponse
+from app.schemas.common import PaginatedResponse, PaginationParams
+from app.crud.pagination import EMPTY_PAGE
 from app.core.database import get_database
+from app.core.responses import json_response, ndjson_response
+from app.core.config import settings
 from app.models.libreta_model import EstadoDocumento
 from app.models.malla_curricular_model import NivelEducativo
 from app.models.curso_model import TurnoCurso
@@ -22,33 +25,17 @@ from app.core.cloudinary_service import upload_image, delete_image
 
 router = APIRouter()
 
-@router.get("/", response_model=PaginatedResponse[LibretaResponse])
-async def read_libretas(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(10, ge=1, le=100),
-    q: Optional[str] = None,
-    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
-    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
-    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
-    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B, etc)"),
-    estado_documento: Optional[EstadoDocumento] = Query(None, description="Estado del documento"),
-    current_user: dict = Depends(get_current_user)
-):
+def _libretas_scope(current_user: dict, estado_documento: Optional[EstadoDocumento]) -> Optional[dict]:
     """
-    Listar libretas.
-    - Admins: Ven todo.
-    - Padres: Ven solo las de sus hijos.
+    Filtros RBAC de libretas: admins sin restricción; padres sólo las de sus
+    hijos. None si el padre no tiene hijos (no puede ver nada).
     """
-    db = get_database()
-    
     rbac_filters = {}
     if current_user["role"] != UserRole.ADMIN:
         # Parents only see their children
         user_hijos_ids = current_user.get("hijos_ids", [])
         if not user_hijos_ids:
-             return {
-                "total": 0, "page": page, "per_page": per_page, "total_pages": 0, "data": []
-            }
+            return None
         
         # Ensure ObjectIds
         hijos_oids = [ObjectId(hid) if isinstance(hid, str) else hid for hid in user_hijos_ids]
@@ -59,11 +46,38 @@ async def read_libretas(
         # Typically parents only see PUBLICADA.
         if not estado_documento:
              rbac_filters["estado_documento"] = EstadoDocumento.PUBLICADA
+    return rbac_filters
+
+@router.get("/", response_model=PaginatedResponse[LibretaResponse])
+async def read_libretas(
+    pagination: PaginationParams = Depends(),
+    q: Optional[str] = None,
+    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
+    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
+    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
+    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B, etc)"),
+    estado_documento: Optional[EstadoDocumento] = Query(None, description="Estado del documento"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Listar libretas.
+    - Admins: Ven todo.
+    - Padres: Ven solo las de sus hijos.
+    """
+    db = get_database()
     
-    items, total = await crud_libreta.get_paginated(
+    rbac_filters = _libretas_scope(current_user, estado_documento)
+    if rbac_filters is None:
+        return EMPTY_PAGE.to_response(page=pagination.page, per_page=pagination.per_page)
+    
+    result = await crud_libreta.get_paginated(
         db, 
-        page=page, 
-        per_page=per_page, 
+        page=pagination.page, 
+        per_page=pagination.per_page, 
+        after=pagination.after,
+        include_total=pagination.include_total,
+        approx_total=pagination.approx_total,
+        schema=LibretaResponse,
         q=q,
         filters=rbac_filters,
         nivel=nivel,
@@ -73,15 +87,35 @@ async def read_libretas(
         estado_documento=estado_documento
     )
     
-    total_pages = math.ceil(total / per_page) if per_page > 0 else 0
+    return json_response(
+        PaginatedResponse[LibretaResponse], result.to_response(page=pagination.page, per_page=pagination.per_page)
+    )
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_libretas(
+    q: Optional[str] = None,
+    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
+    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
+    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
+    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B, etc)"),
+    estado_documento: Optional[EstadoDocumento] = Query(None, description="Estado del documento"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exportar libretas como NDJSON (una LibretaResponse por línea).
+    Mismos filtros y permisos que el listado.
+    """
+    db = get_database()
+    rbac_filters = _libretas_scope(current_user, estado_documento)
+    if rbac_filters is None:
+        rbac_filters = {"_id": {"$exists": False}}  # Padre sin hijos: exportación vacía
     
-    return {
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "data": items
-    }
+    query = crud_libreta.list_query(
+        q=q, filters=rbac_filters, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo,
+        estado_documento=estado_documento
+    )
+    docs = crud_libreta.stream(db, query, schema=LibretaResponse, batch_size=settings.EXPORT_BATCH_SIZE)
+    return ndjson_response(LibretaResponse, docs, filename="libretas.ndjson")
 
 @router.post("/", response_model=LibretaResponse)
 async def create_libreta(
@@ -168,7 +202,7 @@ async def read_libreta(
     current_user: dict = Depends(get_current_user)
 ):
     db = get_database()
-    libreta = await crud_libreta.get(db, id=id)
+    libreta = await crud_libreta.get(db, id=id, schema=LibretaResponse)
     if not libreta:
         raise HTTPException(status_code=404, detail="Libreta not found")
     
@@ -218,6 +252,8 @@ async def update_libreta(
     if new_file_url: update_data["archivo_path"] = new_file_url
 
     updated_libreta = await crud_libreta.update_generic(db, db_obj=libreta_db, update_data=update_data)
+    if not updated_libreta:
+        raise HTTPException(status_code=404, detail="Libreta not found")
 
     # === ENVIAR NOTIFICACIÓN SI CAMBIA A PUBLICADA ===
     # Solo notificar si el nuevo estado es PUBLICADA y el anterior no lo era
@@ -265,12 +301,10 @@ async def delete_libreta(
     current_user: dict = Depends(get_current_admin)
 ):
     db = get_database()
-    libreta = await crud_libreta.get(db, id=id)
-    if not libreta:
-        raise HTTPException(status_code=404, detail="Libreta not found")
-        
     # Optional: Delete from Cloudinary?
     # We don't store Public ID easily in this model (just URL), so skipping for now unless we parse it.
     # Cloudinary URLs usually: .../upload/.../folder/public_id.ext
-    
-    return await crud_libreta.remove(db, id=id)
+    libreta = await crud_libreta.remove(db, id=id)
+    if not libreta:
+        raise HTTPException(status_code=404, detail="Libreta not found")
+    return libreta
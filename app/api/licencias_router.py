@@ -1,12 +1,17 @@
 from fastapi import APIRouter, HTTPException, status, Depends, Query, UploadFile, File, Form, Body
 from typing import List, Optional, Any
-import math
 from app.crud.crud_licencia import licencia as crud_licencia
-from app.schemas.common import PaginatedResponse
+from app.crud.loader import Loader, get_loader
+from app.schemas.common import PaginatedResponse, PaginationParams
 from datetime import datetime, date
 from bson import ObjectId
 
 from app.core.database import get_database
+from app.core.responses import json_response, ndjson_response
+from app.core.config import settings
+from fastapi.responses import StreamingResponse
+from app.core.search import search_document_fields
+from app.core.cache import bump_write_version
 from app.core.cloudinary_service import upload_image
 from app.models.common import UserRole
 from app.models.malla_curricular_model import NivelEducativo
@@ -109,8 +114,10 @@ async def create_licencia_with_file(
     licencia_dict["estado"] = "PENDIENTE"
     licencia_dict["created_at"] = datetime.utcnow()
     licencia_dict["updated_at"] = datetime.utcnow()
+    licencia_dict.update(search_document_fields("licencias", licencia_dict))
 
     res = await db["licencias"].insert_one(licencia_dict)
+    bump_write_version("licencias")
     
     # Respuesta
     licencia_dict["_id"] = str(res.inserted_id)
@@ -120,10 +127,17 @@ async def create_licencia_with_file(
 
     return licencia_dict
 
+def _licencias_scope(current_user: dict) -> dict:
+    """Administradores: todas las licencias. Padres: sólo las propias (por padre_id)"""
+    if current_user["role"] == UserRole.ADMIN:
+        return {}
+    # Asegurarse de usar el ObjectId correcto
+    return {"padre_id": ObjectId(current_user["_id"]) if isinstance(current_user["_id"], str) else current_user["_id"]}
+
+
 @router.get("/", response_model=PaginatedResponse[LicenciaResponse])
 async def list_licencias(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(10, ge=1, le=100),
+    pagination: PaginationParams = Depends(),
     q: Optional[str] = None,
     # Nuevos filtros
     nivel: Optional[NivelEducativo] = None,
@@ -141,16 +155,16 @@ async def list_licencias(
     db = get_database()
     
     # Construir el filtro según el rol del usuario
-    filter_query = {}
-    if current_user["role"] != UserRole.ADMIN:
-        # Los padres solo ven sus propias licencias (filtrar por padre_id)
-        # Asegurarse de usar el ObjectId correcto
-        filter_query = {"padre_id": ObjectId(current_user["_id"]) if isinstance(current_user["_id"], str) else current_user["_id"]}
+    filter_query = _licencias_scope(current_user)
     
-    items, total = await crud_licencia.get_paginated(
+    result = await crud_licencia.get_paginated(
         db, 
-        page=page, 
-        per_page=per_page, 
+        page=pagination.page, 
+        per_page=pagination.per_page, 
+        after=pagination.after,
+        include_total=pagination.include_total,
+        approx_total=pagination.approx_total,
+        schema=LicenciaResponse,
         q=q, 
         filters=filter_query,
         # Pasar nuevos filtros
@@ -160,29 +174,31 @@ async def list_licencias(
         paralelo=paralelo
     )
     
-    # Convertir ObjectId a string y fechas a date
-    processed_items = []
-    for licencia in items:
-        # Pydantic model dump to dict to manipulate fields if needed, 
-        # but since we return PaginatedResponse[LicenciaResponse], Pydantic should handle validation if we pass objects.
-        # However, our CRUD returns LicenciaModel objects. 
-        # If we need exact same processing as before (converting ObjectId to str for response):
-        # The Response Model handles serialization of ObjectId -> str usually if configured.
-        # Check LicenciaResponse/Model config.
-        # But previous code did manual conversion. Let's rely on Pydantic's from_attributes or just pass models.
-        # Our BaseModels have json_encoders for ObjectId.
-        processed_items.append(licencia)
-    
-    # Calcular total de páginas
-    total_pages = math.ceil(total / per_page) if per_page > 0 else 0
-    
-    return {
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "data": processed_items
-    }
+    # Documentos crudos: se validan y serializan una sola vez (ObjectId -> str)
+    return json_response(
+        PaginatedResponse[LicenciaResponse], result.to_response(page=pagination.page, per_page=pagination.per_page)
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_licencias(
+    q: Optional[str] = None,
+    nivel: Optional[NivelEducativo] = None,
+    grado: Optional[GradoFilter] = None,
+    turno: Optional[TurnoCurso] = None,
+    paralelo: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exportar licencias como NDJSON (una LicenciaResponse por línea).
+    Mismos filtros y permisos que el listado: los padres sólo exportan las propias.
+    """
+    db = get_database()
+    query = await crud_licencia.list_query(
+        db, q=q, filters=_licencias_scope(current_user), nivel=nivel, grado=grado, turno=turno, paralelo=paralelo
+    )
+    docs = crud_licencia.stream(db, query, schema=LicenciaResponse, batch_size=settings.EXPORT_BATCH_SIZE)
+    return ndjson_response(LicenciaResponse, docs, filename="licencias.ndjson")
 
 
 @router.get("/{licencia_id}", response_model=LicenciaResponse)
@@ -286,10 +302,12 @@ async def update_licencia(
             update_data["fecha_fin"] = datetime.combine(update_data["fecha_fin"], datetime.min.time())
         
         update_data["updated_at"] = datetime.utcnow()
+        update_data.update(search_document_fields("licencias", {**licencia, **update_data}))
         await collection.update_one(
             {"_id": ObjectId(licencia_id)},
             {"$set": update_data}
         )
+        bump_write_version("licencias")
     
     # Obtener y retornar la licencia actualizada
     updated_licencia = await collection.find_one({"_id": ObjectId(licencia_id)})
@@ -336,6 +354,7 @@ async def delete_licencia(
     
     # Eliminar la licencia
     await collection.delete_one({"_id": ObjectId(licencia_id)})
+    bump_write_version("licencias")
     
     return None
 
@@ -343,7 +362,8 @@ async def delete_licencia(
 @router.post("/{licencia_id}/aprobar", response_model=LicenciaResponse)
 async def aprobar_licencia(
     licencia_id: str,
-    current_user: dict = Depends(get_current_admin)
+    current_user: dict = Depends(get_current_admin),
+    loader: Loader = Depends(get_loader)
 ):
     """Aprobar una licencia (solo administradores)"""
     if not ObjectId.is_valid(licencia_id):
@@ -367,8 +387,13 @@ async def aprobar_licencia(
     # Actualizar el estado a APROBADA
     await collection.update_one(
         {"_id": ObjectId(licencia_id)},
-        {"$set": {"estado": "APROBADA", "updated_at": datetime.utcnow()}}
+        {"$set": {
+            "estado": "APROBADA",
+            "updated_at": datetime.utcnow(),
+            **search_document_fields("licencias", {**licencia, "estado": "APROBADA"})
+        }}
     )
+    bump_write_version("licencias")
     
     # === ENVIAR NOTIFICACIÓN AL PADRE ===
     from app.crud.crud_notificacion import notificacion as crud_notificacion
@@ -380,7 +405,7 @@ async def aprobar_licencia(
         estudiante_nombre = "su hijo/a"
         
         if estudiante_id:
-            estudiante = await db["estudiantes"].find_one({"_id": estudiante_id})
+            estudiante = await loader.load("estudiantes", estudiante_id)
             if estudiante:
                 estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
         
@@ -412,7 +437,8 @@ async def aprobar_licencia(
 @router.post("/{licencia_id}/rechazar", response_model=LicenciaResponse)
 async def rechazar_licencia(
     licencia_id: str,
-    current_user: dict = Depends(get_current_admin)
+    current_user: dict = Depends(get_current_admin),
+    loader: Loader = Depends(get_loader)
 ):
     """Rechazar una licencia (solo administradores)"""
     if not ObjectId.is_valid(licencia_id):
@@ -436,8 +462,13 @@ async def rechazar_licencia(
     # Actualizar el estado a RECHAZADA
     await collection.update_one(
         {"_id": ObjectId(licencia_id)},
-        {"$set": {"estado": "RECHAZADA", "updated_at": datetime.utcnow()}}
+        {"$set": {
+            "estado": "RECHAZADA",
+            "updated_at": datetime.utcnow(),
+            **search_document_fields("licencias", {**licencia, "estado": "RECHAZADA"})
+        }}
     )
+    bump_write_version("licencias")
     
     # === ENVIAR NOTIFICACIÓN AL PADRE ===
     from app.crud.crud_notificacion import notificacion as crud_notificacion
@@ -449,7 +480,7 @@ async def rechazar_licencia(
         estudiante_nombre = "su hijo/a"
         
         if estudiante_id:
-            estudiante = await db["estudiantes"].find_one({"_id": estudiante_id})
+            estudiante = await loader.load("estudiantes", estudiante_id)
             if estudiante:
                 estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
         
@@ -482,7 +513,8 @@ async def rechazar_licencia(
 async def comentar_licencia(
     licencia_id: str,
     comentario: str = Body(..., embed=True),
-    current_user: dict = Depends(get_current_admin)
+    current_user: dict = Depends(get_current_admin),
+    loader: Loader = Depends(get_loader)
 ):
     """
     Agregar un comentario/respuesta del administrador a una licencia.
@@ -511,6 +543,7 @@ async def comentar_licencia(
         {"_id": ObjectId(licencia_id)},
         {"$set": {"respuesta_admin": comentario, "updated_at": datetime.utcnow()}}
     )
+    bump_write_version("licencias")
     
     # === ENVIAR NOTIFICACIÓN AL PADRE ===
     from app.crud.crud_notificacion import notificacion as crud_notificacion
@@ -522,7 +555,7 @@ async def comentar_licencia(
         estudiante_nombre = "su hijo/a"
         
         if estudiante_id:
-            estudiante = await db["estudiantes"].find_one({"_id": estudiante_id})
+            estudiante = await loader.load("estudiantes", estudiante_id)
             if estudiante:
                 estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
         
@@ -3,6 +3,7 @@ from typing import List, Optional
 from bson import ObjectId
 
 from app.core.database import get_database
+from app.core.responses import json_response
 from app.models.common import UserRole
 from app.models.notificacion_model import TipoNotificacion
 from app.schemas.notificacion_schema import (
@@ -180,6 +181,7 @@ async def list_notificaciones(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     is_read: Optional[bool] = Query(None, description="Filtrar por estado de lectura"),
+    after: Optional[str] = Query(None, description="Cursor de la página siguiente (header X-Next-Cursor); ignora skip"),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -187,18 +189,24 @@ async def list_notificaciones(
     
     - Los usuarios solo ven sus propias notificaciones
     - Se pueden filtrar por estado de lectura
+    - Si hay más resultados, el header `X-Next-Cursor` trae el cursor para `after`
     """
     db = get_database()
     
-    notifications = await crud_notificacion.get_by_user(
+    notifications, next_cursor = await crud_notificacion.get_by_user(
         db,
         user_id=current_user["_id"],
         skip=skip,
         limit=limit,
-        is_read=is_read
+        is_read=is_read,
+        after=after
     )
     
-    return notifications
+    response = json_response(List[NotificacionResponse], notifications)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return response
 
 
 @router.get("/unread-count", response_model=dict)
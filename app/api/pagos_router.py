@@ -1,64 +1,79 @@
+import asyncio
 from typing import List, Optional
-import math
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.crud.crud_pago import pago as crud_pago
+from app.crud.loader import Loader, get_loader
 from app.schemas.pago_schema import PagoCreate, PagoUpdate, PagoResponse
-from app.schemas.common import PaginatedResponse
+from app.schemas.common import PaginatedResponse, PaginationParams
 from app.core.database import get_database
+from app.core.responses import json_response, ndjson_response
+from app.core.config import settings
+from app.core.search import search_document_fields
+from app.core.cache import bump_write_version
 
 router = APIRouter()
 
 @router.get("/", response_model=PaginatedResponse[PagoResponse])
 async def read_pagos(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(10, ge=1, le=100),
+    pagination: PaginationParams = Depends(),
     q: Optional[str] = None
 ):
     db = get_database()
-    items, total = await crud_pago.get_paginated(db, page=page, per_page=per_page, q=q)
-    
-    # Calcular total de páginas
-    total_pages = math.ceil(total / per_page) if per_page > 0 else 0
+    result = await crud_pago.get_paginated(
+        db,
+        page=pagination.page,
+        per_page=pagination.per_page,
+        after=pagination.after,
+        include_total=pagination.include_total,
+        approx_total=pagination.approx_total,
+        schema=PagoResponse,
+        q=q
+    )
     
-    return {
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "data": items
-    }
+    return json_response(
+        PaginatedResponse[PagoResponse], result.to_response(page=pagination.page, per_page=pagination.per_page)
+    )
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_pagos(q: Optional[str] = None):
+    """Exportar pagos como NDJSON (un PagoResponse por línea), con el filtro del listado"""
+    db = get_database()
+    docs = crud_pago.stream(db, crud_pago.list_query(q=q), schema=PagoResponse, batch_size=settings.EXPORT_BATCH_SIZE)
+    return ndjson_response(PagoResponse, docs, filename="pagos.ndjson")
 
 @router.post("/", response_model=PagoResponse)
-async def create_pago(pago_in: PagoCreate):
+async def create_pago(pago_in: PagoCreate, loader: Loader = Depends(get_loader)):
     db = get_database()
     pago = await crud_pago.create(db, obj_in=pago_in)
     
     # === ENVIAR NOTIFICACIÓN A TODOS LOS ADMINS SI HAY COMPROBANTE ===
     # Solo notificar si el pago tiene comprobante (padre subió evidencia)
-    if pago.get("comprobante"):
+    # crud_pago.create devuelve un PagoModel (no un dict)
+    if pago.comprobante:
         from app.crud.crud_notificacion import notificacion as crud_notificacion
         from app.models.common import UserRole
         from bson import ObjectId
         
         try:
             # Obtener información del estudiante y padre para el mensaje
-            estudiante_id = pago.get("estudiante_id")
-            padre_id = pago.get("padre_id")
-            concepto = pago.get("concepto", "pago")
-            monto = pago.get("monto", 0)
+            estudiante_id = pago.estudiante_id
+            padre_id = pago.padre_id
+            concepto = pago.concepto or "pago"
+            monto = pago.monto or 0
             
             estudiante_nombre = "un estudiante"
             padre_nombre = "un padre"
             
-            if estudiante_id:
-                estudiante = await db["estudiantes"].find_one({"_id": ObjectId(estudiante_id) if isinstance(estudiante_id, str) else estudiante_id})
-                if estudiante:
-                    estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
-            
-            if padre_id:
-                padre = await db["users"].find_one({"_id": ObjectId(padre_id) if isinstance(padre_id, str) else padre_id})
-                if padre:
-                    padre_nombre = f"{padre.get('nombre', '')} {padre.get('apellido', '')}".strip()
+            # Estudiante y padre se piden juntos (el loader ignora ids vacíos)
+            estudiante, padre = await asyncio.gather(
+                loader.load("estudiantes", estudiante_id),
+                loader.load("users", padre_id)
+            )
+            if estudiante:
+                estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
+            if padre:
+                padre_nombre = f"{padre.get('nombre', '')} {padre.get('apellido', '')}".strip()
             
             # Obtener todos los admins activos
             users_collection = db["users"]
@@ -77,7 +92,7 @@ async def create_pago(pago_in: PagoCreate):
                         "title": "Nuevo Comprobante de Pago 💰",
                         "message": f"{padre_nombre} ha registrado un pago de Bs. {monto:.2f} para {estudiante_nombre} ({concepto})",
                         "user_id": admin["_id"],
-                        "related_id": ObjectId(pago["_id"]) if isinstance(pago.get("_id"), str) else pago.get("_id")
+                        "related_id": ObjectId(pago.id)
                     }
                     notifications_to_create.append(notif_data)
                 
@@ -92,7 +107,7 @@ async def create_pago(pago_in: PagoCreate):
 @router.get("/{id}", response_model=PagoResponse)
 async def read_pago(id: str):
     db = get_database()
-    pago = await crud_pago.get(db, id=id)
+    pago = await crud_pago.get(db, id=id, schema=PagoResponse)
     if not pago:
         raise HTTPException(status_code=404, detail="Pago not found")
     return pago
@@ -100,22 +115,22 @@ async def read_pago(id: str):
 @router.put("/{id}", response_model=PagoResponse)
 async def update_pago(id: str, pago_in: PagoUpdate):
     db = get_database()
-    pago = await crud_pago.get(db, id=id)
+    pago = await crud_pago.update(db, id=id, obj_in=pago_in)
     if not pago:
         raise HTTPException(status_code=404, detail="Pago not found")
-    return await crud_pago.update(db, db_obj=pago, obj_in=pago_in)
+    return pago
 
 @router.delete("/{id}", response_model=PagoResponse)
 async def delete_pago(id: str):
     db = get_database()
-    pago = await crud_pago.get(db, id=id)
+    pago = await crud_pago.remove(db, id=id)
     if not pago:
         raise HTTPException(status_code=404, detail="Pago not found")
-    return await crud_pago.remove(db, id=id)
+    return pago
 
 
 @router.post("/{id}/aprobar", response_model=PagoResponse)
-async def aprobar_pago(id: str):
+async def aprobar_pago(id: str, loader: Loader = Depends(get_loader)):
     """Aprobar un pago (cambiar estado a PAGADO)"""
     from bson import ObjectId
     from datetime import datetime
@@ -141,11 +156,13 @@ async def aprobar_pago(id: str):
     # Actualizar fecha de resolución en el comprobante si existe
     if pago.get("comprobante"):
         update_data["comprobante.fecha_resolucion"] = datetime.utcnow()
+    update_data.update(search_document_fields("pagos", {**pago, **update_data}))
     
     await collection.update_one(
         {"_id": ObjectId(id)},
         {"$set": update_data}
     )
+    bump_write_version("pagos")
     
     # === ENVIAR NOTIFICACIÓN AL PADRE ===
     from app.crud.crud_notificacion import notificacion as crud_notificacion
@@ -159,7 +176,7 @@ async def aprobar_pago(id: str):
         estudiante_nombre = "su hijo/a"
         
         if estudiante_id:
-            estudiante = await db["estudiantes"].find_one({"_id": estudiante_id})
+            estudiante = await loader.load("estudiantes", estudiante_id)
             if estudiante:
                 estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
         
@@ -184,7 +201,7 @@ async def aprobar_pago(id: str):
 
 
 @router.post("/{id}/rechazar", response_model=PagoResponse)
-async def rechazar_pago(id: str):
+async def rechazar_pago(id: str, loader: Loader = Depends(get_loader)):
     """Rechazar un pago (cambiar estado a RECHAZADO)"""
     from bson import ObjectId
     from datetime import datetime
@@ -210,11 +227,13 @@ async def rechazar_pago(id: str):
     # Actualizar fecha de resolución en el comprobante si existe
     if pago.get("comprobante"):
         update_data["comprobante.fecha_resolucion"] = datetime.utcnow()
+    update_data.update(search_document_fields("pagos", {**pago, **update_data}))
     
     await collection.update_one(
         {"_id": ObjectId(id)},
         {"$set": update_data}
     )
+    bump_write_version("pagos")
     
     # === ENVIAR NOTIFICACIÓN AL PADRE ===
     from app.crud.crud_notificacion import notificacion as crud_notificacion
@@ -228,7 +247,7 @@ async def rechazar_pago(id: str):
         estudiante_nombre = "su hijo/a"
         
         if estudiante_id:
-            estudiante = await db["estudiantes"].find_one({"_id": estudiante_id})
+            estudiante = await loader.load("estudiantes", estudiante_id)
             if estudiante:
                 estudiante_nombre = f"{estudiante.get('nombre', '')} {estudiante.get('apellido', '')}".strip()
         
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, status, Query, Body
-from typing import List, Optional
-import math
+from fastapi import APIRouter, HTTPException, UploadFile, File, status, Query, Body, Depends
+from functools import partial
+from typing import Any, AsyncIterator, List, Optional, Tuple
 from app.crud.crud_papa import papa as crud_papa
-from app.schemas.papa_schema import PapaCreate, PapaUpdate, PapaResponse
-from app.schemas.common import PaginatedResponse
+from app.schemas.papa_schema import PapaCreate, PapaUpdate, PapaResponse, PapaSuggestion
+from app.schemas.common import PaginatedResponse, PaginationParams
 from app.models.common import UserRole
 from app.core.database import get_database
-from app.core.security import get_password_hash
-import openpyxl
-from io import BytesIO
+from app.core.responses import json_response, ndjson_response
+from app.core.config import settings
+from fastapi.responses import StreamingResponse
+from app.core.excel import build_xlsx, in_batches, xlsx_response
+from app.core.ingestion import check_upload, read_rows
+from app.core.jobs import ChunkResult, Row, RowTask, register_task, run_task, submit
+from app.crud.loader import as_object_id, find_by_ids
+from app.crud.base import DUPLICATE_KEY
+from app.core.security import hash_password, hash_passwords
 from bson import ObjectId
 
 from app.models.malla_curricular_model import NivelEducativo
@@ -17,115 +23,143 @@ from app.schemas.estudiante_schema import GradoFilter
 
 router = APIRouter()
 
-@router.post("/import-padres", status_code=status.HTTP_201_CREATED)
-async def import_padres(file: UploadFile = File(...)):
+# --- Importación y eliminación masiva (en el request o como trabajo: app.core.jobs) ---
+
+async def _import_chunk(db: Any, filas: List[Row], params: dict) -> ChunkResult:
     """
-    Importar padres masivamente desde Excel (Router Papas).
-    Columnas: Email, Password, Nombre, Apellido, Telefono
+    Validar un lote, descartar los emails existentes (una consulta), hashear
+    las contraseñas en el pool de procesos e insertar el resto
     """
-    if not file.filename.endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
-
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(BytesIO(contents))
-    sheet = workbook.active
-
-    db = get_database()
-    creados = []
-    errores = []
+    validas = []  # (número de fila, PapaCreate sin contraseña, contraseña en claro)
+    errores = []  # (número de fila, mensaje)
 
-    for index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+    # 1. Validar las filas
+    for index, row in filas:
         try:
             # Asumimos orden: Email, Password, Nombre, Apellido, Telefono
-            if not row[0] or not row[1]: 
-                continue
-
-            email = row[0]
-            password = row[1]
-            nombre = row[2]
-            apellido = row[3]
-            telefono = row[4]
-
-            # Verificar si existe
-            existing = await crud_papa.get_by_email(db, email=email)
-            if existing:
-                errores.append(f"Fila {index}: Email {email} ya existe")
-                continue
-
-            # Crear objeto PapaCreate
+            email, password, nombre, apellido, telefono = row
+
+            # La contraseña se asigna ya hasheada, después de validar el resto
             user_in = PapaCreate(
                 email=email,
-                password=get_password_hash(str(password)),
                 nombre=str(nombre) if nombre else "Sin Nombre",
                 apellido=str(apellido) if apellido else "Sin Apellido",
                 telefono=str(telefono) if telefono else None,
                 role=UserRole.PADRE,
                 hijos_ids=[] 
             )
-            
-            # create maneja el mapeo password -> hashed_password si se pasa plano
-            # Aqui pasamos ya hasheado en password field. 
-            # OJO: crud_papa.create espera password plano o lo que sea que venga en 'password' field y lo mueve a hashed_password.
-            # Si pasamos hash en 'password', se guardará como 'hashed_password'. Correcto.
-            
-            nuevo_user = await crud_papa.create(db, obj_in=user_in)
-            creados.append(nuevo_user)
+            validas.append((index, user_in, str(password)))
 
         except Exception as e:
-            errores.append(f"Fila {index}: Error - {str(e)}")
+            errores.append((index, f"Error - {str(e)}"))
+
+    # 2. Emails ya registrados (una consulta) o repetidos dentro del archivo
+    existentes = set()
+    if validas:
+        cursor = db["users"].find({"email": {"$in": list({user_in.email for _, user_in, _ in validas})}}, {"email": 1})
+        existentes = {doc["email"] async for doc in cursor}
+
+    nuevos = []
+    for index, user_in, password in validas:
+        if user_in.email in existentes:
+            errores.append((index, f"Email {user_in.email} ya existe"))
+            continue
+        existentes.add(user_in.email)
+        nuevos.append((index, user_in, password))
+
+    # 3. Hashear en paralelo (sólo las filas que se van a insertar)
+    hashes = await hash_passwords([password for _, _, password in nuevos])
+    users_in = [user_in.model_copy(update={"password": hashed}) for (_, user_in, _), hashed in zip(nuevos, hashes)]
+
+    # 4. Insertar (insert_many no ordenado); un email duplicado concurrente sólo rechaza su fila
+    result = await crud_papa.create_many(db, objs_in=users_in, chunk_size=settings.IMPORT_BATCH_SIZE)
+    for position, error in result.errors.items():
+        index, user_in, _ = nuevos[position]
+        if error.get("code") == DUPLICATE_KEY:
+            errores.append((index, f"Email {user_in.email} ya existe"))
+        else:
+            errores.append((index, f"Error - {error.get('errmsg')}"))
 
+    return ChunkResult({"creados": result.inserted_count}, errores)
+
+def _import_summary(counts: dict, errores: List[str], params: dict) -> dict:
     return {
         "message": "Importación de padres finalizada",
-        "creados_count": len(creados),
+        "creados_count": counts.get("creados", 0),
         "errores": errores
     }
 
-@router.post("/bulk-delete-padres", status_code=status.HTTP_200_OK)
-async def bulk_delete_padres(file: UploadFile = File(...)):
-    """
-    Eliminar padres masivamente basado en Email del Excel.
-    """
-    if not file.filename.endswith(".xlsx"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx)")
-
-    contents = await file.read()
-    workbook = openpyxl.load_workbook(BytesIO(contents))
-    sheet = workbook.active
+# Se saltan las filas sin email o sin contraseña
+IMPORT_TASK = register_task(RowTask(
+    "papas.import", partial(read_rows, width=5, required=(0, 1)), _import_chunk, _import_summary
+))
 
-    db = get_database()
-    collection = db["users"]
-    eliminados = 0
-    errores = []
-
-    for index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-        try:
-            if not row[0]: # Email
-                continue
-            
-            email = row[0]
-            
-            # Borrar por Email
-            result = await collection.delete_one({"email": email})
-            if result.deleted_count > 0:
-                eliminados += 1
-            else:
-                errores.append(f"Fila {index}: Email {email} no encontrado")
-
-        except Exception as e:
-            errores.append(f"Fila {index}: Error - {str(e)}")
+async def _bulk_delete_chunk(db: Any, filas: List[Row], params: dict) -> ChunkResult:
+    """Borrar los usuarios de un lote de emails; los que no existen salen por diferencia"""
+    result = await crud_papa.delete_by_keys(
+        db, fields=("email",), keys=[row[:1] for _, row in filas],
+        dry_run=params["dry_run"], chunk_size=settings.IMPORT_BATCH_SIZE
+    )
+    errores = [(filas[i][0], f"Email {filas[i][1][0]} no encontrado") for i in result.not_found]
+    return ChunkResult({"eliminados": result.deleted_count, "coincidencias": result.matched_count}, errores)
 
+def _bulk_delete_summary(counts: dict, errores: List[str], params: dict) -> dict:
     return {
-        "message": "Eliminación masiva de padres finalizada",
-        "eliminados_count": eliminados,
+        "message": (
+            "Eliminación masiva de padres finalizada" if not params["dry_run"]
+            else "Simulación de eliminación masiva de padres"
+        ),
+        "eliminados_count": counts.get("eliminados", 0),
+        "coincidencias_count": counts.get("coincidencias", 0),
+        "dry_run": params["dry_run"],
         "errores": errores
     }
 
+BULK_DELETE_TASK = register_task(RowTask(
+    "papas.bulk_delete", partial(read_rows, width=1), _bulk_delete_chunk, _bulk_delete_summary
+))
+
+@router.post("/import-padres", status_code=status.HTTP_201_CREATED)
+async def import_padres(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Procesar en segundo plano (avance en GET /api/jobs/{id})")
+):
+    """
+    Importar padres masivamente desde Excel (.xlsx) o CSV (Router Papas).
+    Columnas: Email, Password, Nombre, Apellido, Telefono
+
+    Por lotes de IMPORT_BATCH_SIZE filas: se validan, los emails existentes se
+    buscan con una sola consulta, las contraseñas se hashean en paralelo en el
+    pool de procesos (sin bloquear el event loop) y los padres se insertan con
+    insert_many.
+    """
+    check_upload(file.filename)
+
+    if background:
+        return await submit(IMPORT_TASK, await file.read(), {}, filename=file.filename)
+    return await run_task(IMPORT_TASK, get_database(), file.file, {})
+
+@router.post("/bulk-delete-padres", status_code=status.HTTP_200_OK)
+async def bulk_delete_padres(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False, description="Sólo contar cuántos se eliminarían"),
+    background: bool = Query(False, description="Procesar en segundo plano (avance en GET /api/jobs/{id})")
+):
+    """
+    Eliminar padres masivamente basado en Email del Excel.
+    """
+    check_upload(file.filename)
+
+    params = {"dry_run": dry_run}
+    if background:
+        return await submit(BULK_DELETE_TASK, await file.read(), params, filename=file.filename)
+    return await run_task(BULK_DELETE_TASK, get_database(), file.file, params)
+
 # --- Papas CRUD ---
 
 @router.get("/", response_model=PaginatedResponse[PapaResponse])
 async def read_papas_list(
-    page: int = Query(1, ge=1),
-    per_page: int = Query(10, ge=1, le=100),
+    pagination: PaginationParams = Depends(),
     q: Optional[str] = None,
     nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
     grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
@@ -134,10 +168,14 @@ async def read_papas_list(
 ):
     """Listar todos los padres (Role = PADRE) con paginación y búsqueda"""
     db = get_database()
-    items, total = await crud_papa.get_paginated(
+    result = await crud_papa.get_paginated(
         db, 
-        page=page, 
-        per_page=per_page, 
+        page=pagination.page, 
+        per_page=pagination.per_page, 
+        after=pagination.after,
+        include_total=pagination.include_total,
+        approx_total=pagination.approx_total,
+        schema=PapaResponse,
         q=q,
         nivel=nivel,
         grado=grado,
@@ -145,16 +183,66 @@ async def read_papas_list(
         paralelo=paralelo
     )
     
-    # Calcular total de páginas
-    total_pages = math.ceil(total / per_page) if per_page > 0 else 0
-    
-    return {
-        "total": total,
-        "page": page,
-        "per_page": per_page,
-        "total_pages": total_pages,
-        "data": items
-    }
+    return json_response(
+        PaginatedResponse[PapaResponse], result.to_response(page=pagination.page, per_page=pagination.per_page)
+    )
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_papas(
+    q: Optional[str] = None,
+    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
+    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
+    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
+    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B)")
+):
+    """Exportar padres como NDJSON (un PapaResponse por línea), con los filtros del listado"""
+    db = get_database()
+    query = crud_papa.list_query(q=q, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo)
+    docs = crud_papa.stream(db, query, schema=PapaResponse, batch_size=settings.EXPORT_BATCH_SIZE)
+    return ndjson_response(PapaResponse, docs, filename="papas.ndjson")
+
+# Columnas de /import-padres + RUDE de los hijos (el importador la ignora).
+# Password se deja vacía: las contraseñas no se exportan.
+XLSX_HEADERS = ("Email", "Password", "Nombre", "Apellido", "Telefono", "Hijos (RUDE)")
+
+async def _xlsx_rows(db: Any, docs: AsyncIterator[dict]) -> AsyncIterator[Tuple]:
+    """Filas de la planilla; los RUDE de los hijos de cada lote salen de una sola consulta $in"""
+    async for batch in in_batches(docs, settings.EXPORT_BATCH_SIZE):
+        hijos = await find_by_ids(
+            db["estudiantes"], (hijo_id for padre in batch for hijo_id in padre.get("hijos_ids", [])), {"rude": 1}
+        )
+        for padre in batch:
+            rudes = (hijos.get(as_object_id(hijo_id), {}).get("rude") for hijo_id in padre.get("hijos_ids", []))
+            yield (
+                padre.get("email"),
+                None,
+                padre.get("nombre"),
+                padre.get("apellido"),
+                padre.get("telefono"),
+                "; ".join(str(rude) for rude in rudes if rude is not None) or None,
+            )
+
+@router.get("/export/xlsx", response_class=StreamingResponse)
+async def export_papas_xlsx(
+    q: Optional[str] = None,
+    nivel: Optional[NivelEducativo] = Query(None, description="Filtro por Nivel Educativo"),
+    grado: Optional[GradoFilter] = Query(None, description="Filtro por Grado"),
+    turno: Optional[TurnoCurso] = Query(None, description="Filtro por Turno"),
+    paralelo: Optional[str] = Query(None, description="Filtro por Paralelo (A, B)")
+):
+    """
+    Exportar padres a Excel con las columnas de /import-padres
+    (Email, Password vacía, Nombre, Apellido, Telefono) más los RUDE de sus hijos.
+    Sirve tal cual para /bulk-delete-padres. Mismos filtros que el listado.
+    """
+    db = get_database()
+    query = crud_papa.list_query(q=q, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo)
+    docs = crud_papa.stream(
+        db, query, projection={"email": 1, "nombre": 1, "apellido": 1, "telefono": 1, "hijos_ids": 1},
+        batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    output = await build_xlsx("Padres", XLSX_HEADERS, _xlsx_rows(db, docs))
+    return xlsx_response(output, "papas.xlsx")
 
 @router.post("/", response_model=PapaResponse, status_code=status.HTTP_201_CREATED)
 async def create_papa(user_in: PapaCreate):
@@ -167,18 +255,27 @@ async def create_papa(user_in: PapaCreate):
         raise HTTPException(status_code=400, detail="El email ya está registrado")
 
     if user_in.password:
-        user_in.password = get_password_hash(user_in.password)
+        user_in.password = await hash_password(user_in.password)
     
     # Force Role
     user_in.role = UserRole.PADRE
     
     return await crud_papa.create(db, obj_in=user_in)
 
+@router.get("/suggest", response_model=List[PapaSuggestion])
+async def suggest_papas(
+    q: str = Query(..., min_length=1, description="Texto a autocompletar"),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Autocompletar padres por nombre, apellido o email"""
+    db = get_database()
+    return await crud_papa.suggest(db, q=q, limit=limit)
+
 @router.get("/{id}", response_model=PapaResponse)
 async def read_papa(id: str):
     """Obtener un padre por ID"""
     db = get_database()
-    user = await crud_papa.get(db, id=id)
+    user = await crud_papa.get(db, id=id, schema=PapaResponse)
     # Check Role is PADRE? Yes
     # But user object returned is PapaModel.
     if not user or getattr(user, "role", None) != UserRole.PADRE:
@@ -189,24 +286,23 @@ async def read_papa(id: str):
 async def update_papa(id: str, user_in: PapaUpdate):
     """Actualizar un padre"""
     db = get_database()
-    user = await crud_papa.get(db, id=id)
-    if not user or getattr(user, "role", None) != UserRole.PADRE:
-        raise HTTPException(status_code=404, detail="Padre no encontrado")
-    
     if user_in.password:
-        user_in.password = get_password_hash(user_in.password)
+        user_in.password = await hash_password(user_in.password)
         
-    return await crud_papa.update(db, db_obj=user, obj_in=user_in)
+    # Sólo usuarios con rol PADRE (un solo find_one_and_update)
+    user = await crud_papa.update(db, id=id, obj_in=user_in, base_filter={"role": UserRole.PADRE.value})
+    if not user:
+        raise HTTPException(status_code=404, detail="Padre no encontrado")
+    return user
 
 @router.delete("/{id}", response_model=PapaResponse)
 async def delete_papa(id: str):
     """Eliminar un padre"""
     db = get_database()
-    user = await crud_papa.get(db, id=id)
-    if not user or getattr(user, "role", None) != UserRole.PADRE:
+    user = await crud_papa.remove(db, id=id, base_filter={"role": UserRole.PADRE.value})
+    if not user:
         raise HTTPException(status_code=404, detail="Padre no encontrado")
-    
-    return await crud_papa.remove(db, id=id)
+    return user
 
 @router.post("/{id}/hijos", response_model=PapaResponse)
 async def assign_child(id: str, child_id: str = Body(..., embed=True)):
@@ -215,13 +311,9 @@ async def assign_child(id: str, child_id: str = Body(..., embed=True)):
     Body: {"child_id": "..."}
     """
     db = get_database()
-    
-    # Verificar que el padre existe
-    user = await crud_papa.get(db, id=id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Padre no encontrado")
-        
     updated_papa = await crud_papa.add_child(db, papa_id=id, child_id=child_id)
+    if not updated_papa:
+        raise HTTPException(status_code=404, detail="Padre no encontrado")
     return updated_papa
 
 @router.delete("/{id}/hijos/{child_id}", response_model=PapaResponse)
@@ -230,11 +322,7 @@ async def unassign_child(id: str, child_id: str):
     Desvincular un hijo de un padre.
     """
     db = get_database()
-    
-    # Verificar que el padre existe
-    user = await crud_papa.get(db, id=id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Padre no encontrado")
-        
     updated_papa = await crud_papa.remove_child(db, papa_id=id, child_id=child_id)
+    if not updated_papa:
+        raise HTTPException(status_code=404, detail="Padre no encontrado")
     return updated_papa
@@ -0,0 +1,69 @@
+"""
+Cachés en memoria del proceso.
+
+Cada worker de uvicorn tiene sus propias cachés y sólo se entera de las
+escrituras que hace él mismo, por eso toda entrada tiene además un TTL que
+acota cuánto puede durar un valor desactualizado.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Caché LRU acotada con expiración por entrada y contadores de aciertos"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# Versión de escritura por colección: se incrementa en cada escritura hecha
+# por este proceso. Las claves de caché que la incluyen quedan invalidadas.
+_write_versions: Dict[str, int] = {}
+
+
+def bump_write_version(*collection_names: str) -> None:
+    for name in collection_names:
+        _write_versions[name] = _write_versions.get(name, 0) + 1
+
+
+def get_write_version(collection_name: str) -> int:
+    return _write_versions.get(collection_name, 0)
@@ -0,0 +1,132 @@
+"""
+Catálogo académico en memoria: todos los cursos y mallas curriculares.
+
+Cambian pocas veces al año, pero mis-hijos, la copia de atributos académicos
+en estudiantes y las importaciones los consultan en cada request. El catálogo los carga completos
+(son decenas de documentos) en mapas compactos y resuelve los atributos
+académicos de un curso sin ir a Mongo.
+
+Se recarga cuando:
+- cambia la versión de escritura de `cursos` o `mallas_curriculares`
+  (cualquier endpoint de escritura de este proceso la incrementa), o
+- vence el TTL (CATALOG_TTL_SECONDS), que cubre escrituras de otros procesos.
+"""
+import asyncio
+import time
+from typing import Any, Dict, NamedTuple, Optional
+from bson import ObjectId
+from app.core.cache import get_write_version
+from app.core.config import settings
+from app.crud.loader import as_object_id
+
+SOURCES = ("cursos", "mallas_curriculares")
+
+# Atributos del curso/malla copiados en cada estudiante (ver academic_fields)
+ACADEMIC_FIELDS = ("nivel", "turno", "paralelo", "anio_escolaridad", "gestion")
+
+
+class CursoEntry(NamedTuple):
+    id: ObjectId
+    nombre: str
+    paralelo: str
+    nivel: str
+    turno: str
+    malla_id: Optional[ObjectId]
+
+
+class MallaEntry(NamedTuple):
+    id: ObjectId
+    gestion: Optional[int]
+    nivel: str
+    anio_escolaridad: Optional[int]
+
+
+class AcademicCatalog:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.cursos: Dict[ObjectId, CursoEntry] = {}
+        self.mallas: Dict[ObjectId, MallaEntry] = {}
+        self._loaded_at: Optional[float] = None
+        self._versions: tuple = ()
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.ttl
+            and self._versions == tuple(get_write_version(name) for name in SOURCES)
+        )
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def load(self, db: Any) -> "AcademicCatalog":
+        """Asegurar que el catálogo esté cargado y vigente"""
+        if self._is_fresh():
+            self.hits += 1
+            return self
+        async with self._lock:
+            # Otro request pudo haberlo recargado mientras esperábamos
+            if self._is_fresh():
+                self.hits += 1
+                return self
+            self.misses += 1
+            versions = tuple(get_write_version(name) for name in SOURCES)
+
+            mallas = await db["mallas_curriculares"].find(
+                {}, projection={"gestion": 1, "nivel": 1, "anio_escolaridad": 1}
+            ).to_list(length=None)
+            cursos = await db["cursos"].find(
+                {}, projection={"nombre": 1, "paralelo": 1, "nivel": 1, "turno": 1, "malla_id": 1}
+            ).to_list(length=None)
+
+            self.mallas = {
+                m["_id"]: MallaEntry(m["_id"], m.get("gestion"), m.get("nivel", ""), m.get("anio_escolaridad"))
+                for m in mallas
+            }
+            self.cursos = {
+                c["_id"]: CursoEntry(
+                    c["_id"], c.get("nombre", ""), c.get("paralelo", ""), c.get("nivel", ""),
+                    c.get("turno", ""), as_object_id(c.get("malla_id"))
+                )
+                for c in cursos
+            }
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+        return self
+
+    async def get_curso(self, db: Any, curso_id: Any) -> Optional[CursoEntry]:
+        await self.load(db)
+        oid = as_object_id(curso_id)
+        return self.cursos.get(oid) if oid else None
+
+    async def academic_fields(self, db: Any, curso_id: Any) -> Dict[str, Any]:
+        """Atributos académicos que se desnormalizan en un estudiante de `curso_id`"""
+        curso = await self.get_curso(db, curso_id) if curso_id else None
+        if not curso:
+            return dict.fromkeys(ACADEMIC_FIELDS)
+        malla = self.mallas.get(curso.malla_id)
+        return {
+            "nivel": curso.nivel or None,
+            "turno": curso.turno or None,
+            "paralelo": curso.paralelo or None,
+            "anio_escolaridad": malla.anio_escolaridad if malla else None,
+            "gestion": malla.gestion if malla else None,
+        }
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cursos": len(self.cursos),
+            "mallas": len(self.mallas),
+            "ttl_seconds": self.ttl,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+catalog = AcademicCatalog(ttl=settings.CATALOG_TTL_SECONDS)
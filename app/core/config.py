@@ -14,7 +14,36 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(default="your-secret-key-change-in-production", env="SECRET_KEY")
     ALGORITHM: str = Field(default="HS256", env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # Tokens con _id, rol, hijos y token_version: las rutas no buscan al usuario en cada request
+    SELF_CONTAINED_TOKENS: bool = Field(default=False, env="SELF_CONTAINED_TOKENS")
     DEBUG: bool = Field(default=False, env="DEBUG")
+    # Segundos que un total cacheado puede servirse sin recontar
+    COUNT_CACHE_TTL_SECONDS: int = Field(default=60, env="COUNT_CACHE_TTL_SECONDS")
+    # Segundos que el catálogo de cursos/mallas en memoria se usa sin recargar
+    CATALOG_TTL_SECONDS: int = Field(default=300, env="CATALOG_TTL_SECONDS")
+    # Segundos que se reutiliza una lista de sugerencias (autocompletar)
+    SUGGEST_CACHE_TTL_SECONDS: int = Field(default=30, env="SUGGEST_CACHE_TTL_SECONDS")
+    # Segundos que get_current_user reutiliza el usuario de un token sin volver a buscarlo
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(default=30, env="PRINCIPAL_CACHE_TTL_SECONDS")
+    # Documentos por lote del cursor de Mongo en las exportaciones (/export)
+    EXPORT_BATCH_SIZE: int = Field(default=500, env="EXPORT_BATCH_SIZE")
+    # Filas por lote (insert_many / delete_many) en las importaciones y eliminaciones masivas
+    IMPORT_BATCH_SIZE: int = Field(default=1000, env="IMPORT_BATCH_SIZE")
+    # Lector de .xlsx en las importaciones: "auto" (calamine si está instalado), "calamine" u "openpyxl"
+    IMPORT_XLSX_ENGINE: str = Field(default="auto", env="IMPORT_XLSX_ENGINE")
+    # Procesos para hashear contraseñas en las importaciones (0 = todos los núcleos)
+    PASSWORD_HASH_WORKERS: int = Field(default=0, env="PASSWORD_HASH_WORKERS")
+    # Trabajos en segundo plano (?background=true en importaciones y eliminaciones masivas)
+    JOB_WORKERS: int = Field(default=2, env="JOB_WORKERS")  # por proceso; 0 = este proceso no los ejecuta
+    JOB_POLL_SECONDS: float = Field(default=5, env="JOB_POLL_SECONDS")
+    JOB_LEASE_SECONDS: float = Field(default=60, env="JOB_LEASE_SECONDS")
+    JOB_MAX_ATTEMPTS: int = Field(default=3, env="JOB_MAX_ATTEMPTS")
+    # Errores de un trabajo que devuelven GET /api/jobs/{id} y su resultado (el total va en errors_count)
+    JOB_ERRORS_LIMIT: int = Field(default=1000, env="JOB_ERRORS_LIMIT")
+    # Costo de bcrypt (2^rounds iteraciones). Al cambiarlo, los hashes viejos se renuevan en el login
+    BCRYPT_ROUNDS: int = Field(default=12, ge=4, le=31, env="BCRYPT_ROUNDS")
+    # Hilos para bcrypt en login, cambio de contraseña y altas (0 = un hilo por núcleo)
+    PASSWORD_VERIFY_THREADS: int = Field(default=0, env="PASSWORD_VERIFY_THREADS")
     
     # Cloudinary Configuration
     CLOUDINARY_CLOUD_NAME: Optional[str] = Field(None, env="CLOUDINARY_CLOUD_NAME")
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from app.core.config import settings
 import logging
 from datetime import datetime
@@ -8,6 +9,7 @@ logger = logging.getLogger(__name__)
 class Database:
     client: AsyncIOMotorClient = None
     db = None
+    index_report: dict = None
 
 db = Database()
 
@@ -21,6 +23,8 @@ async def connect_to_mongo():
         # Test the connection
         await db.client.admin.command('ping')
         logger.info("Successfully connected to MongoDB!")
+
+        await ensure_indexes()
     except Exception as e:
         logger.error(f"Could not connect to MongoDB: {e}")
         raise
@@ -39,10 +43,95 @@ def get_database():
     """Get database instance"""
     return db.db
 
+# Opciones que forman parte de la definición de un índice (además de las claves)
+_INDEX_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+def _index_keys(index: dict) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in dict(index["key"]).items())
+
+def _index_options(index: dict) -> dict:
+    return {option: index[option] for option in _INDEX_OPTIONS if index.get(option)}
+
+async def ensure_indexes() -> dict:
+    """
+    Crear los índices declarados en app.models.indexes que no existan y
+    reportar las diferencias con los índices actuales de cada colección.
+    Un índice que no se puede crear (ej: RUDE duplicados) se reporta en
+    "errors" sin impedir el arranque.
+    """
+    from app.models.indexes import INDEXES
+
+    database = get_database()
+    report = {"created": [], "conflicts": [], "unmanaged": [], "errors": []}
+
+    for collection_name, models in INDEXES.items():
+        collection = database[collection_name]
+        existing = {index["name"]: index async for index in collection.list_indexes()}
+        existing_by_keys = {_index_keys(index): index for index in existing.values()}
+        declared_names = set()
+
+        for model in models:
+            spec = model.document
+            declared_names.add(spec["name"])
+            current = existing.get(spec["name"]) or existing_by_keys.get(_index_keys(spec))
+
+            if current is None:
+                try:
+                    await collection.create_indexes([model])
+                    report["created"].append(f"{collection_name}.{spec['name']}")
+                except OperationFailure as e:
+                    report["errors"].append(f"{collection_name}.{spec['name']}: {e}")
+                continue
+
+            declared_names.add(current["name"])
+            if current["name"] != spec["name"]:
+                report["conflicts"].append(
+                    f"{collection_name}.{spec['name']}: existe como '{current['name']}'"
+                )
+            elif _index_keys(current) != _index_keys(spec) or _index_options(current) != _index_options(spec):
+                report["conflicts"].append(
+                    f"{collection_name}.{spec['name']}: definición distinta a la declarada"
+                )
+
+        for name in existing:
+            if name != "_id_" and name not in declared_names:
+                report["unmanaged"].append(f"{collection_name}.{name}")
+
+    if report["created"]:
+        logger.info(f"Índices creados: {', '.join(report['created'])}")
+    for conflict in report["conflicts"]:
+        logger.warning(f"Índice con drift: {conflict}")
+    for error in report["errors"]:
+        logger.error(f"No se pudo crear el índice {error}")
+
+    db.index_report = report
+    return report
+
+async def get_index_stats() -> dict:
+    """Uso de cada índice ($indexStats) en las colecciones registradas"""
+    from app.models.indexes import INDEXES
+
+    database = get_database()
+    stats = {}
+    for collection_name in INDEXES:
+        cursor = database[collection_name].aggregate([{"$indexStats": {}}])
+        stats[collection_name] = [
+            {
+                "name": index["name"],
+                "key": dict(index["key"]),
+                "ops": index["accesses"]["ops"],
+                "since": index["accesses"]["since"],
+                "unused": index["accesses"]["ops"] == 0,
+            }
+            async for index in cursor
+        ]
+    return stats
+
 async def create_super_admin():
     """Create super admin user if not exists"""
     from app.models.common import UserRole
-    from app.core.security import get_password_hash
+    from app.core.security import hash_password
     
     db_instance = get_database()
     collection = db_instance["users"]
@@ -58,7 +147,7 @@ async def create_super_admin():
             "nombre": "Brandon",
             "apellido": "Lara",
             "role": UserRole.ADMIN,
-            "hashed_password": get_password_hash("datahub12345"),
+            "hashed_password": await hash_password("datahub12345"),
             "is_active": True,
             "is_superuser": True,
             "created_at": datetime.utcnow(),
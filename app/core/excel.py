@@ -0,0 +1,73 @@
+"""
+Exportaciones a Excel (.xlsx) sin armar la planilla en memoria.
+
+El personal trabaja con las mismas planillas que aceptan los importadores
+(/estudiantes/import, /papas/import-padres, /cursos/import), así que cada
+exportación usa su mismo orden de columnas y se puede volver a subir.
+
+`build_xlsx` escribe las filas a medida que llegan del cursor con un libro
+`write_only` de openpyxl (cada fila se vuelca a un archivo temporal, no queda
+en el árbol de celdas) y guarda el .xlsx en un SpooledTemporaryFile: en
+memoria mientras es chico, en disco cuando pasa SPOOL_MAX_BYTES. `xlsx_response`
+lo transmite por bloques y lo cierra al terminar.
+
+La lectura de esas planillas al importarlas está en app.core.ingestion.
+"""
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Iterator, List, Sequence, TypeVar
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from starlette.concurrency import run_in_threadpool
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+CHUNK_BYTES = 64 * 1024
+
+T = TypeVar("T")
+
+
+async def in_batches(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    """Agrupar un iterador asíncrono en listas de hasta `size` elementos"""
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def build_xlsx(title: str, headers: Sequence[str], rows: AsyncIterator[Sequence[Any]]) -> SpooledTemporaryFile:
+    """Planilla con `headers` y las filas de `rows`; devuelve el archivo posicionado al inicio"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(list(headers))
+    async for row in rows:
+        sheet.append(list(row))
+
+    output = SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        # Comprimir el .xlsx es CPU puro: fuera del event loop
+        await run_in_threadpool(workbook.save, output)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def _read_chunks(output: SpooledTemporaryFile) -> Iterator[bytes]:
+    try:
+        while chunk := output.read(CHUNK_BYTES):
+            yield chunk
+    finally:
+        output.close()
+
+
+def xlsx_response(output: SpooledTemporaryFile, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        _read_chunks(output),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
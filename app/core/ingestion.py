@@ -0,0 +1,138 @@
+"""
+Lectura de las planillas que suben los importadores y las eliminaciones
+masivas (/import, /import-padres, /bulk-delete).
+
+`read_rows` devuelve un generador: las filas salen de a una a medida que se
+leen, sin armar el libro completo en memoria. `run_task` (app.core.jobs) lo
+recorre de a IMPORT_BATCH_SIZE filas en el threadpool, así que el parseo nunca
+corre en el event loop y cada lote se procesa apenas está leído.
+
+Formatos (se reconocen por el contenido, no por la extensión):
+
+- .xlsx: con python-calamine si está instalado (`pip install python-calamine`,
+  lector en Rust unas 10 veces más rápido; carga la hoja en una estructura
+  compacta fuera del heap de Python y la entrega fila por fila) o con openpyxl
+  en modo `read_only`. IMPORT_XLSX_ENGINE elige uno ("auto", "calamine",
+  "openpyxl").
+- .csv: separado por comas, punto y coma o tabulaciones; UTF-8 o, si no lo es,
+  Windows-1252 (lo que exporta Excel en español).
+
+`source` puede ser el contenido (bytes) o un archivo binario abierto, como el
+`UploadFile.file` de la ruta, que Starlette ya guarda en disco si es grande.
+"""
+import codecs
+import csv
+from io import BytesIO, TextIOWrapper
+from itertools import islice
+from typing import IO, Callable, Iterator, List, Sequence, Tuple, Union
+from fastapi import HTTPException
+from openpyxl import load_workbook
+from app.core.config import settings
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # dependencia opcional
+    CalamineWorkbook = None
+
+Row = Tuple[int, tuple]  # (número de fila, valores)
+Source = Union[bytes, IO[bytes]]
+
+EXTENSIONS = (".xlsx", ".csv")
+ZIP_MAGIC = b"PK\x03\x04"  # un .xlsx es un zip
+CSV_SAMPLE_BYTES = 64 * 1024
+CSV_DELIMITERS = (",", ";", "\t")
+
+
+def check_upload(filename: str) -> None:
+    if not filename.lower().endswith(EXTENSIONS):
+        raise HTTPException(status_code=400, detail="El archivo debe ser un Excel (.xlsx) o un CSV (.csv)")
+
+
+def _xlsx_openpyxl(file: IO[bytes]) -> Iterator[tuple]:
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        sheet.reset_dimensions()  # hasta la última fila aunque la dimensión guardada esté mal
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _xlsx_calamine(file: IO[bytes]) -> Iterator[tuple]:
+    workbook = CalamineWorkbook.from_filelike(file)
+    try:
+        sheet = workbook.get_sheet_by_index(0)
+        # iter_rows empieza en la fila 1 pero omite las columnas vacías de la izquierda
+        offset = ("",) * sheet.start[1] if sheet.start else ()
+        for row in sheet.iter_rows():
+            # calamine devuelve todos los números como float (1.0): openpyxl da 1
+            yield offset + tuple(
+                int(value) if isinstance(value, float) and value.is_integer() else value for value in row
+            )
+    finally:
+        workbook.close()
+
+
+def _csv(file: IO[bytes]) -> Iterator[tuple]:
+    start = file.tell()
+    sample = file.read(CSV_SAMPLE_BYTES)
+    file.seek(start)
+    try:
+        # final=False: un carácter cortado al final de la muestra no es un error
+        text = codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        text, encoding = sample.decode("cp1252", errors="replace"), "cp1252"
+    # El separador es el que más aparece en la cabecera (csv.Sniffer falla con filas de distinto largo)
+    header = text.splitlines()[0] if text else ""
+    delimiter = max(CSV_DELIMITERS, key=header.count)
+
+    wrapper = TextIOWrapper(file, encoding=encoding, errors="replace", newline="")
+    try:
+        yield from csv.reader(wrapper, delimiter=delimiter)
+    finally:
+        wrapper.detach()  # el archivo lo cierra quien lo abrió
+
+
+def _xlsx_reader() -> Callable[[IO[bytes]], Iterator[tuple]]:
+    engine = settings.IMPORT_XLSX_ENGINE
+    if engine == "calamine" or (engine == "auto" and CalamineWorkbook is not None):
+        if CalamineWorkbook is None:
+            raise RuntimeError("IMPORT_XLSX_ENGINE=calamine requiere el paquete python-calamine")
+        return _xlsx_calamine
+    return _xlsx_openpyxl
+
+
+def read_rows(source: Source, width: int, required: Sequence[int] = (0,)) -> Iterator[Row]:
+    """
+    Filas (número de fila, valores) de la primera hoja, sin la cabecera, con
+    exactamente `width` celdas (None en las vacías). Se saltan las filas sin
+    valor en alguna columna de `required`.
+    """
+    file = BytesIO(source) if isinstance(source, bytes) else source
+    start = file.tell()
+    is_xlsx = file.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+    file.seek(start)
+    reader = _xlsx_reader() if is_xlsx else _csv
+
+    rows = reader(file)
+    try:
+        for index, row in enumerate(islice(rows, 1, None), start=2):
+            # "" (CSV, calamine) y None (openpyxl) son la misma celda vacía
+            row = tuple(None if value == "" else value for value in row[:width])
+            row += (None,) * (width - len(row))
+            if all(row[column] for column in required):
+                yield index, row
+    finally:
+        rows.close()
+
+
+def take(rows: Iterator[Row], size: int) -> List[Row]:
+    """Las próximas `size` filas (menos al final del archivo); corre en el threadpool"""
+    return list(islice(rows, size))
+
+
+def skip(rows: Iterator[Row], count: int) -> None:
+    """Descartar las primeras `count` filas (retomar un trabajo desde su punto de control)"""
+    for _ in islice(rows, count):
+        pass
@@ -0,0 +1,356 @@
+"""
+Trabajos en segundo plano para las cargas masivas (importaciones y
+eliminaciones desde Excel).
+
+Cada operación es una `RowTask`: `read_rows` lee las filas de la planilla
+(app.core.ingestion) y `process` procesa un lote (validar, consultar,
+escribir). `run_task` las va leyendo de a IMPORT_BATCH_SIZE filas en el
+threadpool y procesa cada lote apenas está leído, tanto dentro del request
+como en un trabajo.
+
+Con `?background=true` la ruta guarda el archivo en `job_files` (en partes de
+FILE_CHUNK_BYTES), crea el trabajo en la colección `jobs` y responde 202 con
+el id; el avance (filas hechas, contadores, errores) se consulta en
+GET /api/jobs/{id}. Los errores de fila van a `job_errors`, uno por documento:
+el trabajo sólo guarda cuántos hay y GET y el resultado devuelven los primeros
+JOB_ERRORS_LIMIT, así que ni el archivo ni los errores hacen crecer el
+documento del trabajo hacia el límite de 16 MB de Mongo. Los workers de `job_runner` (JOB_WORKERS por
+proceso) toman los trabajos en orden de llegada y guardan un punto de control
+después de cada lote. Mientras corre, el trabajo renueva su lease; si el
+proceso muere, el lease vence y otro worker lo retoma desde el último lote
+completo. Ese lote se vuelve a procesar, así que sus filas ya escritas pueden
+aparecer como "ya existe" o "no encontrado"; los errores que ya tenían esas
+filas no se duplican (job_errors tiene clave única por trabajo y fila).
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from bson import Binary, ObjectId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.ingestion import Row, Source, skip, take
+from app.core.responses import ORJSONResponse
+from app.crud.base import DUPLICATE_KEY
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "jobs"
+FILES_COLLECTION = "job_files"
+ERRORS_COLLECTION = "job_errors"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# El archivo se lee entero en memoria antes de guardarlo
+MAX_FILE_BYTES = 50 * 1024 * 1024
+# Partes del archivo en job_files (cada documento por debajo de los 16 MB de Mongo)
+FILE_CHUNK_BYTES = 4 * 1024 * 1024
+
+RowError = Tuple[int, str]  # (número de fila, mensaje)
+
+
+class ChunkResult(NamedTuple):
+    counts: Dict[str, int]
+    errors: List[RowError]
+
+
+class RowTask(NamedTuple):
+    """Operación masiva sobre las filas de una planilla"""
+    kind: str
+    # planilla (bytes o archivo) -> filas a procesar, de a una (se recorre en el threadpool)
+    read_rows: Callable[[Source], Iterator[Row]]
+    # (db, lote de filas, params) -> contadores y errores del lote
+    process: Callable[[Any, List[Row], Dict[str, Any]], Awaitable[ChunkResult]]
+    # (contadores, errores "Fila N: ...", params) -> respuesta de la ruta; en un
+    # trabajo llegan los primeros JOB_ERRORS_LIMIT errores
+    summary: Callable[[Dict[str, int], List[str], Dict[str, Any]], Dict[str, Any]]
+
+
+_tasks: Dict[str, RowTask] = {}
+
+
+def register_task(task: RowTask) -> RowTask:
+    """Registrar `task` para que los workers puedan ejecutar sus trabajos"""
+    _tasks[task.kind] = task
+    return task
+
+
+def format_errors(errors: List[RowError]) -> List[str]:
+    return [f"Fila {index}: {message}" for index, message in sorted(errors, key=lambda e: e[0])]
+
+
+class JobLost(Exception):
+    """Otro worker tomó el trabajo (el lease venció mientras corría)"""
+
+
+class Job:
+    """Trabajo tomado por un worker: punto de control y avance"""
+
+    def __init__(self, db: Any, doc: dict):
+        self.db = db
+        self.doc = doc
+        self.id = doc["_id"]
+
+    @property
+    def done(self) -> int:
+        return self.doc.get("done", 0)
+
+    async def save(self, *, done: int, total: Optional[int], counts: Dict[str, int], errors: List[RowError]) -> None:
+        """Guardar los errores de un lote y el avance (y renovar el lease)"""
+        errors_count = self.doc.get("errors_count", 0) + await self._insert_errors(errors)
+        now = datetime.utcnow()
+        result = await self.db[JOBS_COLLECTION].update_one(
+            # Sólo si sigue siendo nuestro: `attempts` cambia cuando otro worker lo toma
+            {"_id": self.id, "status": RUNNING, "attempts": self.doc["attempts"]},
+            {
+                "$set": {
+                    "done": done, "total": total, "counts": counts, "errors_count": errors_count,
+                    "updated_at": now, "lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                },
+            }
+        )
+        if not result.matched_count:
+            raise JobLost(str(self.id))
+        self.doc["errors_count"] = errors_count
+
+    async def _insert_errors(self, errors: List[RowError]) -> int:
+        """Insertar los errores de un lote; devuelve cuántos son nuevos"""
+        if not errors:
+            return 0
+        now = datetime.utcnow()
+        # `n` distingue varios errores de la misma fila dentro del lote
+        seen: Counter = Counter()
+        docs = []
+        for index, message in errors:
+            docs.append({"job_id": self.id, "row": index, "n": seen[index], "message": message, "created_at": now})
+            seen[index] += 1
+        try:
+            result = await self.db[ERRORS_COLLECTION].insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as exc:
+            # Lote que se vuelve a procesar al retomar: sus errores ya estaban guardados
+            if any(error["code"] != DUPLICATE_KEY for error in exc.details["writeErrors"]):
+                raise
+            return exc.details["nInserted"]
+
+    async def first_errors(self) -> List[RowError]:
+        return await _first_errors(self.db, self.id)
+
+
+async def run_task(
+    task: RowTask, db: Any, source: Source, params: Dict[str, Any], *, job: Optional[Job] = None
+) -> Dict[str, Any]:
+    """Procesar la planilla por lotes; con `job`, retomando desde su último punto de control"""
+    rows = task.read_rows(source)
+    counts = Counter(job.doc.get("counts", {}) if job else {})
+    errors = []  # en un trabajo quedan en job_errors
+    done = job.done if job else 0
+    try:
+        if done:
+            await run_in_threadpool(skip, rows, done)
+        # El total se conoce recién al terminar de leer
+        while chunk := await run_in_threadpool(take, rows, settings.IMPORT_BATCH_SIZE):
+            result = await task.process(db, chunk, params)
+            counts.update(result.counts)
+            done += len(chunk)
+            if job:
+                await job.save(done=done, total=None, counts=dict(counts), errors=result.errors)
+            else:
+                errors.extend(result.errors)
+        if job:
+            await job.save(done=done, total=done, counts=dict(counts), errors=[])
+            errors = await job.first_errors()
+    finally:
+        rows.close()
+    return task.summary(dict(counts), format_errors(errors), params)
+
+
+async def submit(task: RowTask, contents: bytes, params: Dict[str, Any], *, filename: Optional[str] = None):
+    """Encolar `task` sobre `contents` y responder 202 con el id del trabajo"""
+    if len(contents) > MAX_FILE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="El archivo es demasiado grande para procesarlo en segundo plano"
+        )
+    db = get_database()
+    now = datetime.utcnow()
+    job_id = ObjectId()
+    # El archivo antes que el trabajo: un worker nunca toma un trabajo sin su archivo
+    await db[FILES_COLLECTION].insert_many([
+        {"job_id": job_id, "n": n, "data": Binary(contents[start:start + FILE_CHUNK_BYTES]), "created_at": now}
+        for n, start in enumerate(range(0, len(contents) or 1, FILE_CHUNK_BYTES))
+    ])
+    await db[JOBS_COLLECTION].insert_one({
+        "_id": job_id,
+        "kind": task.kind,
+        "status": QUEUED,
+        "params": params,
+        "filename": filename,
+        "total": None,
+        "done": 0,
+        "counts": {},
+        "errors_count": 0,
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+    })
+    job_runner.wake_up()
+    job_id = str(job_id)
+    return ORJSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": job_id, "status": QUEUED, "status_url": f"/api/jobs/{job_id}"}
+    )
+
+
+async def _first_errors(db: Any, job_id: ObjectId) -> List[RowError]:
+    """Los primeros JOB_ERRORS_LIMIT errores del trabajo, por número de fila"""
+    cursor = (
+        db[ERRORS_COLLECTION].find({"job_id": job_id}, {"row": 1, "message": 1})
+        .sort([("row", 1), ("n", 1)])
+        .limit(settings.JOB_ERRORS_LIMIT)
+    )
+    return [(doc["row"], doc["message"]) async for doc in cursor]
+
+
+async def _read_file(db: Any, job_id: ObjectId) -> Optional[bytes]:
+    """El archivo del trabajo, o None si ya no está (p. ej. lo borró el TTL)"""
+    cursor = db[FILES_COLLECTION].find({"job_id": job_id}, {"data": 1}).sort("n", 1)
+    parts = [bytes(doc["data"]) async for doc in cursor]
+    return b"".join(parts) if parts else None
+
+
+async def get_job(db: Any, job_id: str) -> Optional[dict]:
+    """Estado de un trabajo, con los primeros errores como "Fila N: ..." """
+    if not ObjectId.is_valid(job_id):
+        return None
+    doc = await db[JOBS_COLLECTION].find_one({"_id": ObjectId(job_id)}, {"lease_until": 0})
+    if doc:
+        doc["errors"] = format_errors(await _first_errors(db, doc["_id"])) if doc.get("errors_count") else []
+    return doc
+
+
+class JobRunner:
+    """Workers de este proceso: asyncio tasks que toman trabajos de la colección `jobs`"""
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self, workers: int) -> None:
+        for _ in range(workers):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def wake_up(self) -> None:
+        self._wakeup.set()
+
+    async def _claim(self, db: Any) -> Optional[dict]:
+        """Tomar el trabajo más antiguo en cola (o uno cuyo worker dejó vencer el lease)"""
+        now = datetime.utcnow()
+        return await db[JOBS_COLLECTION].find_one_and_update(
+            {"$or": [{"status": QUEUED}, {"status": RUNNING, "lease_until": {"$lt": now}}]},
+            {
+                "$set": {
+                    "status": RUNNING, "updated_at": now,
+                    "lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                },
+                "$min": {"started_at": now},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                db = get_database()
+                doc = await self._claim(db)
+            except Exception:
+                logger.exception("No se pudo tomar un trabajo")
+                doc = None
+            if doc is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._run(db, doc)
+
+    async def _run(self, db: Any, doc: dict) -> None:
+        collection = db[JOBS_COLLECTION]
+        task = _tasks.get(doc["kind"])
+        if task is None or doc["attempts"] > settings.JOB_MAX_ATTEMPTS:
+            error = "Tipo de trabajo desconocido" if task is None else "El trabajo se interrumpió demasiadas veces"
+            await self._finish(db, doc, FAILED, error=error)
+            return
+        contents = await _read_file(db, doc["_id"])
+        if contents is None:
+            await self._finish(db, doc, FAILED, error="No se encontró el archivo del trabajo")
+            return
+
+        job = Job(db, doc)
+        heartbeat = asyncio.create_task(self._heartbeat(collection, doc))
+        try:
+            result = await run_task(task, db, contents, doc.get("params") or {}, job=job)
+        except asyncio.CancelledError:
+            # Apagado: devolverlo a la cola para retomarlo apenas haya un worker
+            await collection.update_one(
+                {"_id": doc["_id"], "status": RUNNING, "attempts": doc["attempts"]},
+                {"$set": {"status": QUEUED, "lease_until": None}, "$inc": {"attempts": -1}}
+            )
+            raise
+        except JobLost:
+            logger.warning("El trabajo %s pasó a otro worker", doc["_id"])
+        except Exception as exc:
+            logger.exception("Falló el trabajo %s (%s)", doc["_id"], doc["kind"])
+            await self._finish(db, doc, FAILED, error=str(exc))
+        else:
+            await self._finish(db, doc, DONE, result=result)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, collection: Any, doc: dict) -> None:
+        """Renovar el lease mientras un lote largo sigue corriendo"""
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            await collection.update_one(
+                {"_id": doc["_id"], "status": RUNNING, "attempts": doc["attempts"]},
+                {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)}}
+            )
+
+    async def _finish(
+        self, db: Any, doc: dict, state: str, *, result: Optional[dict] = None, error: Optional[str] = None
+    ) -> None:
+        now = datetime.utcnow()
+        finished = await db[JOBS_COLLECTION].update_one(
+            {"_id": doc["_id"], "attempts": doc["attempts"]},
+            {
+                "$set": {
+                    "status": state, "result": result, "error": error,
+                    "finished_at": now, "updated_at": now, "lease_until": None,
+                },
+            }
+        )
+        # El archivo ya no hace falta
+        if finished.matched_count:
+            await db[FILES_COLLECTION].delete_many({"job_id": doc["_id"]})
+
+
+job_runner = JobRunner()
@@ -0,0 +1,90 @@
+"""
+Respuestas JSON validadas y serializadas en una sola pasada.
+
+Con `response_model`, FastAPI valida lo que devuelve la ruta, lo convierte a
+objetos JSON de Python y recién después lo pasa a json.dumps. Si además el
+CRUD construyó un modelo por fila, cada documento se valida dos veces.
+
+`json_response(PaginatedResponse[EstudianteResponse], payload)` valida el
+payload (documentos crudos de Mongo, ver CRUDBase._raw_or_model) con un
+TypeAdapter cacheado por tipo y lo serializa directo a bytes con pydantic-core.
+FastAPI no vuelve a validar una Response, así que el decorador conserva
+`response_model` sólo para la documentación OpenAPI. `warm_up` construye al
+arrancar los TypeAdapter de todos los response_model para que el primer
+request no pague la compilación del serializador.
+
+`ORJSONResponse` es la clase de respuesta por defecto de la app (registrada
+con `Default(...)`, ver app.main): la usan las rutas sin response_model, y
+entiende ObjectId, datetime y date sin pasar por encoders de Python.
+
+`ndjson_response` transmite una exportación como NDJSON (un objeto JSON por
+línea) a medida que llegan los documentos del cursor, sin armar la lista.
+"""
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterable, Optional
+import orjson
+from bson import ObjectId
+from fastapi import Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+
+def _orjson_default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def response_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def dump_json(response_type: Any, content: Any) -> bytes:
+    """Validar `content` contra `response_type` y serializarlo (por alias, como FastAPI)"""
+    adapter = response_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(content), by_alias=True)
+
+
+def json_response(response_type: Any, content: Any, status_code: int = status.HTTP_200_OK) -> Response:
+    return Response(dump_json(response_type, content), status_code=status_code, media_type="application/json")
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _ndjson_chunks(response_type: Any, docs: AsyncIterator[Any], rows_per_chunk: int) -> AsyncIterator[bytes]:
+    adapter = response_adapter(response_type)
+    lines = []
+    async for doc in docs:
+        lines.append(adapter.dump_json(adapter.validate_python(doc), by_alias=True))
+        if len(lines) >= rows_per_chunk:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def ndjson_response(
+    response_type: Any, docs: AsyncIterator[Any], *, filename: Optional[str] = None, rows_per_chunk: int = 100
+) -> StreamingResponse:
+    """Cada documento de `docs` validado contra `response_type`, una línea JSON por documento"""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return StreamingResponse(
+        _ndjson_chunks(response_type, docs, rows_per_chunk), media_type=NDJSON_MEDIA_TYPE, headers=headers
+    )
+
+
+def warm_up(routes: Iterable[Any]) -> int:
+    """Compilar los serializadores de los response_model de `routes`; devuelve cuántos"""
+    types = {route.response_model for route in routes
+             if isinstance(route, APIRoute) and route.response_model is not None}
+    for response_type in types:
+        response_adapter(response_type)
+    return len(types)
@@ -0,0 +1,160 @@
+"""
+Búsqueda por tokens normalizados.
+
+Cada documento buscable guarda en `search_keys` los tokens de sus campos de
+texto, sin tildes y en minúsculas ("Muñoz" -> "munoz"). El parámetro `q` se
+normaliza igual y cada uno de sus tokens debe ser prefijo de algún token del
+documento:
+
+    {"$and": [{"search_keys": /^mu/}, {"search_keys": /^gar/}]}
+
+Son regex anclados sobre un índice multikey, así que Mongo recorre sólo el
+rango del prefijo en lugar de toda la colección. Los resultados se ordenan por
+cuántos tokens de `q` coinciden completos (`score_expression`).
+
+Para autocompletar (`suggest`) estudiantes y usuarios guardan además
+`name_key`: "apellidos nombres" normalizado, con índice. Un prefijo anclado
+sobre ese campo devuelve las coincidencias ya en orden alfabético sin ordenar
+en memoria; si no alcanzan, se completan con prefijos sobre search_keys. Los
+prefijos más pedidos se sirven de una caché de TTL corto.
+
+`search_document_fields` es el único punto que calcula `search_keys` y
+`name_key`: lo llaman todas las escrituras que tocan campos buscables.
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+from bson import json_util
+from bson.regex import Regex
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.core.cache import TTLCache, get_write_version
+from app.core.config import settings
+
+SEARCH_KEYS_FIELD = "search_keys"
+NAME_KEY_FIELD = "name_key"
+
+# Campos que alimentan search_keys en cada colección
+SEARCH_FIELDS: Dict[str, tuple] = {
+    "estudiantes": ("nombres", "apellidos", "rude"),
+    "users": ("nombre", "apellido", "email", "telefono"),
+    "licencias": ("motivo", "estado"),
+    "libretas": ("titulo", "gestion"),
+    "pagos": ("concepto", "estado"),
+}
+
+# Campos (en orden) que forman name_key
+NAME_KEY_FIELDS: Dict[str, tuple] = {
+    "estudiantes": ("apellidos", "nombres"),
+    "users": ("apellido", "nombre"),
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+suggest_cache = TTLCache(maxsize=1024, ttl=settings.SUGGEST_CACHE_TTL_SECONDS)
+
+
+def normalize(text: str) -> str:
+    """Quitar tildes/diéresis (ñ -> n) y pasar a minúsculas"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text: Any) -> List[str]:
+    if text is None:
+        return []
+    if hasattr(text, "value"):  # Enums (estado)
+        text = text.value
+    return _TOKEN_RE.findall(normalize(str(text)))
+
+
+def search_keys(values: Iterable[Any]) -> List[str]:
+    keys = set()
+    for value in values:
+        keys.update(tokenize(value))
+    return sorted(keys)
+
+
+def search_document_fields(collection_name: str, doc: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Campos derivados para búsqueda de `doc` (el documento completo, ya con los
+    cambios aplicados). Devuelve {} si la colección no es buscable.
+    """
+    fields = SEARCH_FIELDS.get(collection_name)
+    if not fields:
+        return {}
+    derived = {SEARCH_KEYS_FIELD: search_keys(doc.get(field) for field in fields)}
+    if collection_name in NAME_KEY_FIELDS:
+        derived[NAME_KEY_FIELD] = " ".join(
+            token for field in NAME_KEY_FIELDS[collection_name] for token in tokenize(doc.get(field))
+        )
+    return derived
+
+
+def touches_search_fields(collection_name: str, changes: Mapping[str, Any]) -> bool:
+    return any(field in changes for field in SEARCH_FIELDS.get(collection_name, ()))
+
+
+def search_filter(q: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Filtro de prefijos sobre search_keys, o None si `q` no tiene tokens"""
+    tokens = tokenize(q)
+    if not tokens:
+        return None
+    clauses = [{SEARCH_KEYS_FIELD: Regex("^" + re.escape(token))} for token in dict.fromkeys(tokens)]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def score_expression(q: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Cantidad de tokens de `q` que coinciden completos con search_keys"""
+    tokens = sorted(set(tokenize(q)))
+    if not tokens:
+        return None
+    return {"$size": {"$filter": {
+        "input": {"$ifNull": ["$" + SEARCH_KEYS_FIELD, []]},
+        "cond": {"$in": ["$$this", tokens]},
+    }}}
+
+
+async def suggest(
+    collection: AsyncIOMotorCollection,
+    q: str,
+    *,
+    limit: int = 10,
+    base_filter: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Hasta `limit` documentos para autocompletar `q`, en orden alfabético:
+    primero los que empiezan por `q` (prefijo de name_key) y luego los que
+    tienen algún token con ese prefijo (nombre, RUDE, email...).
+    """
+    prefix = " ".join(tokenize(q))
+    if not prefix:
+        return []
+
+    key = (
+        collection.name, prefix, limit,
+        json_util.dumps([base_filter, projection], sort_keys=True),
+        get_write_version(collection.name),
+    )
+    cached = suggest_cache.get(key)
+    if cached is not None:
+        return cached
+
+    base_filter = base_filter or {}
+    docs = await collection.find(
+        {**base_filter, NAME_KEY_FIELD: Regex("^" + re.escape(prefix))}, projection
+    ).sort(NAME_KEY_FIELD, 1).limit(limit).to_list(length=limit)
+
+    if len(docs) < limit:
+        remaining = limit - len(docs)
+        more_filter = {"$and": [
+            base_filter,
+            search_filter(q),
+            {"_id": {"$nin": [doc["_id"] for doc in docs]}},
+        ]}
+        docs += await collection.find(more_filter, projection).sort(
+            NAME_KEY_FIELD, 1
+        ).limit(remaining).to_list(length=remaining)
+
+    suggest_cache.set(key, docs)
+    return docs
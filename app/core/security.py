@@ -1,7 +1,10 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 from jose import jwt
-from passlib.context import CryptContext
 from fastapi.security import HTTPBearer
 from app.core.config import settings
 import bcrypt
@@ -10,15 +13,98 @@ oauth2_scheme = HTTPBearer()
 
 def get_password_hash(password: str) -> str:
     pwd_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed_password = bcrypt.hashpw(pwd_bytes, salt)
     return hashed_password.decode('utf-8')
 
+# Pool de procesos para hashear lotes grandes (importaciones) con todos los
+# núcleos sin bloquear el event loop. Se crea al primer uso y se cierra en el
+# shutdown de la app (shutdown_hash_pool).
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+def _hash_workers() -> int:
+    return settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # spawn: los procesos no heredan los hilos ni los sockets de Motor
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=_hash_workers(), mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+async def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    """Hashear varias contraseñas en paralelo en el pool de procesos (mismo orden que `passwords`)"""
+    if not passwords:
+        return []
+    # Unos pocos trozos por proceso: reparte la carga sin pagar un envío por contraseña
+    size = max(1, -(-len(passwords) // (_hash_workers() * 4)))
+    chunks = [list(passwords[i:i + size]) for i in range(0, len(passwords), size)]
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    results = await asyncio.gather(*(loop.run_in_executor(pool, _hash_many, chunk) for chunk in chunks))
+    return [hashed for chunk in results for hashed in chunk]
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     pwd_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(pwd_bytes, hashed_bytes)
 
+# Hilos para los hashes sueltos de cada request (login, cambio de contraseña,
+# altas). bcrypt libera el GIL, así que corren en paralelo sin bloquear el event
+# loop; el tope de hilos limita cuántos corren a la vez y el resto espera en cola
+# (una ráfaga de logins no acapara los núcleos ni el threadpool de Starlette).
+_bcrypt_threads: Optional[ThreadPoolExecutor] = None
+
+def _get_bcrypt_threads() -> ThreadPoolExecutor:
+    global _bcrypt_threads
+    if _bcrypt_threads is None:
+        _bcrypt_threads = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_VERIFY_THREADS or os.cpu_count() or 1, thread_name_prefix="bcrypt"
+        )
+    return _bcrypt_threads
+
+async def hash_password(password: str) -> str:
+    """get_password_hash fuera del event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_bcrypt_threads(), get_password_hash, password)
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fuera del event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_bcrypt_threads(), verify_password, plain_password, hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si el hash se generó con un costo distinto de BCRYPT_ROUNDS ($2b$<rounds>$...)"""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+async def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verificar la contraseña y, si es correcta pero el hash usa otro costo,
+    devolver también el hash nuevo para guardarlo: (válida, hash nuevo o None).
+    """
+    if not await check_password(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, await hash_password(plain_password)
+    return True, None
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool, _bcrypt_threads
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+    if _bcrypt_threads is not None:
+        _bcrypt_threads.shutdown(wait=False, cancel_futures=True)
+        _bcrypt_threads = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,80 @@
+"""
+Filtro académico compartido (nivel / grado / turno / paralelo).
+
+Estudiantes, papas, licencias y libretas se filtran por el curso de los
+estudiantes involucrados. Cada estudiante guarda una copia de los atributos
+de su curso y malla (nivel, turno, paralelo, anio_escolaridad, gestion; ver
+`CRUDEstudiante.sync_academic_fields`), así que:
+
+1. Estudiantes se filtra con una sola consulta sobre esos campos, respaldada
+   por el índice `academic` del registro.
+2. Las demás colecciones agregan etapas $lookup hacia `estudiantes` con el
+   mismo filtro, de modo que nunca se traen ni se reenvían listas de ids.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+from app.models.curso_model import TurnoCurso
+from app.models.malla_curricular_model import NivelEducativo
+from app.schemas.estudiante_schema import GradoFilter
+
+# Año de escolaridad de cada grado. Para secundaria se usa el mismo grado
+# junto con nivel=SECUNDARIA (p. ej. PRIMERO + SECUNDARIA = 1ro de secundaria).
+GRADO_ANIO: Dict[GradoFilter, int] = {
+    GradoFilter.PRE_KINDER: 1,
+    GradoFilter.KINDER: 2,
+    GradoFilter.PRIMERO: 1,
+    GradoFilter.SEGUNDO: 2,
+    GradoFilter.TERCERO: 3,
+    GradoFilter.CUARTO: 4,
+    GradoFilter.QUINTO: 5,
+    GradoFilter.SEXTO: 6,
+}
+
+GRADOS_INICIAL = (GradoFilter.PRE_KINDER, GradoFilter.KINDER)
+
+
+class AcademicFilter(NamedTuple):
+    nivel: Optional[NivelEducativo] = None
+    grado: Optional[GradoFilter] = None
+    turno: Optional[TurnoCurso] = None
+    paralelo: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return any(value is not None for value in self)
+
+
+def estudiante_academic_filter(academic: AcademicFilter) -> Dict[str, Any]:
+    """Filtro sobre los atributos académicos desnormalizados de estudiantes"""
+    match = {}
+    if academic.nivel:
+        match["nivel"] = academic.nivel.value
+    if academic.grado:
+        match["anio_escolaridad"] = GRADO_ANIO[academic.grado]
+        if academic.grado in GRADOS_INICIAL:
+            match["nivel"] = NivelEducativo.INICIAL.value
+    if academic.turno:
+        match["turno"] = academic.turno.value
+    if academic.paralelo:
+        match["paralelo"] = academic.paralelo
+    return match
+
+
+def estudiante_lookup_stages(local_field: str, academic: AcademicFilter) -> List[Dict[str, Any]]:
+    """
+    Etapas que dejan sólo los documentos cuyo `local_field` (id o lista de ids
+    de estudiante) apunta a algún estudiante que cumple el filtro académico.
+    """
+    return [
+        {"$lookup": {
+            "from": "estudiantes",
+            "localField": local_field,
+            "foreignField": "_id",
+            "pipeline": [
+                {"$match": estudiante_academic_filter(academic)},
+                {"$project": {"_id": 1}},
+            ],
+            "as": "_academic",
+        }},
+        {"$match": {"_academic.0": {"$exists": True}}},
+        {"$project": {"_academic": 0}},
+    ]
@@ -1,13 +1,52 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, Generic, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar, Union
 from pydantic import BaseModel
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
+from app.core.cache import bump_write_version
+from app.core.search import SEARCH_FIELDS, search_document_fields, touches_search_fields
+from app.crud.loader import as_object_id, find_by_ids
+from app.crud.pagination import ListQuery, Page, paginate, stream
+from app.crud.projection import fill_defaults, load_projected, schema_projection
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+DUPLICATE_KEY = 11000
+
+
+def _stored_forms(value: Any) -> List[Any]:
+    """Formas en que puede estar guardado `value`: un ObjectId también como string"""
+    return [value, str(value)] if isinstance(value, ObjectId) else [value]
+
+
+def _match_stored(value: Any) -> Any:
+    return {"$in": _stored_forms(value)} if isinstance(value, ObjectId) else value
+
+
+def _normalize_key(values: Iterable[Any]) -> Tuple:
+    """Clave comparable sin importar si los ids vienen como ObjectId o string"""
+    return tuple(str(value) if isinstance(value, ObjectId) else value for value in values)
+
+
+class BulkInsertResult(NamedTuple):
+    inserted_count: int
+    # Posición en `objs_in` -> writeError de Mongo ({"code": 11000, "errmsg": ...})
+    errors: Dict[int, Dict[str, Any]]
+
+
+class BulkDeleteResult(NamedTuple):
+    # Filas con un documento para borrar (en dry_run, las que se borrarían)
+    matched_count: int
+    deleted_count: int
+    # Posiciones en `keys` sin documento
+    not_found: List[int]
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType], collection_name: str):
         """
@@ -19,80 +58,284 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.model = model
         self.collection_name = collection_name
 
-    async def get(self, db: Any, id: Any) -> Optional[ModelType]:
+    def _from_doc(self, doc: Dict[str, Any], schema: Optional[Type[BaseModel]] = None) -> Any:
+        """Documento -> modelo, o -> `schema` si se leyó proyectado con schema_projection(schema)"""
+        if schema is None:
+            return self.model(**doc)
+        return load_projected(self.model, schema, doc)
+
+    def _raw_or_model(self, doc: Dict[str, Any], schema: Optional[Type[BaseModel]] = None) -> Any:
+        """
+        Para listados: sin `schema`, el modelo completo; con `schema`, el
+        documento crudo con los defaults del modelo. La ruta lo valida y
+        serializa una sola vez contra su response_model, en lugar de construir
+        un modelo por fila y volver a validarlo al responder.
+        """
+        if schema is None:
+            return self.model(**doc)
+        return fill_defaults(self.model, schema, doc)
+
+    async def get(self, db: Any, id: Any, *, schema: Optional[Type[BaseModel]] = None) -> Optional[ModelType]:
+        """
+        Documento por id. Con `schema` (normalmente el response_model de la
+        ruta) sólo se piden sus campos y se devuelve una instancia de `schema`.
+        """
         collection: AsyncIOMotorCollection = db[self.collection_name]
         try:
             oid = ObjectId(id)
         except Exception:
             return None
             
-        doc = await collection.find_one({"_id": oid})
+        projection = schema_projection(schema) if schema else None
+        doc = await collection.find_one({"_id": oid}, projection)
         if doc:
-            return self.model(**doc)
+            return self._from_doc(doc, schema)
         return None
 
+    async def get_many(self, db: Any, ids: Iterable[Any]) -> List[ModelType]:
+        """Varios documentos por id con una sola consulta $in, en el orden de `ids` (omite los que no existen)"""
+        ids = list(ids)
+        docs = await find_by_ids(db[self.collection_name], ids)
+        found = (docs.get(as_object_id(id)) for id in ids)
+        return [self.model(**doc) for doc in found if doc]
+
     async def get_multi(
-        self, db: Any, *, skip: int = 0, limit: int = 100
+        self, db: Any, *, skip: int = 0, limit: int = 100, schema: Optional[Type[BaseModel]] = None
     ) -> List[ModelType]:
         collection: AsyncIOMotorCollection = db[self.collection_name]
-        cursor = collection.find().skip(skip).limit(limit)
+        projection = schema_projection(schema) if schema else None
+        cursor = collection.find({}, projection).skip(skip).limit(limit)
         results = []
         async for doc in cursor:
-            results.append(self.model(**doc))
+            results.append(self._raw_or_model(doc, schema))
         return results
 
+    async def paginate(
+        self,
+        db: Any,
+        query: ListQuery,
+        *,
+        page: int = 1,
+        per_page: int = 10,
+        after: Optional[str] = None,
+        include_total: bool = True,
+        approx_total: bool = False,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Page:
+        """
+        Página de `query` (por número de página o por cursor `after`). Con
+        `schema` es proyectada y los items son documentos crudos (ver _raw_or_model).
+        """
+        result = await paginate(
+            db[self.collection_name], query,
+            page=page, per_page=per_page, after=after,
+            include_total=include_total, approx_total=approx_total,
+            projection=schema_projection(schema) if schema else None
+        )
+        return result._replace(items=[self._raw_or_model(doc, schema) for doc in result.items])
+
+    async def stream(
+        self,
+        db: Any,
+        query: ListQuery,
+        *,
+        schema: Optional[Type[BaseModel]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Todos los documentos de `query` (para exportar). Con `schema`,
+        proyectados con sus campos y con los defaults del modelo; si no, los
+        documentos crudos con `projection`.
+        """
+        if schema is not None:
+            projection = schema_projection(schema)
+        async for doc in stream(db[self.collection_name], query, projection=projection, batch_size=batch_size):
+            yield fill_defaults(self.model, schema, doc) if schema is not None else doc
+
+    def _id_filter(self, id: Any, base_filter: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Filtro por _id (más `base_filter`), o None si `id` no es un ObjectId válido"""
+        oid = as_object_id(id)
+        if oid is None:
+            return None
+        return {**(base_filter or {}), "_id": oid}
+
+    def _field_names(self) -> set:
+        """Campos del modelo tal como se guardan en Mongo (id -> _id)"""
+        return {field.alias or name for name, field in self.model.model_fields.items()}
+
+    def _to_document(self, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> Dict[str, Any]:
+        """Documento a insertar: datos de entrada + campos de búsqueda derivados"""
+        obj_in_data = jsonable_encoder(obj_in)
+        obj_in_data.update(search_document_fields(self.collection_name, obj_in_data))
+        return obj_in_data
+
     async def create(self, db: Any, *, obj_in: CreateSchemaType) -> ModelType:
         collection: AsyncIOMotorCollection = db[self.collection_name]
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = await collection.insert_one(obj_in_data)
-        
-        # Fetch the created object
-        created_doc = await collection.find_one({"_id": db_obj.inserted_id})
-        return self.model(**created_doc)
+        obj_in_data = self._to_document(obj_in)
+        result = await collection.insert_one(obj_in_data)
+        bump_write_version(self.collection_name)
+
+        # El documento guardado es exactamente obj_in_data: no hace falta releerlo
+        obj_in_data["_id"] = result.inserted_id
+        return self.model(**obj_in_data)
+
+    async def create_many(
+        self,
+        db: Any,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        chunk_size: int = 1000
+    ) -> BulkInsertResult:
+        """
+        Insertar `objs_in` con insert_many no ordenados de a `chunk_size` (un
+        round trip por lote). Una fila rechazada (p. ej. clave duplicada en un
+        índice único) no detiene las demás: queda en `errors` con su posición.
+        """
+        collection: AsyncIOMotorCollection = db[self.collection_name]
+        inserted = 0
+        errors = {}
+        for start in range(0, len(objs_in), chunk_size):
+            docs = [self._to_document(obj_in) for obj_in in objs_in[start:start + chunk_size]]
+            try:
+                result = await collection.insert_many(docs, ordered=False)
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as exc:
+                inserted += exc.details.get("nInserted", 0)
+                for error in exc.details.get("writeErrors", []):
+                    errors[start + error["index"]] = error
+        if inserted:
+            bump_write_version(self.collection_name)
+        return BulkInsertResult(inserted, errors)
+
+    async def delete_by_keys(
+        self,
+        db: Any,
+        *,
+        fields: Sequence[str],
+        keys: Sequence[Tuple[Hashable, ...]],
+        dry_run: bool = False,
+        chunk_size: int = 1000
+    ) -> BulkDeleteResult:
+        """
+        Eliminar, por cada clave de `keys` (valores de `fields`, en ese orden), un
+        documento que coincida, igual que un delete_one por fila: una clave
+        repetida borra tantos documentos como veces aparece. Busca los _id con
+        un $in (o $or, si la clave tiene varios campos) por lote de `chunk_size`
+        claves y los borra con delete_many. Con `dry_run` sólo cuenta.
+
+        Un valor ObjectId de la clave encuentra también el id guardado como
+        string (p. ej. malla_id de cursos, que se guarda con jsonable_encoder).
+        """
+        collection: AsyncIOMotorCollection = db[self.collection_name]
+        matches: Dict[Tuple, List[ObjectId]] = defaultdict(list)
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), chunk_size):
+            chunk = unique_keys[start:start + chunk_size]
+            if len(fields) == 1:
+                query = {fields[0]: {"$in": [value for key in chunk for value in _stored_forms(key[0])]}}
+            else:
+                query = {"$or": [
+                    {field: _match_stored(value) for field, value in zip(fields, key)} for key in chunk
+                ]}
+            async for doc in collection.find(query, dict.fromkeys(fields, 1)):
+                matches[_normalize_key(doc.get(field) for field in fields)].append(doc["_id"])
+
+        ids, not_found = [], []
+        for position, key in enumerate(keys):
+            key = _normalize_key(key)
+            if matches.get(key):
+                ids.append(matches[key].pop())
+            else:
+                not_found.append(position)
+        if dry_run:
+            return BulkDeleteResult(len(ids), 0, not_found)
+
+        deleted = 0
+        for start in range(0, len(ids), chunk_size):
+            result = await collection.delete_many({"_id": {"$in": ids[start:start + chunk_size]}})
+            deleted += result.deleted_count
+        if deleted:
+            bump_write_version(self.collection_name)
+        return BulkDeleteResult(len(ids), deleted, not_found)
 
     async def update(
         self,
         db: Any,
         *,
-        db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
-    ) -> ModelType:
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        db_obj: Optional[ModelType] = None,
+        id: Any = None,
+        base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[ModelType]:
+        """
+        Actualizar el documento `id` (o `db_obj`, si ya se leyó) con un solo
+        find_one_and_update que devuelve la versión nueva. Devuelve None si no
+        existe o no cumple `base_filter` (p. ej. {"role": "PADRE"}).
+
+        Si cambia un campo buscable y no vienen todos (ni `db_obj`), antes se
+        leen los que faltan para calcular search_keys en la misma escritura.
+        """
         collection: AsyncIOMotorCollection = db[self.collection_name]
-        
-        # Prepare update data
-        obj_data = jsonable_encoder(db_obj)
+        filter_query = self._id_filter(db_obj.id if db_obj is not None else id, base_filter)
+        if filter_query is None:
+            return None
+
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-            
-        # Update logic: only update fields that are present in update_data
-        # Note: In a real app we might want to be careful about what we update
-        
-        # Create $set dict
-        set_data = {k: v for k, v in update_data.items() if k in obj_data}
+
+        # Create $set dict: only fields of the model
+        fields = self._field_names()
+        set_data = {k: v for k, v in update_data.items() if k in fields}
         if not set_data:
-            return db_obj # Nothing to update
-            
-        await collection.update_one(
-            {"_id": ObjectId(db_obj.id)},
-            {"$set": set_data}
+            if db_obj is not None:
+                return db_obj # Nothing to update
+            doc = await collection.find_one(filter_query)
+            return self.model(**doc) if doc else None
+
+        # search_keys se calcula con todos los campos buscables: los que no
+        # vienen en set_data salen de db_obj o de una lectura previa
+        search_fields = SEARCH_FIELDS.get(self.collection_name, ())
+        guarded = False
+        if touches_search_fields(self.collection_name, set_data):
+            missing = [field for field in search_fields if field not in set_data]
+            if db_obj is not None:
+                current = jsonable_encoder(db_obj)
+            elif missing:
+                current = await collection.find_one(filter_query, dict.fromkeys(missing, 1))
+                if current is None:
+                    return None
+                # Escribir sólo si esos campos siguen como se leyeron; si otro
+                # request los cambió en el medio, se vuelve a leer
+                filter_query = {**filter_query, **{field: current.get(field) for field in missing}}
+                guarded = True
+            else:
+                current = {}
+            set_data.update(search_document_fields(self.collection_name, {**current, **set_data}))
+
+        doc = await collection.find_one_and_update(
+            filter_query, {"$set": set_data}, return_document=ReturnDocument.AFTER
         )
-        
-        # Fetch updated
-        updated_doc = await collection.find_one({"_id": ObjectId(db_obj.id)})
-        return self.model(**updated_doc)
+        if not doc:
+            if guarded:
+                return await self.update(db, obj_in=obj_in, id=id, base_filter=base_filter)
+            return None
+        bump_write_version(self.collection_name)
+        return self.model(**doc)
 
-    async def remove(self, db: Any, *, id: str) -> Optional[ModelType]:
+    async def remove(
+        self, db: Any, *, id: Any, base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[ModelType]:
+        """Eliminar con find_one_and_delete; devuelve el documento borrado o None"""
         collection: AsyncIOMotorCollection = db[self.collection_name]
-        try:
-            oid = ObjectId(id)
-        except Exception:
+        filter_query = self._id_filter(id, base_filter)
+        if filter_query is None:
             return None
-            
-        doc = await collection.find_one({"_id": oid})
+
+        doc = await collection.find_one_and_delete(filter_query)
         if not doc:
             return None
-            
-        await collection.delete_one({"_id": oid})
+        bump_write_version(self.collection_name)
         return self.model(**doc)
@@ -1,8 +1,70 @@
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Union
+from pymongo import UpdateOne
+from app.core.cache import bump_write_version
 from app.crud.base import CRUDBase
+from app.crud.crud_estudiante import estudiante as crud_estudiante
 from app.models.curso_model import CursoModel
 from app.schemas.curso_schema import CursoCreate, CursoUpdate
 
+# Campos del curso que se copian en sus estudiantes
+ACADEMIC_KEYS = {"nivel", "turno", "paralelo", "malla_id"}
+
+# Clave natural de un curso (importación idempotente y /bulk-delete)
+NATURAL_KEY = ("nombre", "paralelo", "nivel", "turno", "malla_id")
+
+
+class BulkUpsertResult(NamedTuple):
+    created_count: int
+    updated_count: int
+
+
 class CRUDCurso(CRUDBase[CursoModel, CursoCreate, CursoUpdate]):
-    pass
+    async def update(
+        self,
+        db: Any,
+        *,
+        obj_in: Union[CursoUpdate, Dict[str, Any]],
+        db_obj: Optional[CursoModel] = None,
+        id: Any = None,
+        base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[CursoModel]:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        updated = await super().update(
+            db, obj_in=update_data, db_obj=db_obj, id=id, base_filter=base_filter
+        )
+        if updated and ACADEMIC_KEYS & update_data.keys():
+            await crud_estudiante.sync_academic_fields(db, curso_ids=[updated.id])
+        return updated
+
+    async def remove(
+        self, db: Any, *, id: Any, base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[CursoModel]:
+        removed = await super().remove(db, id=id, base_filter=base_filter)
+        if removed:
+            # Sin curso, los atributos académicos de sus estudiantes quedan en null
+            await crud_estudiante.sync_academic_fields(db, curso_ids=[removed.id])
+        return removed
+
+    async def upsert_many(self, db: Any, *, objs_in: Sequence[CursoCreate]) -> BulkUpsertResult:
+        """
+        Crear los cursos de `objs_in` que no existan (por NATURAL_KEY) con un solo
+        bulk_write; en los que ya existen sólo se actualiza el tutor. Importar dos
+        veces la misma planilla no duplica cursos.
+        """
+        if not objs_in:
+            return BulkUpsertResult(0, 0)
+        requests = []
+        for obj_in in objs_in:
+            doc = self._to_document(obj_in)
+            key = {field: doc[field] for field in NATURAL_KEY}
+            # malla_id puede estar guardado como ObjectId o como string
+            key["malla_id"] = {"$in": [obj_in.malla_id, str(obj_in.malla_id)]}
+            tutor_id = doc.pop("tutor_id", None)
+            requests.append(UpdateOne(key, {"$setOnInsert": doc, "$set": {"tutor_id": tutor_id}}, upsert=True))
+
+        result = await db[self.collection_name].bulk_write(requests, ordered=False)
+        if result.upserted_count or result.modified_count:
+            bump_write_version(self.collection_name)
+        return BulkUpsertResult(result.upserted_count, result.modified_count)
 
 curso = CRUDCurso(CursoModel, "cursos")
@@ -1,111 +1,118 @@
-from typing import Any, List, Optional, Tuple
-from app.crud.base import CRUDBase
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Type, Union
+from pydantic import BaseModel
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from app.core.cache import bump_write_version
+from app.core.catalog import catalog
+from app.core.search import score_expression, search_filter, suggest
+from app.crud.academic_filter import AcademicFilter, estudiante_academic_filter
+from app.crud.base import BulkInsertResult, CRUDBase
+from app.crud.pagination import ListQuery, Page
 from app.models.estudiante_model import EstudianteModel
 from app.schemas.estudiante_schema import EstudianteCreate, EstudianteUpdate
-from motor.motor_asyncio import AsyncIOMotorCollection
 
 from app.models.malla_curricular_model import NivelEducativo
 from app.models.curso_model import TurnoCurso
 from app.schemas.estudiante_schema import GradoFilter
 
 class CRUDEstudiante(CRUDBase[EstudianteModel, EstudianteCreate, EstudianteUpdate]):
+    async def create(self, db: Any, *, obj_in: EstudianteCreate) -> EstudianteModel:
+        # Copiar nivel/turno/paralelo/anio_escolaridad/gestion del curso
+        obj_in_data = jsonable_encoder(obj_in)
+        obj_in_data.update(await catalog.academic_fields(db, obj_in_data.get("curso_id")))
+        return await super().create(db, obj_in=obj_in_data)
+
+    async def create_many(
+        self, db: Any, *, objs_in: Sequence[EstudianteCreate], chunk_size: int = 1000
+    ) -> BulkInsertResult:
+        # Atributos académicos del curso desde el catálogo en memoria (sin consultas por fila)
+        docs = []
+        for obj_in in objs_in:
+            obj_in_data = jsonable_encoder(obj_in)
+            obj_in_data.update(await catalog.academic_fields(db, obj_in_data.get("curso_id")))
+            docs.append(obj_in_data)
+        return await super().create_many(db, objs_in=docs, chunk_size=chunk_size)
+
+    async def update(
+        self,
+        db: Any,
+        *,
+        obj_in: Union[EstudianteUpdate, Dict[str, Any]],
+        db_obj: Optional[EstudianteModel] = None,
+        id: Any = None,
+        base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[EstudianteModel]:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        if "curso_id" in update_data:
+            update_data = {**update_data, **await catalog.academic_fields(db, update_data["curso_id"])}
+        return await super().update(
+            db, obj_in=update_data, db_obj=db_obj, id=id, base_filter=base_filter
+        )
+
+    async def sync_academic_fields(self, db: Any, *, curso_ids: Iterable[ObjectId]) -> int:
+        """
+        Volver a copiar los atributos académicos en los estudiantes de `curso_ids`
+        (después de modificar o eliminar un curso o su malla). Devuelve cuántos cambiaron.
+        """
+        collection = db[self.collection_name]
+        modified = 0
+        for curso_id in curso_ids:
+            result = await collection.update_many(
+                {"curso_id": {"$in": [curso_id, str(curso_id)]}},
+                {"$set": await catalog.academic_fields(db, curso_id)}
+            )
+            modified += result.modified_count
+        if modified:
+            bump_write_version(self.collection_name)
+        return modified
+
+    def list_query(
+        self,
+        *,
+        q: Optional[str] = None,
+        nivel: Optional[NivelEducativo] = None,
+        grado: Optional[GradoFilter] = None,
+        turno: Optional[TurnoCurso] = None,
+        paralelo: Optional[str] = None
+    ) -> ListQuery:
+        """Consulta del listado (la comparten la paginación y la exportación)"""
+        # 1. Búsqueda por prefijos de nombres, apellidos y RUDE (sin tildes ni mayúsculas)
+        filter_query = search_filter(q) or {}
+
+        # 2. Filtros académicos sobre los campos copiados del curso (índice `academic`)
+        academic = AcademicFilter(nivel, grado, turno, paralelo)
+        if academic.active:
+            filter_query.update(estudiante_academic_filter(academic))
+
+        return ListQuery(filter_query, score=score_expression(q))
+
     async def get_multi_paginated(
         self, 
         db: Any, 
         *, 
         page: int = 1, 
         per_page: int = 10, 
+        after: Optional[str] = None,
+        include_total: bool = True,
+        approx_total: bool = False,
         q: Optional[str] = None,
         nivel: Optional[NivelEducativo] = None,
         grado: Optional[GradoFilter] = None,
         turno: Optional[TurnoCurso] = None,
-        paralelo: Optional[str] = None
-    ) -> Tuple[List[EstudianteModel], int]:
-        collection: AsyncIOMotorCollection = db[self.collection_name]
-        
-        # 1. Base Filter (Search)
-        filter_query = {}
-        if q:
-            regex = {"$regex": q, "$options": "i"}
-            or_conditions = [
-                {"nombres": regex},
-                {"apellidos": regex},
-            ]
-            if q.isdigit():
-                or_conditions.append({"rude": int(q)})
-            filter_query["$or"] = or_conditions
-
-        # 2. Advanced Filters (Requires joining/looking up Cursos and Mallas)
-        # If any of these filters are present, we need to find the valid curso_ids first
-        if nivel or grado or turno or paralelo:
-            curso_query = {}
-            
-            # Direct filters on Curso
-            if nivel:
-                curso_query["nivel"] = nivel
-            if turno:
-                curso_query["turno"] = turno
-            if paralelo:
-                curso_query["paralelo"] = paralelo
-            
-            # Grado filter (requires Malla lookup)
-            if grado:
-                malla_query = {}
-                anio_map = {
-                    GradoFilter.PRE_KINDER: 1,
-                    GradoFilter.KINDER: 2,
-                    GradoFilter.PRIMERO: 1,
-                    GradoFilter.SEGUNDO: 2,
-                    GradoFilter.TERCERO: 3,
-                    GradoFilter.CUARTO: 4,
-                    GradoFilter.QUINTO: 5,
-                    GradoFilter.SEXTO: 6
-                }
-                
-                # Set anio_escolaridad
-                if grado in anio_map:
-                    malla_query["anio_escolaridad"] = anio_map[grado]
-
-                # Special logic for Initial
-                if grado in [GradoFilter.PRE_KINDER, GradoFilter.KINDER]:
-                    malla_query["nivel"] = NivelEducativo.INICIAL.value
-                    # Also enforce it on curso_query to be safe/consistent
-                    curso_query["nivel"] = NivelEducativo.INICIAL.value
-                elif nivel:
-                    # If grado is basic (1-6) and nivel is specified, ensure match in malla
-                    malla_query["nivel"] = nivel.value
-
-                # Find valid mallas
-                mallas_cursor = db["mallas_curriculares"].find(malla_query, projection={"_id": 1})
-                malla_ids = [doc["_id"] for doc in await mallas_cursor.to_list(length=100)]
-                
-                if not malla_ids:
-                    # If no mallas match (e.g. "8vo de Primaria" which doesn't exist), return empty
-                    return [], 0
-                
-                curso_query["malla_id"] = {"$in": malla_ids}
-
-            # Find valid cursos
-            cursos_cursor = db["cursos"].find(curso_query, projection={"_id": 1})
-            curso_ids = [doc["_id"] for doc in await cursos_cursor.to_list(length=1000)]
-            
-            if not curso_ids:
-                 return [], 0
-            
-            # Add to main filter
-            # If we already have criteria (like search), we use $and
-            # But here we can just add the field to the dictionary since keys are unique
-            filter_query["curso_id"] = {"$in": curso_ids}
+        paralelo: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Page:
+        return await self.paginate(
+            db, self.list_query(q=q, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo),
+            page=page, per_page=per_page,
+            after=after, include_total=include_total, approx_total=approx_total, schema=schema
+        )
 
-        total_count = await collection.count_documents(filter_query)
-        
-        skip = (page - 1) * per_page
-        cursor = collection.find(filter_query).skip(skip).limit(per_page)
-        
-        results = []
-        async for doc in cursor:
-            results.append(self.model(**doc))
-            
-        return results, total_count
+    async def suggest(self, db: Any, *, q: str, limit: int = 10) -> List[dict]:
+        """Autocompletar por nombre/apellido/RUDE (documentos crudos, sólo campos de la sugerencia)"""
+        return await suggest(
+            db[self.collection_name], q, limit=limit,
+            projection={"rude": 1, "nombres": 1, "apellidos": 1, "nivel": 1, "paralelo": 1}
+        )
 
 estudiante = CRUDEstudiante(EstudianteModel, "estudiantes")
@@ -1,8 +1,45 @@
+from typing import Any, Dict, Optional, Union
+from app.core.catalog import catalog
 from app.crud.base import CRUDBase
+from app.crud.crud_estudiante import estudiante as crud_estudiante
 from app.models.malla_curricular_model import MallaCurricularModel
 from app.schemas.malla_curricular_schema import MallaCurricularCreate, MallaCurricularUpdate
 
+# Campos de la malla que se copian en los estudiantes de sus cursos
+ACADEMIC_KEYS = {"gestion", "anio_escolaridad"}
+
 class CRUDMalla(CRUDBase[MallaCurricularModel, MallaCurricularCreate, MallaCurricularUpdate]):
-    pass
+    async def update(
+        self,
+        db: Any,
+        *,
+        obj_in: Union[MallaCurricularUpdate, Dict[str, Any]],
+        db_obj: Optional[MallaCurricularModel] = None,
+        id: Any = None,
+        base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[MallaCurricularModel]:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        updated = await super().update(
+            db, obj_in=update_data, db_obj=db_obj, id=id, base_filter=base_filter
+        )
+        if updated and ACADEMIC_KEYS & update_data.keys():
+            await self._sync_estudiantes(db, updated.id)
+        return updated
+
+    async def remove(
+        self, db: Any, *, id: Any, base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[MallaCurricularModel]:
+        removed = await super().remove(db, id=id, base_filter=base_filter)
+        if removed:
+            # Sin malla, anio_escolaridad y gestion de sus estudiantes quedan en null
+            await self._sync_estudiantes(db, removed.id)
+        return removed
+
+    async def _sync_estudiantes(self, db: Any, malla_id: Any) -> None:
+        """Volver a copiar los campos de la malla en los estudiantes de sus cursos"""
+        cursos = (await catalog.load(db)).cursos.values()
+        await crud_estudiante.sync_academic_fields(
+            db, curso_ids=[c.id for c in cursos if c.malla_id == malla_id]
+        )
 
 malla = CRUDMalla(MallaCurricularModel, "mallas_curriculares")
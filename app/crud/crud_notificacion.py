@@ -1,6 +1,7 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from bson import ObjectId
 from app.core.database import get_database
+from app.crud.pagination import and_filters, decode_cursor, encode_cursor, seek_filter
 from app.models.notificacion_model import NotificacionModel
 from datetime import datetime
 
@@ -8,6 +9,9 @@ from datetime import datetime
 class CRUDNotificacion:
     """CRUD operations for notifications"""
 
+    # Orden de la bandeja: más recientes primero (con _id como desempate)
+    sort = [("created_at", -1), ("_id", -1)]
+
     async def create(self, db, notificacion_data: dict) -> dict:
         """Create a new notification"""
         collection = db["notificaciones"]
@@ -46,26 +50,41 @@ class CRUDNotificacion:
         user_id: str, 
         skip: int = 0, 
         limit: int = 50,
-        is_read: Optional[bool] = None
-    ) -> List[dict]:
-        """Get all notifications for a specific user"""
+        is_read: Optional[bool] = None,
+        after: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Get notifications for a specific user.
+        With `after` (cursor) the page starts right after the cursor and `skip` is ignored.
+        Returns the notifications and the cursor of the next page (None if there is none).
+        """
         collection = db["notificaciones"]
         
         query = {"user_id": ObjectId(user_id)}
         if is_read is not None:
             query["is_read"] = is_read
         
-        cursor = collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
+        if after:
+            query = and_filters(query, seek_filter(self.sort, decode_cursor(after)))
+            cursor = collection.find(query).sort(self.sort).limit(limit + 1)
+        else:
+            cursor = collection.find(query).sort(self.sort).skip(skip).limit(limit + 1)
+        
+        docs = await cursor.to_list(length=limit + 1)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1], self.sort)
         
         notifications = []
-        async for notif in cursor:
+        for notif in docs:
             notif["_id"] = str(notif["_id"])
             notif["user_id"] = str(notif["user_id"])
             if notif.get("related_id"):
                 notif["related_id"] = str(notif["related_id"])
             notifications.append(notif)
         
-        return notifications
+        return notifications, next_cursor
 
     async def get_by_id(self, db, notificacion_id: str) -> Optional[dict]:
         """Get a specific notification by ID"""
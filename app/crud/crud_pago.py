@@ -1,40 +1,32 @@
-from typing import Any, List, Optional, Tuple
+from typing import Any, Optional, Type
+from pydantic import BaseModel
+from app.core.search import score_expression, search_filter
 from app.crud.base import CRUDBase
+from app.crud.pagination import ListQuery, Page
 from app.models.pago_model import PagoModel
 from app.schemas.pago_schema import PagoCreate, PagoUpdate
 
 class CRUDPago(CRUDBase[PagoModel, PagoCreate, PagoUpdate]):
+    def list_query(self, *, q: Optional[str] = None) -> ListQuery:
+        """Consulta del listado (la comparten la paginación y la exportación)"""
+        # Búsqueda por prefijos de concepto y estado
+        return ListQuery(search_filter(q) or {}, score=score_expression(q))
+
     async def get_paginated(
         self, 
         db: Any, 
         page: int = 1, 
         per_page: int = 10, 
-        q: Optional[str] = None
-    ) -> Tuple[List[PagoModel], int]:
-        collection = db[self.collection_name]
-        filter_query = {}
-        
-        # 1. Aplicar Filtros (Búsqueda insensible a mayúsculas)
-        if q:
-            regex = {"$regex": q, "$options": "i"}
-            or_conditions = [
-                {"concepto": regex},
-                {"estado": regex}
-            ]
-            
-            filter_query = {"$or": or_conditions}
-
-        # 2. Obtener Total (CRÍTICO para calcular páginas)
-        total_count = await collection.count_documents(filter_query)
-        
-        # 3. Aplicar Paginación (Skip & Limit)
-        skip = (page - 1) * per_page
-        cursor = collection.find(filter_query).skip(skip).limit(per_page)
-        
-        results = []
-        async for doc in cursor:
-            results.append(self.model(**doc))
-            
-        return results, total_count
+        after: Optional[str] = None,
+        include_total: bool = True,
+        approx_total: bool = False,
+        q: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Page:
+        # Total + página (por número o por cursor)
+        return await self.paginate(
+            db, self.list_query(q=q), page=page, per_page=per_page,
+            after=after, include_total=include_total, approx_total=approx_total, schema=schema
+        )
 
 pago = CRUDPago(PagoModel, "pagos")
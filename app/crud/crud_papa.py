@@ -1,6 +1,12 @@
-from typing import Any, Dict, Optional, Union, List, Tuple
+from typing import Any, Dict, List, Optional, Type, Union
+from pydantic import BaseModel
 from bson import ObjectId
+from pymongo import ReturnDocument
+from app.core.cache import bump_write_version
+from app.core.search import score_expression, search_filter, search_document_fields, suggest
+from app.crud.academic_filter import AcademicFilter, estudiante_lookup_stages
 from app.crud.base import CRUDBase
+from app.crud.pagination import ListQuery, Page, and_filters
 from app.models.papa_model import PapaModel
 from app.schemas.papa_schema import PapaCreate, PapaUpdate
 
@@ -13,10 +19,12 @@ class CRUDPapa(CRUDBase[PapaModel, PapaCreate, PapaUpdate]):
     async def update(
         self, 
         db: Any, 
-        *, 
-        db_obj: PapaModel, 
-        obj_in: Union[PapaUpdate, Dict[str, Any]]
-    ) -> PapaModel:
+        *,
+        obj_in: Union[PapaUpdate, Dict[str, Any]],
+        db_obj: Optional[PapaModel] = None,
+        id: Any = None,
+        base_filter: Optional[Dict[str, Any]] = None
+    ) -> Optional[PapaModel]:
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
@@ -25,8 +33,22 @@ class CRUDPapa(CRUDBase[PapaModel, PapaCreate, PapaUpdate]):
         # Explicitly remove hijos_ids if present
         if "hijos_ids" in update_data:
             del update_data["hijos_ids"]
+
+        # 'password' llega ya hasheada (como en create)
+        if update_data.get("password"):
+            update_data = {**update_data, "hashed_password": update_data["password"]}
             
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = await super().update(
+            db, obj_in=update_data, db_obj=db_obj, id=id, base_filter=base_filter
+        )
+        if user and ("hashed_password" in update_data or "is_active" in update_data):
+            await self.revoke_tokens(db, papa_id=user.id)
+        return user
+
+    async def revoke_tokens(self, db: Any, *, papa_id: Any) -> None:
+        """Invalidar los tokens autocontenidos emitidos hasta ahora (token_version + 1)"""
+        await db[self.collection_name].update_one({"_id": ObjectId(papa_id)}, {"$inc": {"token_version": 1}})
+        bump_write_version(self.collection_name)
 
     async def get_by_email(self, db: Any, *, email: str) -> Optional[PapaModel]:
         # We access "users" collection because Papas are users
@@ -37,49 +59,38 @@ class CRUDPapa(CRUDBase[PapaModel, PapaCreate, PapaUpdate]):
         return None
 
     async def add_child(self, db: Any, *, papa_id: str, child_id: str) -> Optional[PapaModel]:
-        collection = db[self.collection_name]
-        
-        # Verify student exists? Assuming handled by caller or frontend, 
-        # but for safety we could check student existence here or just trust ID.
-        # Let's perform the update.
-        result = await collection.update_one(
-            {"_id": ObjectId(papa_id), "role": "PADRE"},
-            {"$addToSet": {"hijos_ids": ObjectId(child_id)}}
-        )
-        
-        if result.modified_count > 0:
-            return await self.get(db, id=papa_id)
-        
-        # If not modified either papa doesn't exist or child already added.
-        # Just return current state.
-        return await self.get(db, id=papa_id)
+        """Agregar un hijo (sin repetir). Devuelve el padre actualizado o None si no existe"""
+        return await self._update_hijos(db, papa_id, {"$addToSet": {"hijos_ids": ObjectId(child_id)}})
 
     async def remove_child(self, db: Any, *, papa_id: str, child_id: str) -> Optional[PapaModel]:
-        collection = db[self.collection_name]
-        
-        result = await collection.update_one(
-            {"_id": ObjectId(papa_id), "role": "PADRE"},
-            {"$pull": {"hijos_ids": ObjectId(child_id)}}
+        """Quitar un hijo. Devuelve el padre actualizado o None si no existe"""
+        return await self._update_hijos(db, papa_id, {"$pull": {"hijos_ids": ObjectId(child_id)}})
+
+    async def _update_hijos(self, db: Any, papa_id: str, update: Dict[str, Any]) -> Optional[PapaModel]:
+        filter_query = self._id_filter(papa_id, {"role": "PADRE"})
+        if filter_query is None:
+            return None
+        # Los tokens autocontenidos llevan hijos_ids: los anteriores se revocan
+        doc = await db[self.collection_name].find_one_and_update(
+            filter_query, {**update, "$inc": {"token_version": 1}}, return_document=ReturnDocument.AFTER
         )
-        
-        if result.modified_count > 0:
-            return await self.get(db, id=papa_id)
-            
-        return await self.get(db, id=papa_id)
+        if not doc:
+            return None
+        bump_write_version(self.collection_name)
+        return self.model(**doc)
 
-    async def create(self, db: Any, *, obj_in: PapaCreate) -> PapaModel:
+    def _to_document(self, obj_in: Union[PapaCreate, Dict[str, Any]]) -> Dict[str, Any]:
+        """Documento de un padre nuevo (lo usan create y create_many)"""
         # Convert Pydantic model to dict
-        obj_in_data = obj_in.model_dump()
+        obj_in_data = dict(obj_in) if isinstance(obj_in, dict) else obj_in.model_dump()
         
         # Map 'password' to 'hashed_password' if present
+        # (se espera ya hasheada: hash_password / hash_passwords)
         if "password" in obj_in_data:
             password = obj_in_data.pop("password")
             if password:
                 obj_in_data["hashed_password"] = password
         
-            if password:
-                obj_in_data["hashed_password"] = password
-        
         # Ensure role is PADRE
         obj_in_data["role"] = "PADRE"
         
@@ -91,98 +102,62 @@ class CRUDPapa(CRUDBase[PapaModel, PapaCreate, PapaUpdate]):
         if "is_active" not in obj_in_data:
             obj_in_data["is_active"] = True
             
-        collection = db[self.collection_name]
-        result = await collection.insert_one(obj_in_data)
-        
-        obj_in_data["_id"] = result.inserted_id
-        return self.model(**obj_in_data)
+        obj_in_data.update(search_document_fields(self.collection_name, obj_in_data))
+        return obj_in_data
 
-    async def get_paginated(
-        self, 
-        db: Any, 
-        page: int = 1, 
-        per_page: int = 10, 
+    def list_query(
+        self,
+        *,
         q: Optional[str] = None,
         nivel: Optional[NivelEducativo] = None,
         grado: Optional[GradoFilter] = None,
         turno: Optional[TurnoCurso] = None,
         paralelo: Optional[str] = None
-    ) -> Tuple[List[PapaModel], int]:
-        collection = db[self.collection_name]
-        
+    ) -> ListQuery:
+        """Consulta del listado (la comparten la paginación y la exportación)"""
         # Base filter: Must be PADRE
         filter_query = {"role": "PADRE"}
         
-        # 1. Aplicar Filtros (Búsqueda insensible a mayúsculas)
-        if q:
-            regex = {"$regex": q, "$options": "i"}
-            or_conditions = [
-                {"nombre": regex},
-                {"apellido": regex},
-                {"email": regex},
-                {"telefono": regex}
-            ]
-            filter_query["$or"] = or_conditions
+        # 1. Búsqueda por prefijos de nombre, apellido, email y teléfono
+        filter_query = and_filters(filter_query, search_filter(q))
 
-        # 2. Filtros Avanzados (Join Logic)
-        if nivel or grado or turno or paralelo:
-            # Reutilizamos lógica de curso/malla
-            curso_query = {}
-            if nivel: curso_query["nivel"] = nivel
-            if turno: curso_query["turno"] = turno
-            if paralelo: curso_query["paralelo"] = paralelo
-            
-            if grado:
-                malla_query = {}
-                anio_map = {
-                    GradoFilter.PRE_KINDER: 1, GradoFilter.KINDER: 2,
-                    GradoFilter.PRIMERO: 1, GradoFilter.SEGUNDO: 2,
-                    GradoFilter.TERCERO: 3, GradoFilter.CUARTO: 4,
-                    GradoFilter.QUINTO: 5, GradoFilter.SEXTO: 6
-                }
-                if grado in anio_map:
-                    malla_query["anio_escolaridad"] = anio_map[grado]
-                
-                # Special logic for Initial
-                if grado in [GradoFilter.PRE_KINDER, GradoFilter.KINDER]:
-                    malla_query["nivel"] = NivelEducativo.INICIAL.value
-                    curso_query["nivel"] = NivelEducativo.INICIAL.value
-                elif nivel:
-                     malla_query["nivel"] = nivel.value
+        # 2. Filtros académicos: padres con al menos un hijo en los cursos que cumplen el filtro
+        stages = []
+        academic = AcademicFilter(nivel, grado, turno, paralelo)
+        if academic.active:
+            stages = estudiante_lookup_stages("hijos_ids", academic)
 
-                mallas = await db["mallas_curriculares"].find(malla_query, projection={"_id": 1}).to_list(100)
-                malla_ids = [m["_id"] for m in mallas]
-                if not malla_ids: return [], 0
-                curso_query["malla_id"] = {"$in": malla_ids}
+        # 3. Más recientes primero
+        return ListQuery(filter_query, [("created_at", -1)], stages, score_expression(q))
 
-            cursos = await db["cursos"].find(curso_query, projection={"_id": 1}).to_list(1000)
-            curso_ids = [c["_id"] for c in cursos]
-            
-            if not curso_ids:
-                return [], 0
-                
-            # Buscar estudiantes en esos cursos
-            estudiantes = await db["estudiantes"].find({"curso_id": {"$in": curso_ids}}, projection={"_id": 1}).to_list(10000)
-            estudiante_ids = [e["_id"] for e in estudiantes]
-            
-            if not estudiante_ids:
-                return [], 0
-            
-            # Filtrar padres que tengan al menos uno de estos hijos
-            filter_query["hijos_ids"] = {"$in": estudiante_ids}
+    async def get_paginated(
+        self, 
+        db: Any, 
+        page: int = 1, 
+        per_page: int = 10, 
+        after: Optional[str] = None,
+        include_total: bool = True,
+        approx_total: bool = False,
+        q: Optional[str] = None,
+        nivel: Optional[NivelEducativo] = None,
+        grado: Optional[GradoFilter] = None,
+        turno: Optional[TurnoCurso] = None,
+        paralelo: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Page:
+        # Total + página (por número o por cursor)
+        return await self.paginate(
+            db, self.list_query(q=q, nivel=nivel, grado=grado, turno=turno, paralelo=paralelo),
+            page=page, per_page=per_page,
+            after=after, include_total=include_total, approx_total=approx_total, schema=schema
+        )
 
-        # 3. Obtener Total (CRÍTICO para calcular páginas)
-        total_count = await collection.count_documents(filter_query)
-        
-        # 4. Aplicar Paginación (Skip & Limit)
-        skip = (page - 1) * per_page
-        cursor = collection.find(filter_query).skip(skip).limit(per_page).sort("created_at", -1)
-        
-        results = []
-        async for doc in cursor:
-            results.append(self.model(**doc))
-            
-        return results, total_count
+    async def suggest(self, db: Any, *, q: str, limit: int = 10) -> List[dict]:
+        """Autocompletar padres por nombre/apellido/email/teléfono"""
+        return await suggest(
+            db[self.collection_name], q, limit=limit, base_filter={"role": "PADRE"},
+            projection={"nombre": 1, "apellido": 1, "email": 1}
+        )
 
 # Instance pointing to "users" collection
 papa = CRUDPapa(PapaModel, "users")
@@ -0,0 +1,113 @@
+"""
+Cargador por lotes por request (DataLoader).
+
+Las rutas buscan entidades relacionadas de a una (el estudiante de un pago, el
+padre que lo registró, los hijos de un padre...). `Loader.load` no consulta
+en el momento: junta todos los ids pedidos a la misma colección durante el
+mismo ciclo del event loop y los resuelve con un único `{"_id": {"$in": [...]}}`.
+Los ids repetidos se piden una sola vez y quedan memorizados hasta que termina
+el request.
+
+    loader: Loader = Depends(get_loader)
+    estudiante, padre = await asyncio.gather(
+        loader.load("estudiantes", pago["estudiante_id"]),
+        loader.load("users", pago["padre_id"]),
+    )
+
+Devuelve documentos crudos de Mongo (o None si el id no existe o no es válido).
+Después de escribir un documento usar `clear` para no leer la versión vieja.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.core.database import get_database
+
+
+def as_object_id(value: Any) -> Optional[ObjectId]:
+    if isinstance(value, ObjectId):
+        return value
+    if value is not None and ObjectId.is_valid(str(value)):
+        return ObjectId(str(value))
+    return None
+
+
+async def find_by_ids(
+    collection: AsyncIOMotorCollection,
+    ids: Iterable[Any],
+    projection: Optional[Dict[str, Any]] = None
+) -> Dict[ObjectId, dict]:
+    """Documentos de `ids` (sin repetir) en una sola consulta, indexados por _id"""
+    oids = list(dict.fromkeys(oid for oid in map(as_object_id, ids) if oid))
+    if not oids:
+        return {}
+    cursor = collection.find({"_id": {"$in": oids}}, projection)
+    return {doc["_id"]: doc async for doc in cursor}
+
+
+class Loader:
+    def __init__(self, db: Any):
+        self.db = db
+        self.queries = 0
+        self._futures: Dict[Tuple[str, ObjectId], asyncio.Future] = {}
+        self._pending: Dict[str, Dict[ObjectId, asyncio.Future]] = {}
+        # El event loop guarda las tareas con referencias débiles: sin esta, una consulta en curso podría perderse
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(self, collection_name: str, id: Any) -> "asyncio.Future[Optional[dict]]":
+        """Documento `id` de `collection_name`, resuelto junto con los demás ids del lote"""
+        loop = asyncio.get_running_loop()
+        oid = as_object_id(id)
+        if oid is None:
+            future = loop.create_future()
+            future.set_result(None)
+            return future
+
+        key = (collection_name, oid)
+        if key in self._futures:
+            return self._futures[key]
+
+        future = loop.create_future()
+        self._futures[key] = future
+        pending = self._pending.setdefault(collection_name, {})
+        if not pending:
+            # Primer id del lote: despachar cuando las demás tareas de este ciclo hayan pedido los suyos
+            loop.call_soon(self._dispatch, collection_name)
+        pending[oid] = future
+        return future
+
+    async def load_many(self, collection_name: str, ids: Iterable[Any]) -> List[Optional[dict]]:
+        """Documentos de `ids` en el mismo orden (None para los que no existen)"""
+        return list(await asyncio.gather(*(self.load(collection_name, id) for id in ids)))
+
+    def clear(self, collection_name: str, id: Any) -> None:
+        """Olvidar el documento memorizado (p. ej. después de modificarlo)"""
+        oid = as_object_id(id)
+        if oid is not None:
+            self._futures.pop((collection_name, oid), None)
+
+    def _dispatch(self, collection_name: str) -> None:
+        batch = self._pending.pop(collection_name, {})
+        if batch:
+            task = asyncio.ensure_future(self._fetch(collection_name, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, collection_name: str, batch: Dict[ObjectId, asyncio.Future]) -> None:
+        self.queries += 1
+        try:
+            docs = await find_by_ids(self.db[collection_name], batch)
+        except Exception as e:
+            for oid, future in batch.items():
+                self._futures.pop((collection_name, oid), None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for oid, future in batch.items():
+            if not future.done():
+                future.set_result(docs.get(oid))
+
+
+def get_loader() -> Loader:
+    """Dependencia: FastAPI crea un Loader por request"""
+    return Loader(get_database())
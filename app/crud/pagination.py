@@ -0,0 +1,312 @@
+"""
+Paginación compartida por los CRUDs.
+
+Dos modos:
+- Por número de página (`page`): skip/limit, usado por el panel de administración.
+- Por cursor (`after`): predicado "seek" sobre (clave de orden, _id) respaldado
+  por índice. No recorre los documentos de las páginas anteriores.
+
+El cursor es opaco para el cliente: los valores de orden del último documento
+de la página, serializados con bson.json_util y codificados en base64.
+
+La página es siempre la misma consulta, con o sin total: el seek va en el
+primer $match, donde lo resuelve el índice. Si hay que contar, el conteo
+(count_documents, o $match + etapas + $count si el listado tiene etapas) corre
+en paralelo con la página. No se usa $facet: todo lo que entra a un $facet
+se evalúa sin índices, así que un cursor con total terminaría recorriendo el
+filtro completo. Con include_total=False no se cuenta nada.
+
+Los totales exactos se guardan en una caché por (colección, filtro
+normalizado, versión de escritura de la colección): mientras nadie escriba en
+la colección desde este proceso, las páginas siguientes del mismo listado
+reutilizan el conteo y sólo piden la página. El TTL acota lo desactualizado
+que puede estar un total si escribe otro proceso. Con approx_total=True y sin
+filtro se usa estimated_document_count (metadatos de la colección).
+
+Un listado puede añadir etapas de agregación (`stages`, p. ej. los $lookup
+del filtro académico) que se aplican después del $match y del $sort. Si
+alguna hace $lookup a otra colección, la clave del total incluye también la
+versión de escritura de esa colección.
+
+Con `score` (expresión de relevancia, p. ej. de app.core.search) el listado
+se ordena primero por ese puntaje, guardado en el campo `_score`, y después
+por el orden normal. El cursor incluye el puntaje.
+
+Con `projection` (de inclusión) sólo se traen esos campos; las claves de
+orden se agregan siempre porque el cursor se arma con ellas.
+
+`total_status` indica de dónde salió el total: "exact", "cached",
+"estimated" o "skipped" (no se calculó).
+
+`stream` recorre el listado completo (mismo filtro, etapas y orden) con un
+solo cursor de Mongo y lotes de `batch_size`: es la base de las exportaciones.
+"""
+import asyncio
+import base64
+import binascii
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from bson import json_util
+from motor.motor_asyncio import AsyncIOMotorCollection
+from app.core.cache import TTLCache, get_write_version
+from app.core.config import settings
+
+SortSpec = List[Tuple[str, int]]
+
+TOTAL_EXACT = "exact"
+TOTAL_CACHED = "cached"
+TOTAL_ESTIMATED = "estimated"
+TOTAL_SKIPPED = "skipped"
+
+SCORE_FIELD = "_score"
+
+count_cache = TTLCache(maxsize=2048, ttl=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+class InvalidCursor(ValueError):
+    """El cursor `after` no es válido para este listado"""
+
+
+class ListQuery(NamedTuple):
+    """Filtro, orden, etapas extra y puntaje de relevancia de un listado"""
+    filter: Dict[str, Any]
+    sort: SortSpec = [("_id", 1)]
+    stages: List[Dict[str, Any]] = []
+    score: Optional[Dict[str, Any]] = None
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    total: Optional[int]
+    next_cursor: Optional[str] = None
+    total_status: str = TOTAL_EXACT
+
+    def to_response(self, *, page: int, per_page: int) -> dict:
+        """Dict con la forma de PaginatedResponse"""
+        total_pages = None
+        if self.total is not None:
+            total_pages = -(-self.total // per_page) if per_page > 0 else 0
+        return {
+            "total": self.total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": total_pages,
+            "total_status": self.total_status,
+            "next_cursor": self.next_cursor,
+            "data": self.items
+        }
+
+
+EMPTY_PAGE = Page([], 0)
+
+
+def with_tiebreaker(sort: SortSpec) -> SortSpec:
+    """Agregar _id como desempate para que el orden sea total y estable"""
+    if any(key == "_id" for key, _ in sort):
+        return list(sort)
+    return list(sort) + [("_id", sort[0][1] if sort else 1)]
+
+
+def encode_cursor(doc: dict, sort: SortSpec) -> str:
+    values = [doc.get(key) for key, _ in sort]
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json_util.loads(raw.decode("utf-8"))
+    except (binascii.Error, ValueError):
+        raise InvalidCursor("Cursor de paginación inválido")
+    if not isinstance(values, list):
+        raise InvalidCursor("Cursor de paginación inválido")
+    return values
+
+
+def seek_filter(sort: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """
+    Documentos estrictamente posteriores a `values` según `sort`:
+    (k0 > v0) OR (k0 == v0 AND k1 > v1) OR ... (o < en orden descendente,
+    más k == null: null es el menor valor de Mongo y va al final)
+    """
+    if len(values) != len(sort):
+        raise InvalidCursor("El cursor no corresponde a este listado")
+
+    branches = []
+    for i, (key, direction) in enumerate(sort):
+        branch = {prev_key: values[j] for j, (prev_key, _) in enumerate(sort[:i])}
+        value = values[i]
+        if value is None:
+            # null es el menor valor en el orden de Mongo
+            if direction < 0:
+                continue
+            branch[key] = {"$ne": None}
+        elif direction > 0:
+            branch[key] = {"$gt": value}
+        else:
+            branch[key] = {"$lt": value}
+            if key != "_id":
+                branches.append(branch)
+                # $lt no incluye null ni ausente (Mongo no compara entre tipos),
+                # que en descendente van después de cualquier valor
+                branch = {**branch, key: None}
+        branches.append(branch)
+
+    if not branches:
+        # Nada puede venir después del último valor posible
+        return {"_id": {"$exists": False}}
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def and_filters(*filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Combinar filtros con $and, omitiendo los vacíos"""
+    filters = [f for f in filters if f]
+    if not filters:
+        return {}
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+def count_cache_key(collection: AsyncIOMotorCollection, query: ListQuery) -> tuple:
+    """Clave del total: el filtro se serializa con claves ordenadas para que
+    {"a": 1, "b": 2} y {"b": 2, "a": 1} compartan entrada."""
+    sources = sorted({collection.name} | {
+        stage["$lookup"]["from"] for stage in query.stages if "$lookup" in stage
+    })
+    return (
+        collection.name,
+        json_util.dumps([query.filter, query.stages], sort_keys=True),
+        tuple(get_write_version(name) for name in sources),
+    )
+
+
+def ordered_stages(query: ListQuery, sort: SortSpec, seek: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """$match (+ seek), puntaje si lo hay y $sort"""
+    if query.score is None:
+        stages = [{"$match": and_filters(query.filter, seek) if seek else query.filter}]
+    else:
+        # El seek sobre _score sólo se puede aplicar después de calcularlo
+        stages = [{"$match": query.filter}, {"$addFields": {SCORE_FIELD: query.score}}]
+        if seek:
+            stages.append({"$match": seek})
+    return stages + [{"$sort": dict(sort)}]
+
+
+async def _count(collection: AsyncIOMotorCollection, query: ListQuery) -> int:
+    """Total exacto del listado (sin seek ni skip)"""
+    if not query.stages:
+        return await collection.count_documents(query.filter)
+    # Las etapas pueden filtrar (p. ej. $lookup + $match del filtro académico)
+    pipeline = [{"$match": query.filter}, *query.stages, {"$count": "count"}]
+    result = await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+    return result[0]["count"] if result else 0
+
+
+async def _fetch_page(
+    collection: AsyncIOMotorCollection,
+    query: ListQuery,
+    sort: SortSpec,
+    seek: Optional[Dict[str, Any]],
+    *,
+    page: int,
+    per_page: int,
+    project_stages: List[Dict[str, Any]],
+    projection: Optional[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """per_page + 1 documentos (el de más indica que hay otra página)"""
+    if query.stages or query.score is not None:
+        # Las etapas no cambian el orden, así que el seek puede ir antes que ellas
+        pipeline = ordered_stages(query, sort, seek) + query.stages
+        if not seek:
+            pipeline.append({"$skip": (page - 1) * per_page})
+        pipeline.append({"$limit": per_page + 1})
+        pipeline += project_stages
+        return await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=per_page + 1)
+
+    if seek:
+        cursor = collection.find(and_filters(query.filter, seek), projection).sort(sort)
+    else:
+        cursor = collection.find(query.filter, projection).sort(sort).skip((page - 1) * per_page)
+    return await cursor.limit(per_page + 1).to_list(length=per_page + 1)
+
+
+async def paginate(
+    collection: AsyncIOMotorCollection,
+    query: ListQuery,
+    *,
+    page: int = 1,
+    per_page: int = 10,
+    after: Optional[str] = None,
+    include_total: bool = True,
+    approx_total: bool = False,
+    projection: Optional[Dict[str, Any]] = None
+) -> Page:
+    """Página de documentos crudos + total (o None) + cursor de la siguiente página"""
+    sort = with_tiebreaker(query.sort)
+    if query.score is not None:
+        sort = [(SCORE_FIELD, -1)] + sort
+    seek = seek_filter(sort, decode_cursor(after)) if after else None
+    if projection:
+        projection = {**projection, **dict.fromkeys((key for key, _ in sort), 1)}
+    project_stages = [{"$project": projection}] if projection else []
+
+    total_count = None
+    total_status = TOTAL_SKIPPED
+    count_key = None
+    if include_total:
+        if approx_total and not query.filter and not query.stages:
+            total_count = await collection.estimated_document_count()
+            total_status = TOTAL_ESTIMATED
+        else:
+            count_key = count_cache_key(collection, query)
+            total_count = count_cache.get(count_key)
+            if total_count is not None:
+                total_status = TOTAL_CACHED
+
+    fetch = _fetch_page(
+        collection, query, sort, seek, page=page, per_page=per_page, project_stages=project_stages,
+        projection=projection
+    )
+    if include_total and total_count is None:
+        total_count, docs = await asyncio.gather(_count(collection, query), fetch)
+        total_status = TOTAL_EXACT
+        count_cache.set(count_key, total_count)
+    else:
+        docs = await fetch
+
+    next_cursor = None
+    if len(docs) > per_page:
+        docs = docs[:per_page]
+        next_cursor = encode_cursor(docs[-1], sort)
+
+    return Page(docs, total_count, next_cursor, total_status)
+
+
+async def stream(
+    collection: AsyncIOMotorCollection,
+    query: ListQuery,
+    *,
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: int = 500
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Todos los documentos de `query`, en el orden del listado, leídos de a
+    `batch_size` desde un único cursor: la memoria no depende del total.
+    """
+    sort = with_tiebreaker(query.sort)
+    if query.score is not None:
+        sort = [(SCORE_FIELD, -1)] + sort
+
+    if query.stages or query.score is not None:
+        pipeline = ordered_stages(query, sort) + query.stages
+        if projection:
+            pipeline.append({"$project": projection})
+        cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+    else:
+        cursor = collection.find(query.filter, projection).sort(sort).batch_size(batch_size)
+
+    try:
+        async for doc in cursor:
+            yield doc
+    finally:
+        # Si el cliente corta la descarga, liberar el cursor del servidor ya
+        await cursor.close()
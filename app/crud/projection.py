@@ -0,0 +1,54 @@
+"""
+Proyecciones derivadas de los schemas de respuesta.
+
+Los CRUDs leen documentos completos para construir el modelo de la colección,
+aunque la ruta responda con un schema más chico (PapaResponse no incluye
+hashed_password ni search_keys). Con `schema_projection(PapaResponse)` Mongo
+devuelve sólo los campos que se van a responder. `fill_defaults` completa los
+valores por defecto del modelo (p. ej. created_at) igual que si se hubiera
+leído completo, y `load_projected` además valida el documento con el schema.
+
+Los listados no validan nada aquí: devuelven los documentos con
+`fill_defaults` y la ruta los valida y serializa una sola vez
+(app.core.responses).
+"""
+from functools import lru_cache
+from typing import Any, Dict, Tuple, Type
+from pydantic import BaseModel
+
+
+@lru_cache(maxsize=None)
+def _stored_fields(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Nombres de los campos tal como se guardan en Mongo (id -> _id)"""
+    return tuple(field.alias or name for name, field in schema.model_fields.items())
+
+
+@lru_cache(maxsize=None)
+def schema_projection(schema: Type[BaseModel]) -> Dict[str, int]:
+    """Proyección de inclusión con los campos de `schema` (siempre incluye _id).
+    El dict es compartido: copiarlo antes de modificarlo."""
+    return {"_id": 1, **dict.fromkeys(_stored_fields(schema), 1)}
+
+
+@lru_cache(maxsize=None)
+def _defaulted_fields(model: Type[BaseModel], schema: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    """Campos opcionales de `model` que también responde `schema`"""
+    wanted = set(_stored_fields(schema))
+    return tuple(
+        (field.alias or name, field)
+        for name, field in model.model_fields.items()
+        if not field.is_required() and (field.alias or name) in wanted
+    )
+
+
+def fill_defaults(model: Type[BaseModel], schema: Type[BaseModel], doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Agregar a `doc` (en el lugar) los defaults de `model` para los campos de `schema` que falten"""
+    for key, field in _defaulted_fields(model, schema):
+        if key not in doc:
+            doc[key] = field.get_default(call_default_factory=True)
+    return doc
+
+
+def load_projected(model: Type[BaseModel], schema: Type[BaseModel], doc: Dict[str, Any]) -> BaseModel:
+    """Validar un documento proyectado con `schema`, con los defaults de `model` para lo que falte"""
+    return schema(**fill_defaults(model, schema, doc))
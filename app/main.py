@@ -1,6 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.datastructures import Default
 from app.core.config import settings
+from app.core.responses import ORJSONResponse, warm_up
+from app.core.security import shutdown_hash_pool
+from app.core.jobs import job_runner
+from app.crud.pagination import InvalidCursor
 from app.core.database import connect_to_mongo, close_mongo_connection, create_super_admin
 from app.api.auth_router import router as auth_router
 from app.api.admin_router import router as admin_router
@@ -13,11 +18,15 @@ from app.api.mallas_router import router as mallas_router
 from app.api.pagos_router import router as pagos_router
 from app.api.papas_router import router as papas_router
 from app.api.notificaciones_router import router as notificaciones_router
+from app.api.jobs_router import router as jobs_router
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    description="Admin Cole API - Auth, Admin, Reuniones, Licencias & Hijos"
+    description="Admin Cole API - Auth, Admin, Reuniones, Licencias & Hijos",
+    # Default(...) mantiene la serialización directa de pydantic en las rutas con response_model;
+    # orjson se usa en las que no lo tienen
+    default_response_class=Default(ORJSONResponse)
 )
 
 # CORS middleware
@@ -28,17 +37,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos los métodos (GET, POST, etc.)
     allow_headers=["*"],  # Permite todos los encabezados
+    expose_headers=["X-Next-Cursor"],  # Cursor de paginación de notificaciones
 )
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return ORJSONResponse(status_code=400, content={"detail": str(exc)})
+
 # Event handlers
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
     await create_super_admin()
+    warm_up(app.routes)
+    job_runner.start(settings.JOB_WORKERS)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Los trabajos en curso vuelven a la cola y se retoman desde su último lote
+    await job_runner.stop()
     await close_mongo_connection()
+    shutdown_hash_pool()
 
 # Include routers
 app.include_router(papas_router, prefix="/api/papas", tags=["papas"])
@@ -52,6 +71,7 @@ app.include_router(libretas_router, prefix="/api/libretas", tags=["libretas"])
 app.include_router(mallas_router, prefix="/api/mallas", tags=["mallas"])
 app.include_router(pagos_router, prefix="/api/pagos", tags=["pagos"])
 app.include_router(notificaciones_router, prefix="/api/notificaciones", tags=["notificaciones"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["jobs"])
 
 
 @app.get("/")
@@ -1,7 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import datetime
-from bson import ObjectId
 from enum import Enum
 from .common import PyObjectId
 from .malla_curricular_model import NivelEducativo
@@ -27,7 +26,6 @@ class CursoModel(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str, datetime: lambda v: v.isoformat()},
         json_schema_extra={
             "example": {
                 "nombre": "Quinto A Secundaria",
@@ -1,7 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import Optional, List
 from datetime import datetime
-from bson import ObjectId
 from enum import Enum
 from .common import PyObjectId
 
@@ -21,6 +20,14 @@ class EstudianteModel(BaseModel):
     curso_id: Optional[PyObjectId] = Field(None, description="ID del curso actual")
     estado: EstadoEstudiante = Field(default=EstadoEstudiante.ACTIVO, description="Estado académico")
 
+    # Copia de los atributos del curso y su malla (se sincronizan al cambiar curso_id,
+    # el curso o la malla) para filtrar sin joins
+    nivel: Optional[str] = Field(None, description="Nivel del curso")
+    turno: Optional[str] = Field(None, description="Turno del curso")
+    paralelo: Optional[str] = Field(None, description="Paralelo del curso")
+    anio_escolaridad: Optional[int] = Field(None, description="Año de escolaridad de la malla del curso")
+    gestion: Optional[int] = Field(None, description="Gestión de la malla del curso")
+
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -40,10 +47,6 @@ class EstudianteModel(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={
-            ObjectId: str,
-            datetime: lambda v: v.isoformat()
-        },
         json_schema_extra={
             "example": {
                 "rude": 8078012345678,
@@ -0,0 +1,99 @@
+"""
+Registro declarativo de índices de MongoDB.
+
+Cada colección declara aquí los índices que necesitan sus consultas más
+frecuentes. `app.core.database.ensure_indexes` crea los que falten al
+arrancar y reporta las diferencias con lo que ya existe en la base.
+"""
+from typing import Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # Login de padres y get_current_user (sub = email)
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # Login de admins y get_current_user (sub = username). Los padres no tienen username.
+        IndexModel(
+            [("username", ASCENDING)],
+            name="username_unique",
+            unique=True,
+            partialFilterExpression={"username": {"$type": "string"}},
+        ),
+        # Notificaciones masivas a admins / padres activos
+        IndexModel([("role", ASCENDING), ("is_active", ASCENDING)], name="role_is_active"),
+        # Padres de un estudiante (notificación de libretas, filtros académicos)
+        IndexModel([("hijos_ids", ASCENDING)], name="hijos_ids"),
+        # Listado de padres (más recientes primero) y paginación por cursor
+        IndexModel(
+            [("role", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="role_created_at_id",
+        ),
+        # Búsqueda por prefijos (app.core.search)
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+        # Autocompletar padres: prefijo de "apellido nombre" ya ordenado
+        IndexModel([("role", ASCENDING), ("name_key", ASCENDING)], name="role_name_key"),
+    ],
+    "estudiantes": [
+        # Detección de duplicados en import_estudiantes y bulk-delete por RUDE
+        IndexModel([("rude", ASCENDING)], name="rude_unique", unique=True),
+        IndexModel([("curso_id", ASCENDING)], name="curso_id"),
+        # Filtros académicos (nivel / grado / paralelo / turno) sobre los campos copiados del curso
+        IndexModel(
+            [("nivel", ASCENDING), ("anio_escolaridad", ASCENDING), ("paralelo", ASCENDING), ("turno", ASCENDING)],
+            name="academic",
+        ),
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+        # Autocompletar: prefijo de "apellidos nombres" ya ordenado
+        IndexModel([("name_key", ASCENDING)], name="name_key"),
+    ],
+    "notificaciones": [
+        # Bandeja del usuario, filtro por leídas y conteo de no leídas
+        IndexModel(
+            [("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)],
+            name="user_id_is_read_created_at",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+    ],
+    "licencias": [
+        # Listado de un padre ordenado por fecha
+        IndexModel([("padre_id", ASCENDING), ("created_at", DESCENDING)], name="padre_id_created_at"),
+        # Listado de admins (más recientes primero) y paginación por cursor
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+        IndexModel([("estudiante_id", ASCENDING)], name="estudiante_id"),
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+    ],
+    "libretas": [
+        IndexModel([("estudiante_id", ASCENDING)], name="estudiante_id"),
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+    ],
+    "pagos": [
+        IndexModel([("padre_id", ASCENDING)], name="padre_id"),
+        IndexModel([("estudiante_id", ASCENDING)], name="estudiante_id"),
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+    ],
+    "cursos": [
+        IndexModel([("malla_id", ASCENDING)], name="malla_id"),
+    ],
+    "jobs": [
+        # Workers: el trabajo más antiguo en cola o con el lease vencido
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        # Los trabajos terminados se borran a los 7 días
+        IndexModel([("finished_at", ASCENDING)], name="finished_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "job_files": [
+        # Partes del archivo de un trabajo, en orden; se borran al terminar
+        IndexModel([("job_id", ASCENDING), ("n", ASCENDING)], name="job_id_n_unique", unique=True),
+        # Las que queden de un trabajo que nunca terminó
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "job_errors": [
+        # Errores de un trabajo por número de fila; la clave única evita duplicarlos al retomar
+        IndexModel(
+            [("job_id", ASCENDING), ("row", ASCENDING), ("n", ASCENDING)], name="job_id_row_n_unique", unique=True
+        ),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+}
@@ -1,7 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional
 from datetime import datetime, date
-from bson import ObjectId
 from enum import Enum
 from .common import PyObjectId
 
@@ -39,11 +38,6 @@ class LicenciaModel(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={
-            ObjectId: str,
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat()
-        },
         json_schema_extra={
             "example": {
                 "padre_id": "507f1f77bcf86cd799439011",
@@ -1,7 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
 from datetime import datetime
-from bson import ObjectId
 from enum import Enum
 from .common import PyObjectId
 
@@ -27,7 +26,6 @@ class MallaCurricularModel(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str, datetime: lambda v: v.isoformat()},
         json_schema_extra={
             "example": {
                 "gestion": 2024,
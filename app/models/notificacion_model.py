@@ -3,7 +3,6 @@ from typing import Optional
 from datetime import datetime
 from enum import Enum
 from app.models.common import PyObjectId
-from bson import ObjectId
 
 
 class TipoNotificacion(str, Enum):
@@ -41,10 +40,6 @@ class NotificacionModel(BaseModel):
     class Config:
         populate_by_name = True
         arbitrary_types_allowed = True
-        json_encoders = {
-            ObjectId: str,
-            datetime: lambda v: v.isoformat()
-        }
         json_schema_extra = {
             "example": {
                 "type": "license_request",
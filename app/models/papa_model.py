@@ -1,7 +1,6 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import Optional, List
 from datetime import datetime
-from bson import ObjectId
 from enum import Enum
 from .common import PyObjectId, UserRole
 
@@ -40,7 +39,6 @@ class PapaModel(BaseModel):
     model_config = ConfigDict(
         populate_by_name=True,
         arbitrary_types_allowed=True,
-        json_encoders={ObjectId: str, datetime: lambda v: v.isoformat()},
         json_schema_extra={
             "example": {
                 "email": "padre@example.com",
@@ -23,8 +23,7 @@ class AuthUserResponse(BaseModel):
     hijos_ids: Optional[List[PyObjectId]] = []
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={datetime: lambda v: v.isoformat()}
+        populate_by_name=True
     )
 
 class Token(BaseModel):
@@ -1,11 +1,37 @@
-from typing import Generic, TypeVar, List
+from typing import Generic, TypeVar, List, Optional
+from fastapi import Query
 from pydantic import BaseModel, Field
 
 T = TypeVar("T")
 
 class PaginatedResponse(BaseModel, Generic[T]):
-    total: int = Field(..., description="Total de registros encontrados")
+    total: Optional[int] = Field(..., description="Total de registros encontrados (null si se pidió include_total=false)")
     page: int = Field(..., description="Página actual")
     per_page: int = Field(..., description="Registros por página")
-    total_pages: int = Field(..., description="Total de páginas")
+    total_pages: Optional[int] = Field(..., description="Total de páginas (null si no se calculó el total)")
+    total_status: str = Field(
+        "exact",
+        description=(
+            "Origen del total: exact (contado ahora), cached (conteo reciente reutilizado; "
+            "puede no reflejar escrituras de otros procesos durante unos segundos), "
+            "estimated (metadatos de la colección, sólo sin filtros) o skipped (no se calculó)"
+        )
+    )
+    next_cursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente con `after` (null si no hay más)")
     data: List[T] = Field(..., description="Lista de objetos")
+
+class PaginationParams:
+    """Parámetros comunes de los listados paginados (usar con Depends())"""
+    def __init__(
+        self,
+        page: int = Query(1, ge=1, description="Número de página"),
+        per_page: int = Query(10, ge=1, le=100, description="Registros por página"),
+        after: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la respuesta anterior). Si se envía, se ignora `page`"),
+        include_total: bool = Query(True, description="Calcular total y total_pages. Con false la consulta es más barata"),
+        approx_total: bool = Query(False, description="Sin filtros, usar un total estimado (instantáneo) en lugar de contar")
+    ):
+        self.page = page
+        self.per_page = per_page
+        self.after = after
+        self.include_total = include_total
+        self.approx_total = approx_total
@@ -30,6 +30,5 @@ class CursoResponse(CursoBase):
     updated_at: datetime
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={datetime: lambda v: v.isoformat()}
+        populate_by_name=True
     )
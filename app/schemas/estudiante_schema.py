@@ -34,14 +34,29 @@ class EstudianteUpdate(BaseModel):
 
 class EstudianteResponse(EstudianteBase):
     id: PyObjectId = Field(..., alias="_id")
+    nivel: Optional[str] = Field(None, description="Nivel del curso")
+    turno: Optional[str] = Field(None, description="Turno del curso")
+    paralelo: Optional[str] = Field(None, description="Paralelo del curso")
+    anio_escolaridad: Optional[int] = Field(None, description="Año de escolaridad")
+    gestion: Optional[int] = Field(None, description="Gestión")
     created_at: datetime
     updated_at: datetime
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={
-            datetime: lambda v: v.isoformat()
-        }
+        populate_by_name=True
+    )
+
+class EstudianteSuggestion(BaseModel):
+    """Resultado de autocompletar estudiantes"""
+    id: PyObjectId = Field(..., alias="_id")
+    rude: int
+    nombres: str
+    apellidos: str
+    nivel: Optional[str] = None
+    paralelo: Optional[str] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True
     )
 
 class CursoInfo(BaseModel):
@@ -28,6 +28,5 @@ class EventoResponse(EventoBase):
     updated_at: datetime
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={datetime: lambda v: v.isoformat()}
+        populate_by_name=True
     )
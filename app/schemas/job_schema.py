@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from app.models.common import PyObjectId
+
+class JobResponse(BaseModel):
+    """Estado de un trabajo en segundo plano (app.core.jobs)"""
+    id: PyObjectId = Field(..., alias="_id")
+    kind: str = Field(..., description="Operación, ej: 'estudiantes.import'")
+    status: str = Field(..., description="queued, running, done o failed")
+    filename: Optional[str] = None
+    total: Optional[int] = Field(None, description="Filas a procesar (null hasta terminar de leer el archivo)")
+    done: int = Field(0, description="Filas procesadas (hasta el último lote guardado)")
+    counts: Dict[str, int] = Field(default_factory=dict, description="Contadores acumulados, ej: creados")
+    errors: List[str] = Field(
+        default_factory=list, description="Primeros errores (hasta JOB_ERRORS_LIMIT), como 'Fila N: ...'"
+    )
+    errors_count: int = Field(0, description="Errores hasta ahora, en total")
+    result: Optional[Dict[str, Any]] = Field(None, description="Respuesta de la operación al terminar")
+    error: Optional[str] = Field(None, description="Motivo si el trabajo falló")
+    attempts: int = Field(0, description="Veces que un worker lo tomó (más de una: se retomó)")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True
+    )
@@ -29,6 +29,5 @@ class LibretaResponse(LibretaBase):
     updated_at: datetime
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={datetime: lambda v: v.isoformat()}
+        populate_by_name=True
     )
@@ -46,10 +46,6 @@ class LicenciaResponse(LicenciaBase):
     updated_at: datetime
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={
-            datetime: lambda v: v.isoformat(),
-            date: lambda v: v.isoformat()
-        }
+        populate_by_name=True
     )
 
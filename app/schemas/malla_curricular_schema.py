@@ -25,6 +25,5 @@ class MallaCurricularResponse(MallaCurricularBase):
     updated_at: datetime
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={datetime: lambda v: v.isoformat()}
+        populate_by_name=True
     )
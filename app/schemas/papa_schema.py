@@ -43,6 +43,16 @@ class PapaResponse(PapaBase):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(
-        populate_by_name=True,
-        json_encoders={datetime: lambda v: v.isoformat()}
+        populate_by_name=True
+    )
+
+class PapaSuggestion(BaseModel):
+    """Resultado de autocompletar padres"""
+    id: PyObjectId = Field(..., alias="_id")
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    email: Optional[EmailStr] = None
+
+    model_config = ConfigDict(
+        populate_by_name=True
     )
@@ -0,0 +1,32 @@
+"""
+Copia nivel, turno, paralelo, anio_escolaridad y gestion del curso (y su malla)
+en cada estudiante. Ejecutar una vez después de desplegar los filtros
+académicos sobre estudiantes; es idempotente y se puede repetir.
+"""
+import asyncio
+from app.core.catalog import ACADEMIC_FIELDS, catalog
+from app.core.database import get_database, connect_to_mongo
+from app.crud.crud_estudiante import estudiante as crud_estudiante
+
+async def main():
+    print("Connecting to DB...")
+    await connect_to_mongo()
+    db = get_database()
+
+    await catalog.load(db)
+    print(f"Catalog: {len(catalog.cursos)} cursos, {len(catalog.mallas)} mallas")
+
+    modified = await crud_estudiante.sync_academic_fields(db, curso_ids=catalog.cursos.keys())
+
+    # Estudiantes sin curso o con un curso que ya no existe
+    known = list(catalog.cursos.keys()) + [str(cid) for cid in catalog.cursos.keys()]
+    result = await db["estudiantes"].update_many(
+        {"curso_id": {"$nin": known}},
+        {"$set": dict.fromkeys(ACADEMIC_FIELDS)}
+    )
+    modified += result.modified_count
+
+    print(f"Backfill complete. Updated {modified} estudiantes.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""
+Calcula `search_keys` (tokens normalizados para la búsqueda `q`) y, en
+estudiantes y usuarios, `name_key` (para autocompletar) en todos los
+documentos de las colecciones buscables. Idempotente; volver a ejecutarlo si
+cambian los campos de SEARCH_FIELDS en app/core/search.py.
+"""
+import asyncio
+from pymongo import UpdateOne
+from app.core.database import get_database, connect_to_mongo
+from app.core.search import SEARCH_FIELDS, search_document_fields
+
+BATCH_SIZE = 1000
+
+async def main():
+    print("Connecting to DB...")
+    await connect_to_mongo()
+    db = get_database()
+
+    for collection_name, fields in SEARCH_FIELDS.items():
+        collection = db[collection_name]
+        projection = {field: 1 for field in fields}
+        updated = 0
+        batch = []
+        async for doc in collection.find({}, projection=projection):
+            batch.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": search_document_fields(collection_name, doc)}
+            ))
+            if len(batch) == BATCH_SIZE:
+                result = await collection.bulk_write(batch, ordered=False)
+                updated += result.modified_count
+                batch = []
+        if batch:
+            result = await collection.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+        print(f"{collection_name}: {updated} documentos actualizados")
+
+    print("Backfill complete.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
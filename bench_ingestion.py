@@ -0,0 +1,139 @@
+"""
+Benchmark: lectura de la planilla de una importación (app.core.ingestion).
+
+Con la misma planilla de N estudiantes (columnas de /estudiantes/import)
+compara:
+
+- libro completo (camino anterior): openpyxl.load_workbook en modo normal,
+  que arma todas las celdas en memoria antes de devolver la primera fila.
+- openpyxl read_only, calamine (si python-calamine está instalado) y CSV:
+  `read_rows` recorrido de a IMPORT_BATCH_SIZE filas con `take`, como lo hace
+  `run_task` (cada lote se descarta, como después de procesarlo).
+
+Uso:
+    python bench_ingestion.py [--rows 50000]
+
+No necesita Mongo. Cada lector corre en un proceso nuevo y se mide dos veces:
+sin tracemalloc (segundos, filas/s y cuánto tarda el primer lote, que es lo
+que espera el importador para empezar a escribir) y con tracemalloc (pico de
+memoria de Python). El pico de RSS del proceso incluye además lo que reserva
+calamine en Rust, que tracemalloc no ve.
+
+Medición (1 CPU, 50000 filas, lotes de 1000):
+
+    lector          filas/s   1er lote (s)   pico Python (MB)
+    libro completo     7974           6.27               96.1
+    read_only          9201           1.29                5.2
+    calamine          94517           0.31                1.0   (24 MB de RSS)
+    csv              290615           0.01                1.2
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from openpyxl import Workbook, load_workbook
+
+from app.core.config import settings
+from app.core import ingestion
+from app.core.ingestion import read_rows, take
+
+WIDTH = 5  # RUDE, Nombres, Apellidos, Curso ID, Estado
+HEADERS = ("RUDE", "Nombres", "Apellidos", "Curso ID", "Estado")
+
+
+def sample_rows(rows: int):
+    for i in range(rows):
+        yield (100000 + i, f"Nombre {i}", f"Apellido Paterno {i}", "6650f1c2a1b2c3d4e5f60718" if i % 2 else None, "ACTIVO")
+
+
+def build_files(rows: int, directory: str):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Estudiantes")
+    sheet.append(HEADERS)
+    for row in sample_rows(rows):
+        sheet.append(row)
+    xlsx = os.path.join(directory, "estudiantes.xlsx")
+    workbook.save(xlsx)
+
+    csv = os.path.join(directory, "estudiantes.csv")
+    with open(csv, "w", encoding="utf-8", newline="") as output:
+        output.write(",".join(HEADERS) + "\r\n")
+        for row in sample_rows(rows):
+            output.write(",".join("" if value is None else str(value) for value in row) + "\r\n")
+    return xlsx, csv
+
+
+def full_workbook(contents: bytes):
+    """Camino anterior: todo el libro en memoria, después las filas"""
+    workbook = load_workbook(BytesIO(contents))
+    rows = [row for row in workbook.active.iter_rows(min_row=2, values_only=True) if row[0]]
+    yield rows
+
+
+def streamed(contents: bytes):
+    rows = read_rows(contents, width=WIDTH)
+    while chunk := take(rows, settings.IMPORT_BATCH_SIZE):
+        yield chunk
+
+
+def measure(path: str, reader: str, engine: str, traced: bool, queue):
+    settings.IMPORT_XLSX_ENGINE = engine
+    with open(path, "rb") as file:
+        contents = file.read()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if traced:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    first = None
+    total = 0
+    for chunk in (full_workbook if reader == "full" else streamed)(contents):
+        first = first or time.perf_counter() - start
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+
+    peak = tracemalloc.get_traced_memory()[1] if traced else 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before  # KB en Linux
+    queue.put((total, elapsed, first, peak / 2 ** 20, rss / 1024))
+
+
+def run(path: str, reader: str, engine: str, traced: bool):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(path, reader, engine, traced, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(rows: int):
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Generando {rows} filas...")
+        xlsx, csv = build_files(rows, directory)
+        print(f".xlsx {os.path.getsize(xlsx) / 2 ** 20:.1f} MB, .csv {os.path.getsize(csv) / 2 ** 20:.1f} MB, "
+              f"lotes de {settings.IMPORT_BATCH_SIZE}\n")
+
+        cases = [("libro completo", xlsx, "full", "openpyxl"), ("read_only", xlsx, "stream", "openpyxl")]
+        if ingestion.CalamineWorkbook is not None:
+            cases.append(("calamine", xlsx, "stream", "calamine"))
+        else:
+            print("(python-calamine no está instalado: se omite)\n")
+        cases.append(("csv", csv, "stream", "openpyxl"))
+
+        print(f"{'lector':<16}{'filas':>8}{'segundos':>10}{'filas/s':>10}{'1er lote (s)':>14}"
+              f"{'pico Python (MB)':>18}{'pico RSS (MB)':>15}")
+        for name, path, reader, engine in cases:
+            total, elapsed, first, _, rss = run(path, reader, engine, traced=False)
+            _, _, _, peak, _ = run(path, reader, engine, traced=True)
+            print(f"{name:<16}{total:>8}{elapsed:>10.2f}{total / elapsed:>10.0f}{first:>14.2f}{peak:>18.1f}{rss:>15.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,163 @@
+"""
+Benchmark: paginación de licencias con total.
+
+Compara, por página:
+
+- 2 consultas (camino original): count_documents y después find().skip().limit().
+- $facet: una sola agregación con la página y el total en un $facet (la
+  versión anterior de paginate; todo lo que entra al $facet se evalúa sin
+  índices).
+- paginate: app.crud.pagination.paginate sin la caché de totales (conteo y
+  página en paralelo).
+- total cacheado, include_total=false y cursor (after) sin total.
+- cursor con total, con $facet y con paginate: el caso en que el seek dentro
+  del $facet no puede usar el índice.
+
+Uso:
+    python bench_pagination.py [--docs 100000] [--rounds 20]
+
+Siembra N licencias en la base "<DATABASE_NAME>_bench" (se reutiliza si ya
+tiene N documentos) y mide la mediana y el p95 por página, con y sin filtro
+por padre_id.
+
+Sin resultados registrados: las diferencias dependen de qué resuelve el índice
+y de cuántos documentos examina mongod, así que sólo sirve contra un servidor
+real (mongomock no tiene planificador ni índices).
+"""
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.crud.pagination import ListQuery, count_cache, decode_cursor, encode_cursor, paginate, seek_filter, with_tiebreaker
+from app.models.indexes import INDEXES
+
+PER_PAGE = 10
+PAGES = [1, 50, 500, 5000]
+
+
+async def seed(collection, n: int):
+    if await collection.estimated_document_count() == n:
+        print(f"Reutilizando {n} licencias existentes")
+        return
+
+    print(f"Sembrando {n} licencias...")
+    await collection.drop()
+    padres = [ObjectId() for _ in range(500)]
+    base = datetime(2024, 1, 1)
+    batch = []
+    for i in range(n):
+        fecha = base + timedelta(days=random.randint(0, 365))
+        batch.append({
+            "padre_id": random.choice(padres),
+            "estudiante_id": ObjectId(),
+            "tipo_permiso": random.choice(["PERSONAL", "MEDICO", "FAMILIAR"]),
+            "fecha_inicio": fecha,
+            "fecha_fin": fecha + timedelta(days=2),
+            "motivo": "Motivo de prueba",
+            "estado": random.choice(["PENDIENTE", "APROBADA", "RECHAZADA"]),
+            "created_at": base + timedelta(seconds=i),
+            "updated_at": base + timedelta(seconds=i),
+        })
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_indexes(INDEXES["licencias"])
+
+
+async def two_queries(collection, query: ListQuery, page: int):
+    """Camino anterior: count_documents y luego find().skip().limit()"""
+    sort = with_tiebreaker(query.sort)
+    total = await collection.count_documents(query.filter)
+    cursor = collection.find(query.filter).sort(sort).skip((page - 1) * PER_PAGE).limit(PER_PAGE)
+    return await cursor.to_list(length=PER_PAGE), total
+
+
+async def cursor_for_page(collection, query: ListQuery, page: int):
+    """Cursor equivalente a haber llegado a `page` navegando con next_cursor"""
+    if page == 1:
+        return None
+    sort = with_tiebreaker(query.sort)
+    docs = await collection.find(query.filter).sort(sort).skip((page - 1) * PER_PAGE - 1).limit(1).to_list(1)
+    return encode_cursor(docs[0], sort) if docs else None
+
+
+async def facet(collection, query: ListQuery, page: int, after=None):
+    """Versión anterior de paginate: página y total en un $facet"""
+    sort = with_tiebreaker(query.sort)
+    page_stages = [{"$match": seek_filter(sort, decode_cursor(after))}] if after else [{"$skip": (page - 1) * PER_PAGE}]
+    pipeline = [
+        {"$match": query.filter},
+        {"$sort": dict(sort)},
+        {"$facet": {"data": page_stages + [{"$limit": PER_PAGE + 1}], "total": [{"$count": "count"}]}},
+    ]
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+
+
+async def uncached(collection, query: ListQuery, page: int, after=None):
+    """paginate contando en cada llamada (sin la caché de totales)"""
+    count_cache.clear()
+    return await paginate(collection, query, page=page, per_page=PER_PAGE, after=after)
+
+
+async def measure(fn, rounds: int):
+    await fn()  # calentar caché
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[math.ceil(len(times) * 0.95) - 1]
+
+
+async def main(n: int, rounds: int):
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    collection = client[f"{settings.DATABASE_NAME}_bench"]["licencias"]
+    await seed(collection, n)
+
+    padre = await collection.find_one({}, projection={"padre_id": 1})
+    queries = {
+        "sin filtro": ListQuery({}, [("created_at", -1)]),
+        "por padre_id": ListQuery({"padre_id": padre["padre_id"]}, [("created_at", -1)]),
+    }
+
+    columns = ("2 consultas", "$facet", "paginate", "total cacheado", "sin total", "cursor",
+               "cursor+$facet", "cursor+total")
+    print(f"\n{'consulta':<14}{'página':>8}" + "".join(f"{name:>16}" for name in columns) + "   (ms mediana/p95)")
+    for label, query in queries.items():
+        total = await collection.count_documents(query.filter)
+        for page in PAGES:
+            if (page - 1) * PER_PAGE >= total:
+                continue
+            after = await cursor_for_page(collection, query, page)
+            results = [
+                await measure(lambda: two_queries(collection, query, page), rounds),
+                await measure(lambda: facet(collection, query, page), rounds),
+                await measure(lambda: uncached(collection, query, page), rounds),
+                await measure(lambda: paginate(collection, query, page=page, per_page=PER_PAGE), rounds),
+                await measure(lambda: paginate(collection, query, page=page, per_page=PER_PAGE, include_total=False), rounds),
+                await measure(lambda: paginate(collection, query, per_page=PER_PAGE, after=after, include_total=False), rounds),
+                await measure(lambda: facet(collection, query, page, after), rounds),
+                await measure(lambda: uncached(collection, query, page, after), rounds),
+            ]
+            cells = "".join(f"{f'{med:.1f}/{p95:.1f}':>16}" for med, p95 in results)
+            print(f"{label:<14}{page:>8}{cells}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.docs, args.rounds))
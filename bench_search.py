@@ -0,0 +1,120 @@
+"""
+Benchmark: búsqueda `q` de estudiantes con $regex sin anclar (camino anterior)
+contra prefijos sobre search_keys (app.core.search).
+
+Uso:
+    python bench_search.py [--docs 50000] [--rounds 20]
+
+Siembra N estudiantes con nombres con tildes en "<DATABASE_NAME>_bench"
+(se reutiliza si ya tiene N documentos) y mide, por consulta, la mediana y
+el p95 de total + primera página. También muestra cuántos resultados
+encuentra cada camino: el regex no encuentra "Muñoz" buscando "munoz".
+
+Sin resultados registrados: lo que se compara es el uso del índice de
+search_keys, así que sólo sirve contra un mongod real (mongomock no tiene
+planificador ni índices). Lo único verificado sin servidor es la columna de
+totales: el camino por tokens encuentra las variantes con tilde.
+"""
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import time
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.core.search import score_expression, search_document_fields, search_filter
+from app.crud.pagination import ListQuery, count_cache, paginate
+from app.models.indexes import INDEXES
+
+PER_PAGE = 10
+NOMBRES = ["José", "María", "Ángel", "Lucía", "Andrés", "Sofía", "Iñaki", "Martín", "Inés", "Raúl",
+           "Camila", "Mateo", "Valentina", "Nicolás", "Zoé", "Joaquín", "Renée", "Tomás", "Noemí", "Julián"]
+APELLIDOS = ["Muñoz", "Núñez", "Pérez", "Gómez", "Rodríguez", "Fernández", "López", "Martínez", "Sánchez",
+             "Díaz", "Álvarez", "Quispe", "Mamani", "Condori", "Gutiérrez", "Ibáñez", "Peña", "Ortíz", "Ríos", "Vargas"]
+QUERIES = ["munoz", "Muñoz", "nun", "maria lopez", "Quispe Mamani", "ang", "80780", "zz"]
+
+
+async def seed(collection, n: int):
+    if await collection.estimated_document_count() == n:
+        print(f"Reutilizando {n} estudiantes existentes")
+        return
+
+    print(f"Sembrando {n} estudiantes...")
+    await collection.drop()
+    now = datetime.utcnow()
+    batch = []
+    for i in range(n):
+        doc = {
+            "rude": 8078000000000 + i,
+            "nombres": " ".join(random.sample(NOMBRES, 2)),
+            "apellidos": " ".join(random.sample(APELLIDOS, 2)),
+            "estado": "ACTIVO",
+            "created_at": now,
+            "updated_at": now,
+        }
+        doc.update(search_document_fields("estudiantes", doc))
+        batch.append(doc)
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_indexes(INDEXES["estudiantes"])
+
+
+async def regex_search(collection, q: str):
+    """Camino anterior: $or de $regex sin anclar + count_documents + find"""
+    regex = {"$regex": q, "$options": "i"}
+    or_conditions = [{"nombres": regex}, {"apellidos": regex}]
+    if q.isdigit():
+        or_conditions.append({"rude": int(q)})
+    filter_query = {"$or": or_conditions}
+    total = await collection.count_documents(filter_query)
+    docs = await collection.find(filter_query).sort("_id", 1).limit(PER_PAGE).to_list(PER_PAGE)
+    return docs, total
+
+
+async def token_search(collection, q: str):
+    count_cache.clear()
+    query = ListQuery(search_filter(q) or {}, score=score_expression(q))
+    page = await paginate(collection, query, per_page=PER_PAGE)
+    return page.items, page.total
+
+
+async def measure(fn, rounds: int):
+    await fn()  # calentar caché
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[math.ceil(len(times) * 0.95) - 1]
+
+
+async def main(n: int, rounds: int):
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    collection = client[f"{settings.DATABASE_NAME}_bench"]["estudiantes"]
+    await seed(collection, n)
+
+    print(f"\n{'q':<16}{'regex (total)':>16}{'tokens (total)':>16}{'regex ms':>16}{'tokens ms':>16}   (mediana/p95)")
+    for q in QUERIES:
+        _, regex_total = await regex_search(collection, q)
+        _, token_total = await token_search(collection, q)
+        regex_med, regex_p95 = await measure(lambda: regex_search(collection, q), rounds)
+        token_med, token_p95 = await measure(lambda: token_search(collection, q), rounds)
+        print(f"{q:<16}{regex_total:>16}{token_total:>16}"
+              f"{f'{regex_med:.1f}/{regex_p95:.1f}':>16}{f'{token_med:.1f}/{token_p95:.1f}':>16}")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.docs, args.rounds))
@@ -0,0 +1,168 @@
+"""
+Benchmark: serialización de una página de listados (sin Mongo).
+
+Compara, con per_page=100 y documentos como los devuelve Motor (ObjectId,
+datetime, search_keys...):
+
+- modelo por fila: `Model(**doc)` en el CRUD y después la validación y
+  serialización de FastAPI contra el response_model (serialize_response +
+  JSONResponse), el camino anterior.
+- modelo por fila + orjson: lo mismo, pero renderizado con
+  app.core.responses.ORJSONResponse, la clase por defecto de la app.
+- un paso: documentos crudos con los defaults del modelo (fill_defaults) y
+  app.core.responses.dump_json (TypeAdapter cacheado, validación + JSON en
+  pydantic-core).
+
+Las notificaciones no pasan por un modelo: get_by_user ya devuelve dicts con
+los ids como str y la lista no está paginada.
+
+Uso:
+    python bench_serialization.py [--per-page 100] [--rounds 200]
+
+Muestra filas por segundo (mediana de las rondas) y verifica que los tres
+caminos producen el mismo JSON.
+
+Medición (1 CPU, per_page=100, 200 rondas, filas/s):
+
+    listado            modelo/fila    + orjson     un paso   mejora
+    estudiantes             62,520      75,208     176,268     2.8x
+    licencias               70,715      86,282     228,169     3.2x
+    papas                    5,273       5,605       8,382     1.6x
+    notificaciones         136,395     222,292     225,124     1.7x
+
+papas queda abajo por la validación de EmailStr en cada fila.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import ORJSONResponse, dump_json
+from app.core.search import search_document_fields
+from app.crud.pagination import Page
+from app.crud.projection import fill_defaults
+from app.models.estudiante_model import EstudianteModel
+from app.models.licencia_model import LicenciaModel
+from app.models.notificacion_model import NotificacionModel
+from app.models.papa_model import PapaModel
+from app.schemas.common import PaginatedResponse
+from app.schemas.estudiante_schema import EstudianteResponse
+from app.schemas.licencia_schema import LicenciaResponse
+from app.schemas.notificacion_schema import NotificacionResponse
+from app.schemas.papa_schema import PapaResponse
+
+
+def estudiante_doc(i: int) -> dict:
+    doc = {
+        "_id": ObjectId(), "rude": 8078000000000 + i, "nombres": f"José María {i}", "apellidos": "Muñoz Pérez",
+        "curso_id": str(ObjectId()), "estado": "ACTIVO", "nivel": "PRIMARIA", "turno": "MAÑANA",
+        "paralelo": "A", "anio_escolaridad": 3, "gestion": 2025,
+        "created_at": datetime(2025, 2, 1), "updated_at": datetime(2025, 2, 1),
+    }
+    doc.update(search_document_fields("estudiantes", doc))
+    return doc
+
+
+def licencia_doc(i: int) -> dict:
+    start = datetime(2025, 3, 1) + timedelta(days=i % 60)
+    doc = {
+        "_id": ObjectId(), "padre_id": ObjectId(), "estudiante_id": ObjectId(),
+        "tipo_permiso": "MEDICO", "fecha_inicio": start, "fecha_fin": start + timedelta(days=2),
+        "motivo": "Control médico", "adjunto": "https://example.com/a.jpg", "estado": "PENDIENTE",
+        "respuesta_admin": None, "created_at": start, "updated_at": start,
+    }
+    doc.update(search_document_fields("licencias", doc))
+    return doc
+
+
+def papa_doc(i: int) -> dict:
+    doc = {
+        "_id": ObjectId(), "email": f"padre{i}@example.com", "hashed_password": "$2b$12$" + "x" * 53,
+        "role": "PADRE", "nombre": "Juan", "apellido": f"Quispe {i}", "telefono": "70000000",
+        "hijos_ids": [ObjectId(), ObjectId()], "is_active": True,
+        "created_at": datetime(2025, 1, 1), "updated_at": datetime(2025, 1, 1),
+    }
+    doc.update(search_document_fields("users", doc))
+    return doc
+
+
+def notificacion_doc(i: int) -> dict:
+    created = datetime(2025, 4, 1) + timedelta(minutes=i)
+    return {
+        "_id": str(ObjectId()), "type": "license_approved", "title": "Licencia aprobada",
+        "message": f"La licencia {i} fue aprobada", "user_id": str(ObjectId()), "is_read": i % 3 == 0,
+        "related_id": str(ObjectId()), "created_at": created, "updated_at": created,
+    }
+
+
+# (listado, modelo, schema, documento, paginado)
+CASES = [
+    ("estudiantes", EstudianteModel, EstudianteResponse, estudiante_doc, True),
+    ("licencias", LicenciaModel, LicenciaResponse, licencia_doc, True),
+    ("papas", PapaModel, PapaResponse, papa_doc, True),
+    ("notificaciones", NotificacionModel, NotificacionResponse, notificacion_doc, False),
+]
+
+
+def payload(items: list, paginated: bool):
+    if not paginated:
+        return items
+    return Page(items, len(items)).to_response(page=1, per_page=len(items))
+
+
+async def model_per_row(model, paginated, field, docs, response_class=JSONResponse) -> bytes:
+    """Camino anterior: un modelo por fila + response_model de FastAPI"""
+    items = [model(**doc) for doc in docs] if paginated else docs
+    content = await serialize_response(field=field, response_content=payload(items, paginated))
+    return response_class(content).body
+
+
+async def one_pass(model, schema, paginated, response_type, docs) -> bytes:
+    """Documentos crudos validados y serializados una sola vez"""
+    items = [fill_defaults(model, schema, dict(doc)) for doc in docs]
+    return dump_json(response_type, payload(items, paginated))
+
+
+async def rows_per_second(fn, rows: int, rounds: int) -> float:
+    await fn()  # calentar cachés (TypeAdapter, validadores)
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn()
+        times.append(time.perf_counter() - start)
+    return rows / statistics.median(times)
+
+
+async def main(per_page: int, rounds: int):
+    print(f"{'listado':<16}{'modelo/fila':>14}{'+ orjson':>12}{'un paso':>12}{'mejora':>9}   (filas/s)")
+    for name, model, schema, make_doc, paginated in CASES:
+        docs = [make_doc(i) for i in range(per_page)]
+        response_type = PaginatedResponse[schema] if paginated else List[schema]
+        field = create_model_field(name="Response", type_=response_type, mode="serialization")
+
+        before = await model_per_row(model, paginated, field, docs)
+        with_orjson = await model_per_row(model, paginated, field, docs, ORJSONResponse)
+        after = await one_pass(model, schema, paginated, response_type, docs)
+        if not json.loads(before) == json.loads(with_orjson) == json.loads(after):
+            raise SystemExit(f"{name}: los tres caminos no producen el mismo JSON")
+
+        slow = await rows_per_second(lambda: model_per_row(model, paginated, field, docs), per_page, rounds)
+        orjson_rows = await rows_per_second(
+            lambda: model_per_row(model, paginated, field, docs, ORJSONResponse), per_page, rounds)
+        fast = await rows_per_second(lambda: one_pass(model, schema, paginated, response_type, docs), per_page, rounds)
+        print(f"{name:<16}{slow:>14,.0f}{orjson_rows:>12,.0f}{fast:>12,.0f}{fast / slow:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.per_page, args.rounds))
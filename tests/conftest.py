@@ -0,0 +1,102 @@
+"""
+Fixtures comunes: una base mongomock nueva por test (instalada como la base
+de la app), las cachés del proceso vacías y un cliente HTTP con token de admin.
+
+Los tests async usan el plugin de anyio (`@pytest.mark.anyio`).
+"""
+import asyncio
+import inspect
+import os
+
+os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017")
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock.collection import BulkOperationBuilder
+from mongomock_motor import AsyncMongoMockClient
+
+from app.api.auth_router import principal_cache, token_version_cache
+from app.core import database
+from app.core.catalog import catalog
+from app.core.search import suggest_cache
+from app.core.security import create_access_token
+from app.crud.pagination import count_cache
+from app.main import app
+
+# mongomock 4.3 no acepta el `sort` que las versiones recientes de pymongo pasan a los UpdateOne de bulk_write
+_add_update = BulkOperationBuilder.add_update
+if "sort" not in inspect.signature(_add_update).parameters:
+    def _add_update_without_sort(self, *args, sort=None, **kwargs):
+        return _add_update(self, *args, **kwargs)
+    BulkOperationBuilder.add_update = _add_update_without_sort
+
+# Operaciones que son un round trip a Mongo (find/aggregate: la primera tanda del cursor)
+ROUND_TRIP_METHODS = {
+    "find", "find_one", "aggregate", "count_documents", "estimated_document_count", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete", "bulk_write",
+}
+
+
+class CountingCollection:
+    """Colección que anota (colección, operación) por cada round trip"""
+
+    def __init__(self, collection, calls: list):
+        self._collection = collection
+        self._calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in ROUND_TRIP_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._calls.append((self._collection.name, name))
+            return attr(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, db):
+        self._db = db
+        self.calls: list = []
+
+    def __getitem__(self, name: str) -> CountingCollection:
+        return CountingCollection(self._db[name], self.calls)
+
+    def __getattr__(self, name: str):
+        return getattr(self._db, name)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    """Base vacía, contando round trips en `db.calls`"""
+    counting = CountingDatabase(AsyncMongoMockClient()["test"])
+    previous = database.db.db
+    database.db.db = counting
+    for cache in (count_cache, suggest_cache, principal_cache, token_version_cache):
+        cache.clear()
+    catalog.invalidate()
+    yield counting
+    database.db.db = previous
+
+
+@pytest.fixture
+def client(db):
+    """Cliente HTTP sin eventos de startup (no conecta a Mongo ni arranca workers)"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_headers(db):
+    """Authorization de un administrador guardado en `users`"""
+    asyncio.run(db._db["users"].insert_one({
+        "username": "admin", "email": "admin@example.com", "nombre": "Admin", "apellido": "Test",
+        "role": "ADMIN", "hashed_password": "x", "is_active": True,
+    }))
+    return {"Authorization": "Bearer " + create_access_token({"sub": "admin", "role": "ADMIN"})}
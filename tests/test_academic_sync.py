@@ -0,0 +1,51 @@
+"""
+Atributos académicos copiados en estudiantes (nivel, turno, paralelo,
+anio_escolaridad, gestion): cambiar o borrar el curso o la malla los vuelve a
+copiar, y el filtro académico del listado los usa.
+"""
+import pytest
+
+MALLA = {"gestion": 2025, "nivel": "PRIMARIA", "anio_escolaridad": 2, "estructura_areas": []}
+
+
+@pytest.fixture
+def estudiante(client, db):
+    malla = client.post("/api/mallas/", json=MALLA).json()["_id"]
+    curso = {"nombre": "Segundo", "paralelo": "A", "nivel": "PRIMARIA", "turno": "MAÑANA", "malla_id": malla}
+    curso = client.post("/api/cursos/", json=curso).json()["_id"]
+    body = {"rude": 1, "nombres": "Ana", "apellidos": "Pérez", "curso_id": curso}
+    id = client.post("/api/estudiantes/", json=body).json()["_id"]
+    return {"id": id, "malla": malla, "curso": curso}
+
+
+def _academic(client, estudiante) -> tuple:
+    doc = client.get(f"/api/estudiantes/{estudiante['id']}").json()
+    return tuple(doc.get(field) for field in ("nivel", "turno", "paralelo", "anio_escolaridad", "gestion"))
+
+
+def _listed(client, **filters) -> int:
+    return client.get("/api/estudiantes/", params=filters).json()["total"]
+
+
+def test_malla_update(client, estudiante):
+    assert _academic(client, estudiante) == ("PRIMARIA", "MAÑANA", "A", 2, 2025)
+    assert _listed(client, grado="SEGUNDO") == 1
+
+    assert client.put(f"/api/mallas/{estudiante['malla']}", json={"anio_escolaridad": 3}).status_code == 200
+    assert _academic(client, estudiante) == ("PRIMARIA", "MAÑANA", "A", 3, 2025)
+    assert (_listed(client, grado="SEGUNDO"), _listed(client, grado="TERCERO")) == (0, 1)
+
+
+def test_malla_remove(client, estudiante):
+    assert client.delete(f"/api/mallas/{estudiante['malla']}").status_code == 200
+    assert _academic(client, estudiante) == ("PRIMARIA", "MAÑANA", "A", None, None)
+    assert _listed(client, grado="SEGUNDO") == 0
+
+
+def test_curso_update_and_remove(client, estudiante):
+    assert client.put(f"/api/cursos/{estudiante['curso']}", json={"paralelo": "B"}).status_code == 200
+    assert _academic(client, estudiante) == ("PRIMARIA", "MAÑANA", "B", 2, 2025)
+    assert (_listed(client, paralelo="A"), _listed(client, paralelo="B")) == (0, 1)
+
+    assert client.delete(f"/api/cursos/{estudiante['curso']}").status_code == 200
+    assert _academic(client, estudiante) == (None, None, None, None, None)
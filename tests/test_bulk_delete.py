@@ -0,0 +1,196 @@
+"""
+Eliminación masiva: CRUDBase.delete_by_keys y las rutas /bulk-delete, desde el
+archivo hasta delete_many.
+"""
+from io import BytesIO
+
+from bson import ObjectId
+from openpyxl import Workbook
+import pytest
+
+from app.crud.crud_curso import curso as crud_curso
+from app.crud.crud_estudiante import estudiante as crud_estudiante
+
+
+def _csv(*rows: str) -> bytes:
+    return ("\r\n".join(rows) + "\r\n").encode("utf-8")
+
+
+def _xlsx(*rows: tuple) -> bytes:
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def _seed_estudiantes(client, *rudes: int):
+    for rude in rudes:
+        body = {"rude": rude, "nombres": "Ana", "apellidos": f"Pérez {rude}"}
+        assert client.post("/api/estudiantes/", json=body).status_code == 200
+
+
+def test_estudiantes_csv(client, db):
+    """En un CSV el RUDE llega como texto: se convierte a entero como en la importación"""
+    _seed_estudiantes(client, 8078012345678, 8078012345679)
+    contents = _csv("RUDE", "8078012345678", " 8078012345679 ", "8078099999999", "abc")
+    files = {"file": ("estudiantes.csv", contents, "text/csv")}
+
+    response = client.post("/api/estudiantes/bulk-delete?dry_run=true", files=files)
+    assert response.status_code == 200, response.text
+    assert response.json()["coincidencias_count"] == 2
+    assert response.json()["eliminados_count"] == 0
+
+    response = client.post("/api/estudiantes/bulk-delete", files=files)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["eliminados_count"] == 2
+    assert body["errores"] == ["Fila 4: RUDE 8078099999999 no encontrado", "Fila 5: RUDE abc inválido"]
+    assert client.get("/api/estudiantes/").json()["total"] == 0
+
+
+def test_estudiantes_xlsx(client, db):
+    _seed_estudiantes(client, 11, 12)
+    contents = _xlsx(("RUDE",), (11,), ("12",), (13,))
+    files = {"file": ("estudiantes.xlsx", contents, "application/octet-stream")}
+
+    body = client.post("/api/estudiantes/bulk-delete", files=files).json()
+    assert body["eliminados_count"] == 2
+    assert body["errores"] == ["Fila 4: RUDE 13 no encontrado"]
+
+
+def test_papas_csv(client, db):
+    for email in ("uno@example.com", "dos@example.com"):
+        body = {"email": email, "password": "secreto", "nombre": "Juan", "apellido": "Quispe"}
+        assert client.post("/api/papas/", json=body).status_code in (200, 201)
+    contents = _csv("Email", "uno@example.com", "tres@example.com")
+    files = {"file": ("padres.csv", contents, "text/csv")}
+
+    body = client.post("/api/papas/bulk-delete-padres", files=files).json()
+    assert body["eliminados_count"] == 1
+    assert body["errores"] == ["Fila 3: Email tres@example.com no encontrado"]
+
+
+async def _seed_apellidos(db, *apellidos: str):
+    await db["estudiantes"].insert_many(
+        [{"rude": i, "nombres": f"N{i % 2}", "apellidos": apellido} for i, apellido in enumerate(apellidos)]
+    )
+    db.calls.clear()
+
+
+@pytest.mark.anyio
+async def test_delete_by_keys_duplicates(db):
+    """Una clave repetida borra tantos documentos como veces aparece, no más"""
+    await _seed_apellidos(db, "Pérez", "Pérez", "Gómez", "Rojas")
+    keys = [("Pérez",), ("Gómez",), ("Pérez",), ("Pérez",), ("Soto",)]
+
+    result = await crud_estudiante.delete_by_keys(db, fields=("apellidos",), keys=keys)
+
+    assert (result.matched_count, result.deleted_count, result.not_found) == (3, 3, [3, 4])
+    assert db.calls == [("estudiantes", "find"), ("estudiantes", "delete_many")]
+    assert [doc["apellidos"] async for doc in db["estudiantes"].find({})] == ["Rojas"]
+
+
+@pytest.mark.anyio
+async def test_delete_by_keys_dry_run(db):
+    await _seed_apellidos(db, "Pérez", "Pérez", "Gómez")
+    keys = [("Pérez",), ("Pérez",), ("Pérez",), ("Gómez",)]
+
+    result = await crud_estudiante.delete_by_keys(db, fields=("apellidos",), keys=keys, dry_run=True)
+
+    assert (result.matched_count, result.deleted_count, result.not_found) == (3, 0, [2])
+    assert db.calls == [("estudiantes", "find")]
+    assert await db["estudiantes"].count_documents({}) == 3
+
+
+@pytest.mark.anyio
+async def test_delete_by_keys_compound_chunked(db):
+    """Claves de varios campos ($or), en lotes de chunk_size claves distintas"""
+    await _seed_apellidos(db, "Pérez", "Pérez", "Gómez", "Rojas", "Soto")  # nombres N0, N1, N0, N1, N0
+    keys = [("N0", "Pérez"), ("N1", "Pérez"), ("N0", "Pérez"), ("N1", "Rojas"), ("N0", "Soto"), ("N1", "Soto")]
+
+    result = await crud_estudiante.delete_by_keys(db, fields=("nombres", "apellidos"), keys=keys, chunk_size=2)
+
+    assert (result.matched_count, result.deleted_count, result.not_found) == (4, 4, [2, 5])
+    assert db.calls == [("estudiantes", "find")] * 3 + [("estudiantes", "delete_many")] * 2
+    assert [doc["apellidos"] async for doc in db["estudiantes"].find({})] == ["Gómez"]
+
+
+def _malla(client) -> str:
+    body = {"gestion": 2025, "nivel": "PRIMARIA", "anio_escolaridad": 2, "estructura_areas": []}
+    return client.post("/api/mallas/", json=body).json()["_id"]
+
+
+def test_cursos_created_by_post(client, db):
+    """malla_id se guarda como string (jsonable_encoder): la clave tiene que coincidir igual"""
+    malla = _malla(client)
+    for paralelo in ("A", "B"):
+        body = {"nombre": "Segundo", "paralelo": paralelo, "nivel": "PRIMARIA", "turno": "MAÑANA", "malla_id": malla}
+        assert client.post("/api/cursos/", json=body).status_code in (200, 201)
+    contents = _xlsx(
+        ("nombre", "paralelo", "nivel", "turno", "malla_id"),
+        ("Segundo", "A", "PRIMARIA", "MAÑANA", malla),
+        ("Segundo", "C", "PRIMARIA", "MAÑANA", malla),
+    )
+    files = {"file": ("cursos.xlsx", contents, "application/octet-stream")}
+
+    body = client.post("/api/cursos/bulk-delete", files=files).json()
+    assert body["eliminados_count"] == 1
+    assert body["errores"] == ["Fila 3: No se encontró el curso para eliminar"]
+    assert [curso["paralelo"] for curso in client.get("/api/cursos/").json()] == ["B"]
+
+
+def test_cursos_import_then_delete(client, db):
+    """El mismo archivo de /import sirve para /bulk-delete"""
+    malla = _malla(client)
+    contents = _xlsx(
+        ("nombre", "paralelo", "nivel", "turno", "malla_id", "tutor_id"),
+        ("Segundo", "A", "PRIMARIA", "MAÑANA", malla, None),
+        ("Segundo", "B", "PRIMARIA", "TARDE", malla, None),
+    )
+    files = {"file": ("cursos.xlsx", contents, "application/octet-stream")}
+    assert client.post("/api/cursos/import", files=files).json()["creados_count"] == 2
+
+    body = client.post("/api/cursos/bulk-delete?dry_run=true", files=files).json()
+    assert (body["coincidencias_count"], body["eliminados_count"]) == (2, 0)
+    body = client.post("/api/cursos/bulk-delete", files=files).json()
+    assert (body["eliminados_count"], body["errores"]) == (2, [])
+    assert client.get("/api/cursos/").json() == []
+
+
+@pytest.mark.anyio
+async def test_delete_by_keys_object_id_or_string(db):
+    """Una clave ObjectId encuentra el documento guardado con el id como ObjectId o como string"""
+    malla_id = ObjectId()
+    await db["cursos"].insert_many([
+        {"nombre": "Segundo", "malla_id": str(malla_id)},
+        {"nombre": "Tercero", "malla_id": malla_id},
+        {"nombre": "Cuarto", "malla_id": str(malla_id)},
+    ])
+    keys = [("Segundo", malla_id), ("Tercero", malla_id), ("Cuarto", str(malla_id)), ("Quinto", malla_id)]
+
+    result = await crud_curso.delete_by_keys(db, fields=("nombre", "malla_id"), keys=keys)
+    assert (result.deleted_count, result.not_found) == (3, [3])
+
+    await db["cursos"].insert_many([{"malla_id": str(malla_id)}, {"malla_id": malla_id}])
+    result = await crud_curso.delete_by_keys(db, fields=("malla_id",), keys=[(malla_id,), (malla_id,)])
+    assert (result.deleted_count, result.not_found) == (2, [])
+
+
+def test_cursos_csv(client, db):
+    """Desde un CSV todo llega como texto, malla_id incluido"""
+    malla = _malla(client)
+    contents = _csv(
+        "nombre;paralelo;nivel;turno;malla_id;tutor_id",
+        f"Segundo;A;PRIMARIA;MAÑANA;{malla};",
+        f"Tercero;A;PRIMARIA;MAÑANA;{malla};",
+    )
+    files = {"file": ("cursos.csv", contents, "text/csv")}
+    assert client.post("/api/cursos/import", files=files).json()["creados_count"] == 2
+
+    delete = _csv("nombre;paralelo;nivel;turno;malla_id", f"Tercero;A;PRIMARIA;MAÑANA;{malla}", "Cuarto;A;PRIMARIA;MAÑANA;x")
+    body = client.post("/api/cursos/bulk-delete", files={"file": ("cursos.csv", delete, "text/csv")}).json()
+    assert body["eliminados_count"] == 1
+    assert body["errores"] == ["Fila 3: malla_id inválido"]
+    assert [curso["nombre"] for curso in client.get("/api/cursos/").json()] == ["Segundo"]
@@ -0,0 +1,86 @@
+"""
+Caché de totales (app.crud.pagination.count_cache): una escritura en la
+colección, o en la que lee un $lookup del listado, invalida el total.
+"""
+from bson import ObjectId
+import pytest
+
+from app.core.cache import bump_write_version
+from app.crud.pagination import TOTAL_CACHED, TOTAL_EXACT, ListQuery, count_cache_key, paginate
+
+LOOKUP_ESTUDIANTES = [
+    {"$lookup": {"from": "estudiantes", "localField": "estudiante_id", "foreignField": "_id", "as": "_est"}},
+    {"$match": {"_est.0": {"$exists": True}}},
+    {"$project": {"_est": 0}},
+]
+
+
+def _counts(db) -> int:
+    return sum(1 for _, operation in db.calls if operation in ("count_documents", "aggregate"))
+
+
+def test_key_ignores_filter_order(db):
+    collection = db["licencias"]
+    a = count_cache_key(collection, ListQuery(filter={"estado": "PENDIENTE", "padre_id": 1}))
+    b = count_cache_key(collection, ListQuery(filter={"padre_id": 1, "estado": "PENDIENTE"}))
+    assert a == b
+    assert a != count_cache_key(collection, ListQuery(filter={"padre_id": 2, "estado": "PENDIENTE"}))
+
+
+@pytest.mark.anyio
+async def test_write_version_invalidates(db):
+    collection = db["licencias"]
+    await collection.insert_many([{"estado": "PENDIENTE"} for _ in range(3)])
+    query = ListQuery(filter={"estado": "PENDIENTE"})
+
+    assert (await paginate(collection, query)).total_status == TOTAL_EXACT
+    db.calls.clear()
+    page = await paginate(collection, query, page=2)
+    assert (page.total, page.total_status) == (3, TOTAL_CACHED)
+    assert db.calls == [("licencias", "find")]  # sólo la página
+
+    await collection.insert_one({"estado": "PENDIENTE"})
+    bump_write_version("pagos")  # otra colección: el total sigue en caché
+    assert (await paginate(collection, query)).total_status == TOTAL_CACHED
+
+    bump_write_version("licencias")
+    page = await paginate(collection, query)
+    assert (page.total, page.total_status) == (4, TOTAL_EXACT)
+
+
+@pytest.mark.anyio
+async def test_lookup_source_invalidates(db):
+    estudiante = await db["estudiantes"].insert_one({"rude": 1})
+    await db["licencias"].insert_many([{"estudiante_id": estudiante.inserted_id}, {"estudiante_id": ObjectId()}])
+    collection = db["licencias"]
+    query = ListQuery(filter={}, stages=LOOKUP_ESTUDIANTES)
+
+    page = await paginate(collection, query)
+    assert (page.total, page.total_status) == (1, TOTAL_EXACT)
+    assert (await paginate(collection, query)).total_status == TOTAL_CACHED
+
+    # Un estudiante nuevo cambia qué licencias pasan el $lookup
+    otro = await db["estudiantes"].insert_one({"rude": 2})
+    await db["licencias"].insert_one({"estudiante_id": otro.inserted_id})
+    bump_write_version("estudiantes")
+    page = await paginate(collection, query)
+    assert (page.total, page.total_status) == (2, TOTAL_EXACT)
+
+
+def test_endpoint_write_invalidates(client, db):
+    for rude in (1, 2):
+        client.post("/api/estudiantes/", json={"rude": rude, "nombres": "Ana", "apellidos": "Pérez"})
+
+    assert client.get("/api/estudiantes/").json()["total_status"] == TOTAL_EXACT
+    db.calls.clear()
+    body = client.get("/api/estudiantes/").json()
+    assert (body["total"], body["total_status"]) == (2, TOTAL_CACHED)
+    assert _counts(db) == 0
+
+    client.post("/api/estudiantes/", json={"rude": 3, "nombres": "Eva", "apellidos": "Rojas"})
+    body = client.get("/api/estudiantes/").json()
+    assert (body["total"], body["total_status"]) == (3, TOTAL_EXACT)
+
+    id = body["data"][0]["_id"]
+    assert client.delete(f"/api/estudiantes/{id}").status_code == 200
+    assert client.get("/api/estudiantes/").json()["total"] == 2
@@ -0,0 +1,80 @@
+"""
+Importación idempotente de cursos (CRUDCurso.upsert_many): un curso se
+identifica por NATURAL_KEY; volver a importar no lo duplica y sólo cambia el
+tutor.
+"""
+from bson import ObjectId
+import pytest
+
+from app.crud.crud_curso import curso as crud_curso
+from app.schemas.curso_schema import CursoCreate
+
+MALLA_ID = ObjectId()
+
+
+def _curso(paralelo: str, tutor_id=None) -> CursoCreate:
+    return CursoCreate(
+        nombre="Segundo", paralelo=paralelo, nivel="PRIMARIA", turno="MAÑANA", malla_id=str(MALLA_ID), tutor_id=tutor_id
+    )
+
+
+@pytest.mark.anyio
+async def test_upsert_many_idempotent(db):
+    cursos = [_curso("A"), _curso("B")]
+
+    result = await crud_curso.upsert_many(db, objs_in=cursos)
+    assert (result.created_count, result.updated_count) == (2, 0)
+    before = {doc["paralelo"]: doc async for doc in db["cursos"].find({})}
+
+    db.calls.clear()
+    result = await crud_curso.upsert_many(db, objs_in=cursos)
+    assert (result.created_count, result.updated_count) == (0, 0)
+    assert db.calls == [("cursos", "bulk_write")]
+    assert {doc["paralelo"]: doc async for doc in db["cursos"].find({})} == before
+
+
+@pytest.mark.anyio
+async def test_upsert_many_updates_only_tutor(db):
+    await crud_curso.upsert_many(db, objs_in=[_curso("A")])
+    created = await db["cursos"].find_one({})
+
+    tutor_id = ObjectId()
+    result = await crud_curso.upsert_many(db, objs_in=[_curso("A", tutor_id=str(tutor_id)), _curso("C")])
+    assert (result.created_count, result.updated_count) == (1, 1)
+
+    doc = await db["cursos"].find_one({"paralelo": "A"})
+    assert str(doc["tutor_id"]) == str(tutor_id)
+    assert {key: value for key, value in doc.items() if key != "tutor_id"} == {
+        key: value for key, value in created.items() if key != "tutor_id"
+    }
+
+
+@pytest.mark.anyio
+async def test_upsert_many_matches_string_malla_id(db):
+    """Cursos viejos con malla_id guardado como string también cuentan como existentes"""
+    await db["cursos"].insert_one(
+        {"nombre": "Segundo", "paralelo": "A", "nivel": "PRIMARIA", "turno": "MAÑANA", "malla_id": str(MALLA_ID)}
+    )
+    result = await crud_curso.upsert_many(db, objs_in=[_curso("A")])
+    assert result.created_count == 0
+    assert await db["cursos"].count_documents({}) == 1
+
+
+def test_import_twice(client, db):
+    malla = client.post(
+        "/api/mallas/", json={"gestion": 2025, "nivel": "PRIMARIA", "anio_escolaridad": 2, "estructura_areas": []}
+    ).json()["_id"]
+    contents = (
+        "Nombre,Paralelo,Nivel,Turno,Malla ID,Tutor ID\r\n"
+        f"Segundo,A,PRIMARIA,MAÑANA,{malla},\r\n"
+        f"Segundo,B,PRIMARIA,MAÑANA,{malla},\r\n"
+        f"Segundo,C,PRIMARIA,MAÑANA,{ObjectId()},\r\n"
+    ).encode("utf-8")
+    files = {"file": ("cursos.csv", contents, "text/csv")}
+
+    first = client.post("/api/cursos/import", files=files).json()
+    second = client.post("/api/cursos/import", files=files).json()
+
+    assert (first["creados_count"], second["creados_count"], second["actualizados_count"]) == (2, 0, 0)
+    assert len(second["errores"]) == 1 and second["errores"][0].startswith("Fila 4: malla_id")
+    assert len(client.get("/api/cursos/").json()) == 2
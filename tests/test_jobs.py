@@ -0,0 +1,100 @@
+"""
+Trabajos en segundo plano (app.core.jobs): el archivo en job_files, los
+errores en job_errors y el documento del trabajo sólo con el avance.
+"""
+import asyncio
+
+import pytest
+
+from app.core import jobs
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.indexes import INDEXES
+
+CSV = ("RUDE,Nombres,Apellidos\r\n" "1,Ana,Pérez\r\n" "x,Luis,Gómez\r\n" "2,Eva,Rojas\r\n" "y,Juan,Soto\r\n" "z,Rosa,Vega\r\n").encode()
+
+
+def _create_indexes(db):
+    async def create():
+        for name in (jobs.FILES_COLLECTION, jobs.ERRORS_COLLECTION):
+            await db._db[name].create_indexes(INDEXES[name])
+    asyncio.run(create())
+
+
+def _run_next_job(db):
+    async def run():
+        doc = await jobs.job_runner._claim(db)
+        assert doc is not None
+        await jobs.job_runner._run(db, doc)
+    asyncio.run(run())
+
+
+@pytest.fixture
+def job_id(client, db, monkeypatch):
+    _create_indexes(db)
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(jobs, "FILE_CHUNK_BYTES", 16)  # el CSV queda en varias partes
+    files = {"file": ("estudiantes.csv", CSV, "text/csv")}
+    response = client.post("/api/estudiantes/import?background=true", files=files)
+    assert response.status_code == 202, response.text
+    return response.json()["job_id"]
+
+
+def test_background_import(client, db, admin_headers, job_id):
+    assert asyncio.run(db._db[jobs.FILES_COLLECTION].count_documents({})) > 1
+    assert client.get(f"/api/jobs/{job_id}", headers=admin_headers).json()["status"] == jobs.QUEUED
+
+    _run_next_job(db)
+
+    body = client.get(f"/api/jobs/{job_id}", headers=admin_headers).json()
+    assert body["status"] == jobs.DONE
+    assert (body["done"], body["total"], body["errors_count"]) == (5, 5, 3)
+    assert [error.split(" - ")[0] for error in body["errors"]] == ["Fila 3: Error", "Fila 5: Error", "Fila 6: Error"]
+    assert body["result"]["creados_count"] == 2
+    assert len(body["result"]["errores"]) == 3
+
+    # Ni el archivo ni los errores quedan en el documento del trabajo
+    doc = asyncio.run(db._db[jobs.JOBS_COLLECTION].find_one({}))
+    assert "file" not in doc and "errors" not in doc
+    assert asyncio.run(db._db[jobs.FILES_COLLECTION].count_documents({})) == 0
+    assert asyncio.run(db._db[jobs.ERRORS_COLLECTION].count_documents({})) == 3
+
+
+def test_errors_limit(client, db, admin_headers, job_id, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_ERRORS_LIMIT", 2)
+    _run_next_job(db)
+
+    body = client.get(f"/api/jobs/{job_id}", headers=admin_headers).json()
+    assert body["errors_count"] == 3
+    assert [error.split(":")[0] for error in body["errors"]] == ["Fila 3", "Fila 5"]
+    assert len(body["result"]["errores"]) == 2
+
+
+def test_resumed_chunk_does_not_duplicate_errors(db, job_id):
+    async def run():
+        doc = await jobs.job_runner._claim(db)
+        job = jobs.Job(db, doc)
+        await job.save(done=2, total=None, counts={}, errors=[(3, "RUDE inválido")])
+        # Otro worker retoma y vuelve a procesar el mismo lote
+        await job.save(done=2, total=None, counts={}, errors=[(3, "RUDE inválido"), (4, "ya existe")])
+        return await db._db[jobs.JOBS_COLLECTION].find_one({"_id": doc["_id"]})
+
+    doc = asyncio.run(run())
+    assert doc["errors_count"] == 2
+    assert asyncio.run(db._db[jobs.ERRORS_COLLECTION].count_documents({"job_id": doc["_id"]})) == 2
+
+
+def test_requires_admin(client, db, job_id):
+    assert client.get(f"/api/jobs/{job_id}").status_code in (401, 403)
+
+    asyncio.run(db._db["users"].insert_one({"email": "padre@example.com", "role": "PADRE", "is_active": True}))
+    token = create_access_token({"sub": "padre@example.com", "role": "PADRE"})
+    assert client.get(f"/api/jobs/{job_id}", headers={"Authorization": f"Bearer {token}"}).status_code == 403
+
+
+def test_missing_file(client, db, admin_headers, job_id):
+    asyncio.run(db._db[jobs.FILES_COLLECTION].delete_many({}))
+    _run_next_job(db)
+
+    body = client.get(f"/api/jobs/{job_id}", headers=admin_headers).json()
+    assert (body["status"], body["error"]) == (jobs.FAILED, "No se encontró el archivo del trabajo")
@@ -0,0 +1,98 @@
+"""
+Loader (app.crud.loader): los ids pedidos en el mismo ciclo del event loop se
+resuelven con una sola consulta por colección.
+"""
+import asyncio
+
+from bson import ObjectId
+import pytest
+
+from app.crud.loader import Loader
+
+pytestmark = pytest.mark.anyio
+
+
+async def _seed(db, collection: str, count: int) -> list:
+    result = await db[collection].insert_many([{"n": i} for i in range(count)])
+    db.calls.clear()
+    return result.inserted_ids
+
+
+async def test_one_query_per_tick(db):
+    estudiantes = await _seed(db, "estudiantes", 3)
+    padres = await _seed(db, "users", 2)
+    loader = Loader(db)
+
+    missing = ObjectId()
+    docs = await asyncio.gather(
+        loader.load("estudiantes", estudiantes[0]),
+        loader.load("users", str(padres[1])),  # como str también
+        loader.load("estudiantes", estudiantes[2]),
+        loader.load("estudiantes", estudiantes[0]),  # repetido
+        loader.load("estudiantes", missing),
+        loader.load("estudiantes", "no-es-un-id"),
+        loader.load("users", padres[0]),
+    )
+
+    assert [doc and doc["n"] for doc in docs] == [0, 1, 2, 0, None, None, 0]
+    assert sorted(db.calls) == [("estudiantes", "find"), ("users", "find")]
+    assert loader.queries == 2
+
+
+async def test_load_many_keeps_order(db):
+    ids = await _seed(db, "estudiantes", 4)
+    loader = Loader(db)
+
+    docs = await loader.load_many("estudiantes", [ids[3], ids[1], ObjectId(), ids[3]])
+    assert [doc and doc["n"] for doc in docs] == [3, 1, None, 3]
+    assert db.calls == [("estudiantes", "find")]
+
+
+async def test_memoized_until_clear(db):
+    ids = await _seed(db, "estudiantes", 2)
+    loader = Loader(db)
+
+    # Ticks distintos: una consulta cada uno, y lo ya cargado no se vuelve a pedir
+    assert (await loader.load("estudiantes", ids[0]))["n"] == 0
+    assert (await loader.load("estudiantes", ids[1]))["n"] == 1
+    assert (await loader.load("estudiantes", ids[0]))["n"] == 0
+    assert loader.queries == 2
+
+    await db["estudiantes"].update_one({"_id": ids[0]}, {"$set": {"n": 10}})
+    loader.clear("estudiantes", ids[0])
+    assert (await loader.load("estudiantes", ids[0]))["n"] == 10
+    assert loader.queries == 3
+
+
+async def test_failed_query_is_not_memoized(db, monkeypatch):
+    ids = await _seed(db, "estudiantes", 1)
+    loader = Loader(db)
+    counting_collection = type(db["estudiantes"])
+    original = counting_collection.__getattr__
+
+    def failing_getattr(self, name):
+        if name == "find":
+            raise RuntimeError("sin conexión")
+        return original(self, name)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(counting_collection, "__getattr__", failing_getattr)
+        results = await asyncio.gather(
+            loader.load("estudiantes", ids[0]), loader.load("estudiantes", ObjectId()), return_exceptions=True
+        )
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    assert (await loader.load("estudiantes", ids[0]))["n"] == 0
+
+
+async def test_fetch_tasks_are_referenced(db):
+    """El Loader guarda la tarea de cada consulta hasta que termina"""
+    ids = await _seed(db, "estudiantes", 1)
+    loader = Loader(db)
+
+    future = loader.load("estudiantes", ids[0])
+    await asyncio.sleep(0)  # despacho del lote
+    assert len(loader._tasks) == 1
+    assert (await future)["n"] == 0
+    await asyncio.sleep(0)
+    assert loader._tasks == set()
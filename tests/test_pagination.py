@@ -0,0 +1,76 @@
+"""
+Paginación por cursor (app.crud.pagination): el cursor es opaco y el seek
+recorre el listado completo, sin repetir ni saltear documentos, también con
+claves null y en orden descendente.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+import pytest
+
+from app.crud.pagination import InvalidCursor, ListQuery, decode_cursor, encode_cursor, paginate, seek_filter
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "fecha": datetime(2026, 3, 1, 8, 30), "nombre": "Ñandú", "monto": None}
+    sort = [("fecha", -1), ("nombre", 1), ("monto", 1), ("_id", -1)]
+
+    token = encode_cursor(doc, sort)
+    assert "=" not in token  # sin relleno: va en la query string
+    assert decode_cursor(token) == [doc["fecha"], "Ñandú", None, doc["_id"]]
+
+
+@pytest.mark.parametrize("token", ["", "no es base64!", "e30", "bnVsbA"])  # "", basura, {}, null
+def test_decode_invalid_cursor(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_seek_filter():
+    assert seek_filter([("fecha", 1), ("_id", 1)], [5, 7]) == {
+        "$or": [{"fecha": {"$gt": 5}}, {"fecha": 5, "_id": {"$gt": 7}}]
+    }
+    # En descendente los null van al final: $lt no los incluye
+    assert seek_filter([("fecha", -1), ("_id", -1)], [5, 7]) == {
+        "$or": [{"fecha": {"$lt": 5}}, {"fecha": None}, {"fecha": 5, "_id": {"$lt": 7}}]
+    }
+    # null es el menor valor: en ascendente sigue todo lo no nulo, en descendente nada
+    assert seek_filter([("fecha", 1), ("_id", 1)], [None, 7]) == {
+        "$or": [{"fecha": {"$ne": None}}, {"fecha": None, "_id": {"$gt": 7}}]
+    }
+    assert seek_filter([("fecha", -1), ("_id", -1)], [None, 7]) == {"fecha": None, "_id": {"$lt": 7}}
+    assert seek_filter([("fecha", -1)], [None]) == {"_id": {"$exists": False}}
+
+    with pytest.raises(InvalidCursor):
+        seek_filter([("fecha", 1), ("_id", 1)], [5])
+
+
+def _mongo_order(docs, key, direction):
+    """Orden esperado: null primero en ascendente, desempate por _id en la misma dirección"""
+    return sorted(docs, key=lambda d: (d.get(key) is not None, d.get(key) or 0, d["_id"]), reverse=direction < 0)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_walk_all_pages(db, direction):
+    collection = db["licencias"]
+    # Valores repetidos (desempate por _id), nulos y campos ausentes
+    values = [3, None, 1, 3, 2, None, 3, 1, 5, None, 2, 3, 4]
+    docs = []
+    for i, value in enumerate(values):
+        doc = {"_id": ObjectId(), "orden": value, "i": i}
+        if value is None and i % 2:
+            del doc["orden"]
+        docs.append(doc)
+    await collection.insert_many([dict(doc) for doc in docs])
+
+    query = ListQuery(filter={}, sort=[("orden", direction)])
+    seen, after = [], None
+    while True:
+        page = await paginate(collection, query, per_page=4, after=after, include_total=False)
+        seen.extend(doc["i"] for doc in page.items)
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+
+    assert seen == [doc["i"] for doc in _mongo_order(docs, "orden", direction)]
@@ -0,0 +1,169 @@
+"""
+Round trips a Mongo por endpoint de escritura (CRUDBase: create, update, remove).
+
+Cada escritura es una sola operación; las lecturas extra que quedan son las
+de efectos propios del endpoint (catálogo, notificaciones, sincronizar
+estudiantes) o la lectura de los campos buscables que faltan para calcular
+search_keys.
+
+Además, el ida y vuelta de archivos: lo que devuelve /export/xlsx se puede
+subir tal cual a /bulk-delete.
+"""
+from bson import ObjectId
+import pytest
+
+from app.crud.crud_estudiante import estudiante as crud_estudiante
+
+MALLA_ID = str(ObjectId())
+
+RESOURCES = {
+    "mallas": (
+        "mallas_curriculares",
+        {"gestion": 2025, "nivel": "PRIMARIA", "anio_escolaridad": 2, "estructura_areas": []},
+        {"anio_escolaridad": 3},
+    ),
+    "cursos": (
+        "cursos",
+        {"nombre": "Segundo", "paralelo": "A", "nivel": "PRIMARIA", "turno": "MAÑANA", "malla_id": MALLA_ID},
+        {"nombre": "Tercero"},
+    ),
+    "estudiantes": ("estudiantes", {"rude": 1, "nombres": "Ana", "apellidos": "Pérez"}, {"estado": "RETIRADO"}),
+    "eventos": ("eventos", {"titulo": "Acto", "descripcion": "Cívico", "fecha_hora": "2026-01-01T10:00:00"}, {"titulo": "Feria"}),
+    "pagos": (
+        "pagos",
+        {"padre_id": str(ObjectId()), "estudiante_id": str(ObjectId()), "concepto": "Mensualidad", "monto": 100,
+         "fecha_vencimiento": "2026-01-01"},
+        {"monto": 120},
+    ),
+    "papas": (
+        "users",
+        {"email": "padre@example.com", "password": "secreto", "nombre": "Juan", "apellido": "Quispe"},
+        {"direccion": "Calle 1"},
+    ),
+}
+
+# Lecturas propias de cada endpoint, antes y después de la escritura
+BEFORE = {
+    ("papas", "create"): [("users", "find_one")],  # email ya registrado
+}
+EXTRA = {
+    ("eventos", "create"): [("users", "find")],  # padres a notificar
+    # Cambiar la malla recarga el catálogo para sincronizar sus estudiantes
+    ("mallas", "update"): [("mallas_curriculares", "find"), ("cursos", "find")],
+    ("mallas", "delete"): [("mallas_curriculares", "find"), ("cursos", "find")],
+    # Borrar un curso deja sin curso a sus estudiantes (catálogo + update_many)
+    ("cursos", "delete"): [("mallas_curriculares", "find"), ("cursos", "find"), ("estudiantes", "update_many")],
+}
+
+
+@pytest.mark.parametrize("resource", RESOURCES)
+def test_mutating_endpoints(client, db, resource):
+    collection, create_body, update_body = RESOURCES[resource]
+    url = f"/api/{resource}/"
+
+    db.calls.clear()
+    response = client.post(url, json=create_body)
+    assert response.status_code in (200, 201), response.text
+    assert db.calls == (
+        BEFORE.get((resource, "create"), []) + [(collection, "insert_one")] + EXTRA.get((resource, "create"), [])
+    )
+    id = response.json()["_id"]
+
+    db.calls.clear()
+    response = client.put(url + id, json=update_body)
+    assert response.status_code == 200, response.text
+    assert db.calls[0] == (collection, "find_one_and_update")
+    assert db.calls[1:] == EXTRA.get((resource, "update"), [])
+
+    db.calls.clear()
+    assert client.put(url + str(ObjectId()), json=update_body).status_code == 404
+    assert db.calls == [(collection, "find_one_and_update")]
+
+    db.calls.clear()
+    response = client.delete(url + id)
+    assert response.status_code == 200, response.text
+    assert db.calls == [(collection, "find_one_and_delete")] + EXTRA.get((resource, "delete"), [])
+
+    db.calls.clear()
+    assert client.delete(url + id).status_code == 404
+    assert db.calls == [(collection, "find_one_and_delete")]
+
+
+def test_update_search_fields(client, db):
+    id = client.post("/api/estudiantes/", json={"rude": 7, "nombres": "Ana", "apellidos": "Pérez"}).json()["_id"]
+
+    # Todos los campos buscables en el body: search_keys sale de él, una escritura
+    db.calls.clear()
+    body = {"rude": 8, "nombres": "Luz", "apellidos": "Muñoz"}
+    assert client.put(f"/api/estudiantes/{id}", json=body).status_code == 200
+    assert db.calls == [("estudiantes", "find_one_and_update")]
+
+    # Sólo uno: se leen los que faltan y se escribe una vez
+    db.calls.clear()
+    assert client.put(f"/api/estudiantes/{id}", json={"nombres": "Eva"}).status_code == 200
+    assert db.calls == [("estudiantes", "find_one"), ("estudiantes", "find_one_and_update")]
+    assert client.get(f"/api/estudiantes/?q=munoz eva").json()["total"] == 1
+
+
+@pytest.mark.anyio
+async def test_update_search_fields_concurrent_change(db, monkeypatch):
+    """Si otro request cambia un campo buscable entre la lectura y la escritura, se vuelve a leer"""
+    result = await db["estudiantes"].insert_one({"rude": 1, "nombres": "Ana", "apellidos": "Pérez"})
+    counting_collection = type(db["estudiantes"])
+    original = counting_collection.__getattr__
+    raced = []
+
+    def racing_getattr(self, name):
+        attr = original(self, name)
+        if name != "find_one":
+            return attr
+
+        async def find_one(*args, **kwargs):
+            doc = await attr(*args, **kwargs)
+            if not raced:
+                raced.append(True)
+                await self._collection.update_one({"_id": result.inserted_id}, {"$set": {"apellidos": "Gómez"}})
+            return doc
+        return find_one
+
+    monkeypatch.setattr(counting_collection, "__getattr__", racing_getattr)
+    updated = await crud_estudiante.update(db, id=result.inserted_id, obj_in={"nombres": "Eva"})
+
+    assert updated.apellidos == "Gómez"
+    doc = await db["estudiantes"].find_one({"_id": result.inserted_id})
+    assert doc["search_keys"] == ["1", "eva", "gomez"]
+    assert doc["name_key"] == "gomez eva"
+
+
+# Exportar y volver a subir el mismo archivo a /bulk-delete borra todo lo exportado
+EXPORT_DELETE = {
+    "cursos": ("/api/cursos/export/xlsx", "/api/cursos/bulk-delete"),
+    "estudiantes": ("/api/estudiantes/export/xlsx", "/api/estudiantes/bulk-delete"),
+    "papas": ("/api/papas/export/xlsx", "/api/papas/bulk-delete-padres"),
+}
+
+
+@pytest.mark.parametrize("resource", EXPORT_DELETE)
+def test_export_then_bulk_delete(client, db, resource):
+    export_url, delete_url = EXPORT_DELETE[resource]
+    body = dict(RESOURCES[resource][1])
+    if resource == "cursos":
+        malla = {"gestion": 2025, "nivel": "PRIMARIA", "anio_escolaridad": 2, "estructura_areas": []}
+        body["malla_id"] = client.post("/api/mallas/", json=malla).json()["_id"]
+    for i in range(3):
+        if resource == "cursos":
+            body["paralelo"] = "ABC"[i]
+        elif resource == "estudiantes":
+            body["rude"] = 8078012345670 + i
+        else:
+            body["email"] = f"padre{i}@example.com"
+        assert client.post(f"/api/{resource}/", json=body).status_code in (200, 201)
+
+    response = client.get(export_url)
+    assert response.status_code == 200, response.text
+    files = {"file": (f"{resource}.xlsx", response.content, "application/octet-stream")}
+    result = client.post(delete_url, files=files).json()
+
+    assert (result["eliminados_count"], result["errores"]) == (3, [])
+    listed = client.get(f"/api/{resource}/").json()
+    assert (listed if resource == "cursos" else listed["data"]) == []
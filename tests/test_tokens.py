@@ -0,0 +1,78 @@
+"""
+Tokens autocontenidos (SELF_CONTAINED_TOKENS): llevan token_version y dejan de
+valer cuando cambia la contraseña, el estado o los hijos del padre, o cuando
+se lo borra.
+"""
+from jose import jwt
+import pytest
+
+from app.core.config import settings
+
+PASSWORD = "secreto"
+
+
+@pytest.fixture
+def padre(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "SELF_CONTAINED_TOKENS", True)
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    body = {"email": "padre@example.com", "password": PASSWORD, "nombre": "Juan", "apellido": "Quispe"}
+    response = client.post("/api/papas/", json=body)
+    assert response.status_code == 201, response.text
+    return response.json()["_id"]
+
+
+def _login(client, password: str = PASSWORD) -> dict:
+    response = client.post("/api/auth/login/padre", json={"email": "padre@example.com", "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+def _me(client, headers: dict) -> int:
+    return client.get("/api/auth/me", headers=headers).status_code
+
+
+def test_claims(client, padre):
+    headers = _login(client)
+    payload = jwt.decode(headers["Authorization"][7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert (payload["uid"], payload["ver"], payload["hijos"]) == (padre, 0, [])
+    assert _me(client, headers) == 200
+
+
+def test_password_change_revokes(client, padre):
+    headers = _login(client)
+    assert client.put(f"/api/papas/{padre}", json={"password": "otra-clave"}).status_code == 200
+
+    assert _me(client, headers) == 401
+    assert _me(client, _login(client, "otra-clave")) == 200
+
+
+def test_unrelated_update_keeps_token(client, padre):
+    headers = _login(client)
+    assert client.put(f"/api/papas/{padre}", json={"direccion": "Calle 1"}).status_code == 200
+    assert _me(client, headers) == 200
+
+
+def test_deactivate_revokes(client, padre):
+    headers = _login(client)
+    assert client.put(f"/api/papas/{padre}", json={"is_active": False}).status_code == 200
+    assert _me(client, headers) == 401
+
+
+def test_children_change_revokes(client, padre):
+    headers = _login(client)
+    hijo = client.post("/api/estudiantes/", json={"rude": 1, "nombres": "Ana", "apellidos": "Quispe"}).json()["_id"]
+    assert client.post(f"/api/papas/{padre}/hijos", json={"child_id": hijo}).status_code == 200
+
+    assert _me(client, headers) == 401
+    headers = _login(client)
+    payload = jwt.decode(headers["Authorization"][7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert (payload["ver"], payload["hijos"]) == (1, [hijo])
+
+    assert client.delete(f"/api/papas/{padre}/hijos/{hijo}").status_code == 200
+    assert _me(client, headers) == 401
+
+
+def test_delete_revokes(client, padre):
+    headers = _login(client)
+    assert client.delete(f"/api/papas/{padre}").status_code == 200
+    assert _me(client, headers) == 401